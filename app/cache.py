@@ -0,0 +1,186 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+MISSING = object()
+
+_caches: Dict[str, "LRUCache"] = {}
+
+class LRUCache:
+    """
+    Thread safe in-process cache with a size cap and hit/miss counters.
+    Entries can optionally expire after a TTL.
+
+    The generation changes whenever entries are removed or updated. Callers that load a value
+    from the database read it first and pass it to set(), so a value loaded before an
+    invalidation can't be cached after it.
+    """
+    def __init__(self, name: str, max_size: int, ttl: Optional[float] = None):
+        self.name = name
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries: OrderedDict[Hashable, Tuple[Any, Optional[float]]] = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.generation = 0
+
+        # Register the cache so it shows up in the metrics
+        _caches[name] = self
+
+    def get(self, key: Hashable) -> Any:
+        """
+        Get a value from the cache.
+
+        Parameters:
+            key (Hashable): Key of the entry.
+
+        Returns:
+            out (Any): The cached value or MISSING if the key is not cached.
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+
+            if entry is not None and entry[1] is not None and entry[1] < time.monotonic():
+                del self.entries[key]
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return MISSING
+
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None, generation: Optional[int] = None) -> None:
+        """
+        Add or replace an entry, evicting the least recently used entries if the cache is full.
+
+        Parameters:
+            key (Hashable): Key of the entry.
+            value (Any): Value to cache.
+            ttl (Optional[float]): Seconds until the entry expires. Defaults to the cache TTL.
+            generation (Optional[int]): Generation read before the value was loaded. The value isn't cached if it changed since.
+        """
+        ttl = ttl if ttl is not None else self.ttl
+        expires = time.monotonic() + ttl if ttl is not None else None
+
+        with self.lock:
+            if generation is not None and generation != self.generation:
+                return
+
+            self.entries[key] = (value, expires)
+            self.entries.move_to_end(key)
+
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def update(self, key: Hashable, function: Callable[[Any], Any]) -> bool:
+        """
+        Replace a cached value with the result of a function, but only if the key is cached.
+
+        Parameters:
+            key (Hashable): Key of the entry.
+            function (Callable): Receives the cached value and returns the new one.
+
+        Returns:
+            out (bool): If the key was cached.
+        """
+        with self.lock:
+            self.generation += 1
+            entry = self.entries.get(key)
+
+            if entry is None:
+                return False
+
+            self.entries[key] = (function(entry[0]), entry[1])
+            return True
+
+    def update_where(self, predicate: Callable[[Hashable, Any], bool], function: Callable[[Any], Any]) -> int:
+        """
+        Replace every cached value matching a condition with the result of a function.
+
+        Parameters:
+            predicate (Callable): Receives the key and value of each entry.
+            function (Callable): Receives a matching value and returns the new one.
+
+        Returns:
+            out (int): Number of entries updated.
+        """
+        with self.lock:
+            self.generation += 1
+            keys = [key for key, entry in self.entries.items() if predicate(key, entry[0])]
+
+            for key in keys:
+                value, expires = self.entries[key]
+                self.entries[key] = (function(value), expires)
+
+        return len(keys)
+
+    def delete(self, key: Hashable) -> None:
+        """
+        Remove an entry from the cache.
+
+        Parameters:
+            key (Hashable): Key of the entry.
+        """
+        with self.lock:
+            self.generation += 1
+            self.entries.pop(key, None)
+
+    def delete_where(self, predicate: Callable[[Hashable, Any], bool]) -> int:
+        """
+        Remove every entry matching a condition.
+
+        Parameters:
+            predicate (Callable): Receives the key and value of each entry.
+
+        Returns:
+            out (int): Number of entries removed.
+        """
+        with self.lock:
+            self.generation += 1
+            keys = [key for key, entry in self.entries.items() if predicate(key, entry[0])]
+
+            for key in keys:
+                del self.entries[key]
+
+        return len(keys)
+
+    def clear(self) -> None:
+        with self.lock:
+            self.generation += 1
+            self.entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the metrics for this cache.
+
+        Returns:
+            out (dict): Size, hits, misses, hit rate and evictions of the cache.
+        """
+        with self.lock:
+            lookups = self.hits + self.misses
+
+            return {
+                "name": self.name,
+                "size": len(self.entries),
+                "maxSize": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hitRate": self.hits / lookups if lookups else 0,
+                "evictions": self.evictions,
+            }
+
+def get_caches() -> List[LRUCache]:
+    """
+    Get every cache created by the server.
+
+    Returns:
+        out (List[LRUCache]): The registered caches.
+    """
+    return list(_caches.values())
@@ -33,7 +33,79 @@ def init_config():
         "mail-service-token": "INSERT TOKEN HERE",
         "mail-service-url": "INSERT URL HERE",
         "mailjet-api-key": "INSERT KEY HERE",
-        "mailjet-api-secret": "INSERT SECRET HERE"
+        "mailjet-api-secret": "INSERT SECRET HERE",
+        "image-gc-enabled": True,
+        "image-gc-mode": "quarantine",
+        "image-gc-interval": 86400,
+        "image-gc-min-age": 3600,
+        "image-gc-batch-size": 500,
+        "image-gc-max-files-per-second": 200,
+        "storage-backend": "local",
+        "storage-local-path": "user_images",
+        "storage-s3-endpoint": "INSERT URL HERE",
+        "storage-s3-bucket": "INSERT BUCKET HERE",
+        "storage-s3-region": "us-east-1",
+        "storage-s3-access-key": "INSERT KEY HERE",
+        "storage-s3-secret-key": "INSERT SECRET HERE",
+        "storage-s3-pool-size": 10,
+        "storage-cache-enabled": False,
+        "storage-cache-path": "storage_cache",
+        "storage-cache-max-bytes": 268435456,
+        "storage-cache-ttl": 300,
+        "profile-cache-size": 10000,
+        "profile-cache-ttl": 300,
+        "resolver-cache-size": 50000,
+        "resolver-negative-ttl": 30,
+        "mysql-auto-migrate": False,
+        "availability-filter-enabled": True,
+        "availability-filter-capacity": 1000000,
+        "availability-filter-error-rate": 0.01,
+        "availability-filter-refresh-interval": 30,
+        "availability-filter-rebuild-interval": 3600,
+        "email-dns-timeout": 3,
+        "email-dns-positive-ttl": 3600,
+        "email-dns-negative-ttl": 300,
+        "email-dns-fail-open": True,
+        "mail-transport": "mailjet",
+        "mail-smtp-host": "localhost",
+        "mail-smtp-port": 25,
+        "mail-file-path": "mail_outbox",
+        "mail-outbox-enabled": True,
+        "mail-outbox-concurrency": 4,
+        "mail-outbox-batch-size": 20,
+        "mail-outbox-poll-interval": 5,
+        "mail-outbox-lease": 300,
+        "mail-outbox-max-attempts": 8,
+        "mail-outbox-retry-base": 30,
+        "mail-bulk-chunk-size": 50,
+        "mail-bulk-concurrency": 4,
+        "mail-bulk-max-attempts": 3,
+        "mail-bulk-progress-interval": 10,
+        "mail-jobs-enabled": True,
+        "mail-jobs-poll-interval": 10,
+        "mail-jobs-lease": 120,
+        "mail-unsubscribe-url": "",
+        "recovery-store": "mysql",
+        "recovery-redis-url": "redis://localhost:6379/0",
+        "recovery-code-secret": "",
+        "recovery-code-length": 8,
+        "recovery-code-ttl": 900,
+        "recovery-max-attempts": 5,
+        "recovery-rate-limit": 5,
+        "recovery-rate-window": 3600,
+        "import-batch-size": 1000,
+        "import-hash-workers": 0,
+        "directory-snapshot-enabled": True,
+        "directory-snapshot-path": "directory-snapshot.bin",
+        "directory-snapshot-interval": 300,
+        "principal-events-enabled": True,
+        "principal-events-poll-interval": 0.5,
+        "principal-events-buffer-size": 1000,
+        "principal-events-retention": 604800,
+        "cache-invalidation-enabled": True,
+        "cache-invalidation-poll-interval": 1,
+        "cache-invalidation-gap-timeout": 10,
+        "cache-invalidation-retention": 3600
     }
 
     # Compare config with json data
@@ -55,8 +127,12 @@ def get_key(key: str):
     Returns:
         Value of the key.
     """
+    # Modules may read options before the config is initialized
+    if not os.path.isfile("config.yml"):
+        return None
+
     with open("config.yml", "r") as config:
-        content: dict = yaml.safe_load(config)
+        content: dict = yaml.safe_load(config) or {}
 
         if key in content:
             return content[key]
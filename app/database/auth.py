@@ -1,4 +1,11 @@
 from app.database import connections
+from app.database import resolver
+from app.database import availability
+from app.database import outbox
+from app.database import versions
+from app.database import invalidations
+from app.database import profiles
+from app.imports import hashing
 import app.database.exceptions as db_exceptions
 from typing import Literal
 import secrets
@@ -32,15 +39,17 @@ def verify_credentials(username: str, password: str) -> bool:
     passwordHash: str = hashlib.sha256(saltedPassword.encode()).hexdigest()
 
     # Validate login credentials
-    cursor.execute("SELECT username, password, role FROM accounts WHERE username = %s AND password = %s",
+    cursor.execute("SELECT role FROM accounts WHERE username = %s AND password = %s",
                    (username, passwordHash,))
-    account = cursor.fetchone()
+    account = cast(Optional[Tuple[str]], cursor.fetchone())
     conn.close()
 
     # Checks if the account was found
     if account:
+        role, = account
+
         # Check if account is suspended
-        if account[2] == "SUSPENDED":
+        if role == "SUSPENDED":
             raise db_exceptions.AccountSuspended()
         else:
             return True
@@ -62,14 +71,16 @@ def check_token(username: str, token: str) -> bool:
     cursor = conn.cursor()
 
     # Get account from database
-    cursor.execute("SELECT username, token, role FROM accounts WHERE username = %s AND token = %s", (username, token,))
-    account = cursor.fetchone()
+    cursor.execute("SELECT role FROM accounts WHERE username = %s AND token = %s", (username, token,))
+    account = cast(Optional[Tuple[str]], cursor.fetchone())
     conn.close()
 
     # Check token
     if account:
+        role, = account
+
         # Check role
-        if account[2] != "SUSPENDED":
+        if role != "SUSPENDED":
             return True
         else:
             raise db_exceptions.AccountSuspended()
@@ -77,48 +88,64 @@ def check_token(username: str, token: str) -> bool:
         raise db_exceptions.InvalidToken()
 
 
-def check_username(username: str) -> bool:
+def check_username(username: str, use_filter: bool = True) -> bool:
     """
     Checks if a username exists.
     
     Parameters:
         username (str): Username to check.
+        use_filter (bool): Trust the availability filter when it reports the username as free.
+            Pass False before writes, the filter can lag behind other workers.
     
     Returns:
         out (bool): If the username is in use.
     """
+    # Values missing from the filter are free unless another worker used them very recently
+    if use_filter and not availability.username_may_exist(username):
+        return False
+
     conn = connections.get_connection()
     cursor = conn.cursor()
 
-    # Gets all accounts from the MySQL database
-    cursor.execute("SELECT * FROM accounts WHERE username = %s", (username,))
+    # Check if any account uses the username
+    cursor.execute("SELECT 1 FROM accounts WHERE username = %s LIMIT 1", (username,))
     item = cursor.fetchone()
     conn.close()
 
+    availability.record_probe(bool(item))
+
     # Check if username was found
     if item:
         return True
     else:
         return False
 
-def check_email(email: str) -> bool:
+def check_email(email: str, use_filter: bool = True) -> bool:
     """
     Checks if an email exists.
     
     Parameters:
         email (str): Email to check.
+        use_filter (bool): Trust the availability filter when it reports the email as free.
+            Pass False before writes, the filter can lag behind other workers.
     
     Returns:
         out (bool): If the email is in use.
     """
+    # Values missing from the filter are free unless another worker used them very recently
+    if use_filter and not availability.email_may_exist(email):
+        return False
+
     conn = connections.get_connection()
     cursor = conn.cursor()
 
-    # Get email from MySQL database
-    cursor.execute("SELECT * FROM accounts WHERE email = %s", (email,))
+    # Check if any account uses the email
+    cursor.execute("SELECT 1 FROM accounts WHERE email = %s LIMIT 1", (email,))
     item = cursor.fetchone()
     conn.close()
 
+    availability.record_probe(bool(item))
+
     # Check if email was found
     if item:
         return True
@@ -153,9 +180,7 @@ def create_account(
     user_id = str(uuid.uuid4()) 
 
     # Generate a new password salt and hash the new password
-    salt = secrets.token_bytes(16).hex()
-    saltedPassword = password+salt
-    passwordHash = hashlib.sha256(saltedPassword.encode()).hexdigest()
+    passwordHash, salt = hashing.hash_password(password)
 
     # Check to ensure the username and email are not already in use
     cursor.execute(
@@ -167,15 +192,31 @@ def create_account(
     if result:
         raise db_exceptions.Conflict()
 
+    version = versions.next_version(cursor)
+
     cursor.execute("""
-        INSERT INTO accounts (username, password, email, token, salt, bio, pronouns, user_id) 
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)""",
-        (username, passwordHash, email, token, salt, None, pronouns, user_id)
+        INSERT INTO accounts (username, password, email, token, salt, bio, pronouns, user_id, row_version) 
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)""",
+        (username, passwordHash, email, token, salt, None, pronouns, user_id, version)
+    )
+
+    # Queue the welcome email in the same transaction so it is sent if and only if the account exists
+    outbox.enqueue(cursor, "welcome", email, username, {"username": username})
+
+    # Other workers may have cached that the account doesn't exist
+    invalidations.record(
+        cursor,
+        resolver.stale_entries(username, user_id) + profiles.stale_entries(username) + availability.stale_entries(username, email)
     )
 
     conn.commit()
     conn.close()
 
+    # Replace any cached "user not found" entries for the new account
+    resolver.remember(username, user_id)
+    availability.add_username(username)
+    availability.add_email(email)
+
     return token
 
 def check_user_exists(account: str, mode: Literal["ACCOUNT_ID", "USERNAME"]) -> bool:
@@ -193,7 +234,7 @@ def check_user_exists(account: str, mode: Literal["ACCOUNT_ID", "USERNAME"]) ->
     cursor = conn.cursor()
 
     searchColumn = "user_id" if mode == "ACCOUNT_ID" else "username"
-    query = f"SELECT * FROM accounts WHERE {searchColumn} = %s;"
+    query = f"SELECT 1 FROM accounts WHERE {searchColumn} = %s LIMIT 1;"
 
     cursor.execute(query, (account,))
     user = cursor.fetchone()
@@ -218,9 +259,9 @@ def check_account_permission(account_id: str, node: str) -> bool:
     conn = connections.get_connection()
     cursor = conn.cursor()
 
-    # Get permissions
-    cursor.execute("SELECT * FROM permissions WHERE account_id = %s AND node = %s", (account_id, node,))
-    perms = cursor.fetchall()
+    # Check for the permission
+    cursor.execute("SELECT 1 FROM permissions WHERE account_id = %s AND node = %s LIMIT 1", (account_id, node,))
+    perms = cursor.fetchone()
     conn.close()
 
     # Check if user had required perm
@@ -0,0 +1,301 @@
+import hashlib
+import math
+import threading
+import unicodedata
+from typing import Any, Dict, List, Optional, Tuple
+from app.database import connections
+from app import invalidation
+import app.config as config
+
+# Rows read from the database per round trip while building the filters
+PAGE_SIZE = 10000
+
+class BloomFilter:
+    """
+    Probabilistic set of strings. It never misses a string that was added,
+    but may claim to contain a string that wasn't (a false positive).
+    """
+    def __init__(self, capacity: int, error_rate: float):
+        capacity = max(capacity, 1)
+
+        # Standard sizing for the expected number of items and false positive rate
+        self.size = max(int(-capacity * math.log(error_rate) / math.log(2) ** 2), 8)
+        self.hash_count = max(round(self.size / capacity * math.log(2)), 1)
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str) -> List[int]:
+        # Derive every hash from two halves of one digest (double hashing)
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+
+        return [(first + i * second) % self.size for i in range(self.hash_count)]
+
+    def add(self, item: str) -> None:
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+_lock = threading.Lock()
+_usernames: Optional[BloomFilter] = None
+_emails: Optional[BloomFilter] = None
+_last_id = 0
+
+# Additions made while the filters are being rebuilt, replayed into the new filters
+_pending: Optional[List[Tuple[str, str]]] = None
+
+_stats = {"definitelyFree": 0, "probes": 0, "falsePositives": 0}
+
+# Other workers add the values logged under this name to their filters
+LOG_NAME = "availability"
+
+def normalize(value: str) -> str:
+    """
+    Normalize a username or email for the filters.
+    The database compares these case and accent insensitively, so the filters
+    must treat every value the database considers equal as the same value.
+
+    Parameters:
+        value (str): Username or email.
+
+    Returns:
+        out (str): The normalized value.
+    """
+    decomposed = unicodedata.normalize("NFKD", value)
+    stripped = "".join(character for character in decomposed if not unicodedata.combining(character))
+
+    return stripped.casefold().rstrip(" ")
+
+def _add(kind: str, value: str) -> None:
+    key = normalize(value)
+
+    with _lock:
+        bloom = _usernames if kind == "username" else _emails
+
+        if bloom is not None:
+            bloom.add(key)
+
+        if _pending is not None:
+            _pending.append((kind, key))
+
+def add_username(username: str) -> None:
+    """
+    Mark a username as used.
+
+    Parameters:
+        username (str): Username of a new account.
+    """
+    _add("username", username)
+
+def add_email(email: str) -> None:
+    """
+    Mark an email as used.
+
+    Parameters:
+        email (str): Email of a new account or an updated email.
+    """
+    _add("email", email)
+
+def stale_entries(username: Optional[str] = None, email: Optional[str] = None) -> List[Tuple[str, str]]:
+    """
+    Get the entries to log when a username or email starts being used,
+    so other workers add it to their filters without waiting for a refresh.
+
+    Parameters:
+        username (str): Username of a new account.
+        email (str): Email of a new account or an updated email.
+
+    Returns:
+        out (List[Tuple[str, str]]): Log name and key of each entry.
+    """
+    entries = []
+
+    if username:
+        entries.append((LOG_NAME, f"username:{normalize(username)}"))
+
+    if email:
+        entries.append((LOG_NAME, f"email:{normalize(email)}"))
+
+    return entries
+
+def _apply_logged(key: str) -> None:
+    kind, _, value = key.partition(":")
+    _add(kind, value)
+
+invalidation.register(LOG_NAME, _apply_logged)
+
+def _may_exist(kind: str, value: str) -> bool:
+    bloom = _usernames if kind == "username" else _emails
+
+    # Until the filters are built every value has to be checked in the database
+    if bloom is None:
+        return True
+
+    if normalize(value) in bloom:
+        return True
+
+    _stats["definitelyFree"] += 1
+    return False
+
+def username_may_exist(username: str) -> bool:
+    """
+    Check the filter for a username.
+
+    Parameters:
+        username (str): Username to check.
+
+    Returns:
+        out (bool): False if no account uses the username. True if it might be used and the database has to be checked.
+    """
+    return _may_exist("username", username)
+
+def email_may_exist(email: str) -> bool:
+    """
+    Check the filter for an email.
+
+    Parameters:
+        email (str): Email to check.
+
+    Returns:
+        out (bool): False if no account uses the email. True if it might be used and the database has to be checked.
+    """
+    return _may_exist("email", email)
+
+def record_probe(found: bool) -> None:
+    """
+    Count a database check made after the filter reported a possible match.
+
+    Parameters:
+        found (bool): If the database found the value.
+    """
+    # Checks made before the filters were built say nothing about them
+    if _usernames is None:
+        return
+
+    _stats["probes"] += 1
+
+    if not found:
+        _stats["falsePositives"] += 1
+
+def _read_accounts(after_id: int) -> Tuple[List[Tuple[str, Optional[str]]], int]:
+    # Stream accounts in id order so the whole table is never held in memory at once
+    conn = connections.get_connection()
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT id, username, email FROM accounts WHERE id > %s ORDER BY id LIMIT %s",
+        (after_id, PAGE_SIZE)
+    )
+    rows = cursor.fetchall()
+    conn.close()
+
+    accounts = [(str(row[1]), str(row[2]) if row[2] else None) for row in rows]
+    last_id = int(str(rows[-1][0])) if rows else after_id
+
+    return accounts, last_id
+
+def _count_accounts() -> int:
+    conn = connections.get_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT COUNT(*) FROM accounts")
+    row = cursor.fetchone()
+    conn.close()
+
+    return int(str(row[0])) if row else 0
+
+def rebuild() -> int:
+    """
+    Build new filters from every account in the database and swap them in.
+    Rebuilding also drops usernames and emails that are no longer used.
+
+    Returns:
+        out (int): Number of accounts added to the filters.
+    """
+    global _usernames, _emails, _last_id, _pending
+
+    capacity = int(config.get_key("availability-filter-capacity") or 1000000)
+    error_rate = float(config.get_key("availability-filter-error-rate") or 0.01)
+
+    with _lock:
+        _pending = []
+
+    try:
+        # Leave room for the accounts created before the next rebuild
+        capacity = max(capacity, _count_accounts() * 2)
+        usernames = BloomFilter(capacity, error_rate)
+        emails = BloomFilter(capacity, error_rate)
+        last_id = 0
+
+        while True:
+            accounts, last_id = _read_accounts(last_id)
+
+            for username, email in accounts:
+                usernames.add(normalize(username))
+
+                if email:
+                    emails.add(normalize(email))
+
+            if len(accounts) < PAGE_SIZE:
+                break
+
+        with _lock:
+            # Replay additions made while the database was being read
+            for kind, key in _pending or []:
+                (usernames if kind == "username" else emails).add(key)
+
+            _usernames, _emails, _last_id = usernames, emails, last_id
+    finally:
+        with _lock:
+            _pending = None
+
+    return usernames.count
+
+def refresh() -> int:
+    """
+    Add accounts created since the filters were last built or refreshed.
+    Catches accounts created by other workers whose log entries were missed.
+    Changed emails are only caught by the log and the next rebuild, so writes must not trust a filter miss.
+
+    Returns:
+        out (int): Number of accounts added to the filters.
+    """
+    global _last_id
+
+    if _usernames is None:
+        return 0
+
+    added = 0
+
+    while True:
+        accounts, last_id = _read_accounts(_last_id)
+
+        for username, email in accounts:
+            add_username(username)
+
+            if email:
+                add_email(email)
+
+        added += len(accounts)
+        _last_id = last_id
+
+        if len(accounts) < PAGE_SIZE:
+            return added
+
+def stats() -> Dict[str, Any]:
+    """
+    Get the metrics for the filters.
+
+    Returns:
+        out (dict): Size of the filters and how often they avoided a database check.
+    """
+    return {
+        "ready": _usernames is not None,
+        "usernames": _usernames.count if _usernames else 0,
+        "emails": _emails.count if _emails else 0,
+        "bytes": (len(_usernames.bits) + len(_emails.bits)) if _usernames and _emails else 0,
+        **_stats
+    }
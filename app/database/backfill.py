@@ -0,0 +1,178 @@
+import logging
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+from app.database import checkpoints
+from app.database import connections
+from app.database import versions
+
+logger = logging.getLogger(__name__)
+
+@dataclass(frozen=True)
+class Backfill:
+    """
+    An update applied to every row of a table, one page at a time.
+
+    - **table:** Table to walk. It is read in primary key order.
+    - **columns:** Columns read for each row, besides the 'id' primary key.
+    - **update:** Statement run for every row that needs changing.
+    - **transform:** Turns a row (id first, then the columns) into the parameters of the update,
+        or None if the row doesn't need changing.
+    - **versioned:** Set for backfills that change what the directory change feed serves. Each page takes
+        the next directory version, which is passed to the update before the parameters from the transform.
+    """
+    name: str
+    table: str
+    columns: Sequence[str]
+    update: str
+    transform: Callable[[Tuple[Any, ...]], Optional[Tuple[Any, ...]]]
+    versioned: bool = False
+
+@dataclass
+class BackfillProgress:
+    name: str
+    position: int
+    last_id: int
+    scanned: int = 0
+    updated: int = 0
+    started: float = field(default_factory=time.monotonic)
+    start_position: int = 0
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    @property
+    def fraction(self) -> float:
+        """
+        Share of the id range that has been walked.
+        """
+        return min(self.position / self.last_id, 1.0) if self.last_id else 1.0
+
+    @property
+    def eta(self) -> Optional[float]:
+        """
+        Estimated seconds left, based on how fast ids were walked so far.
+        """
+        walked = self.position - self.start_position
+
+        if walked <= 0:
+            return None
+
+        return max(self.last_id - self.position, 0) * self.elapsed / walked
+
+def _user_id(row: Tuple[Any, ...]) -> Optional[Tuple[Any, ...]]:
+    account_id, user_id = row
+
+    if user_id:
+        return None
+
+    return (str(uuid.uuid4()), account_id)
+
+# Backfills that can be run by name
+JOBS: Dict[str, Backfill] = {
+    "user_id": Backfill(
+        name="user_id",
+        table="accounts",
+        columns=["user_id"],
+        # Checked again in case the account got a user id since it was read
+        update="UPDATE accounts SET row_version = %s, user_id = %s WHERE id = %s AND user_id IS NULL",
+        transform=_user_id,
+        # Mirrors that synced the account without a user id pick up the new one
+        versioned=True
+    ),
+}
+
+def _last_id(table: str) -> int:
+    conn = connections.get_connection()
+    cursor = conn.cursor()
+
+    cursor.execute(f"SELECT MAX(id) FROM {table}")
+    row = cursor.fetchone()
+    conn.close()
+
+    return int(str(row[0])) if row and row[0] is not None else 0
+
+def run_backfill(
+    backfill: Backfill,
+    batch_size: int = 500,
+    throttle: float = 0,
+    dry_run: bool = False,
+    restart: bool = False,
+    on_progress: Optional[Callable[[BackfillProgress], None]] = None
+) -> BackfillProgress:
+    """
+    Walk a table by keyset pages and apply a backfill to the rows that need it.
+    Each page is updated and committed together with the checkpoint, so an interrupted
+    backfill continues after the last committed page when it is run again.
+
+    Parameters:
+        backfill (Backfill): The backfill to run.
+        batch_size (int): Rows read and updated per transaction.
+        throttle (float): Seconds to wait between pages, to leave room for other queries.
+        dry_run (bool): Count the rows that would change without changing them or saving the checkpoint.
+        restart (bool): Ignore the checkpoint and start from the first row.
+        on_progress (Callable[[BackfillProgress], None]): Called after every page.
+
+    Returns:
+        out (BackfillProgress): Totals for this run of the backfill.
+    """
+    job_name = f"backfill:{backfill.name}"
+    position = 0 if restart else checkpoints.get_checkpoint(job_name)
+
+    progress = BackfillProgress(
+        name=backfill.name,
+        position=position,
+        last_id=_last_id(backfill.table),
+        start_position=position
+    )
+
+    columns = ", ".join(["id", *backfill.columns])
+    query = f"SELECT {columns} FROM {backfill.table} WHERE id > %s ORDER BY id LIMIT %s"
+
+    while True:
+        conn = connections.get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute(query, (progress.position, batch_size))
+        rows = cursor.fetchall()
+
+        if not rows:
+            conn.close()
+            break
+
+        updates = [params for params in map(backfill.transform, rows) if params is not None]
+
+        if not dry_run:
+            if updates:
+                if backfill.versioned:
+                    version = versions.next_version(cursor)
+                    updates = [(version, *params) for params in updates]
+
+                cursor.executemany(backfill.update, updates)
+
+            checkpoints.save_checkpoint(cursor, job_name, int(str(rows[-1][0])))
+            conn.commit()
+
+        conn.close()
+
+        progress.position = int(str(rows[-1][0]))
+        progress.scanned += len(rows)
+        progress.updated += len(updates)
+
+        if on_progress:
+            on_progress(progress)
+
+        if len(rows) < batch_size:
+            break
+
+        if throttle:
+            time.sleep(throttle)
+
+    logger.info(
+        f"Backfill {backfill.name} {'dry run ' if dry_run else ''}finished: "
+        f"{progress.scanned} rows scanned, {progress.updated} {'to update' if dry_run else 'updated'}"
+    )
+
+    return progress
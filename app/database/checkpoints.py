@@ -0,0 +1,51 @@
+from mysql.connector.cursor import MySQLCursor
+from app.database import connections
+
+def get_checkpoint(job_name: str) -> int:
+    """
+    Get how far a job got.
+
+    Parameters:
+        job_name (str): Name of the job.
+
+    Returns:
+        out (int): Position saved by the job, or 0 if it never saved one.
+    """
+    conn = connections.get_connection()
+    cursor = conn.cursor()
+
+    cursor.execute("SELECT position FROM job_checkpoints WHERE job_name = %s", (job_name,))
+    row = cursor.fetchone()
+    conn.close()
+
+    return int(str(row[0])) if row else 0
+
+def save_checkpoint(cursor: MySQLCursor, job_name: str, position: int) -> None:
+    """
+    Save how far a job got using an existing cursor, so the checkpoint is committed together with the work it covers.
+
+    Parameters:
+        cursor (MySQLCursor): Cursor of the transaction.
+        job_name (str): Name of the job.
+        position (int): Position to resume from.
+    """
+    cursor.execute(
+        """INSERT INTO job_checkpoints (job_name, position) VALUES (%s, %s)
+           ON DUPLICATE KEY UPDATE position = VALUES(position)""",
+        (job_name, position)
+    )
+
+def clear_checkpoint(job_name: str) -> None:
+    """
+    Remove the checkpoint of a finished job.
+
+    Parameters:
+        job_name (str): Name of the job.
+    """
+    conn = connections.get_connection()
+    cursor = conn.cursor()
+
+    cursor.execute("DELETE FROM job_checkpoints WHERE job_name = %s", (job_name,))
+
+    conn.commit()
+    conn.close()
@@ -1,5 +1,6 @@
 from mysql.connector import MySQLConnection
 from app.database import connections
+from app.database import resolver
 from typing import Optional, cast, Tuple
 
 def check_user_exists_by_id(
@@ -63,11 +64,38 @@ def get_user_id(username: str) -> Optional[str]:
     Returns:
         out (Optional[str]): The id of the user or None if user not found.
     """
-    conn = connections.get_connection()
+    return resolver.get_user_id(username) or None
+
+def acquire_named_lock(conn: MySQLConnection, name: str) -> bool:
+    """
+    Try to take a MySQL named lock without waiting.
+    The lock is held until it is released or the connection is closed.
+
+    Parameters:
+        conn (MySQLConnection): The connection that will hold the lock.
+        name (str): Name of the lock.
+
+    Returns:
+        out (bool): If the lock was acquired.
+    """
     cursor = conn.cursor()
 
-    cursor.execute("SELECT user_id FROM accounts WHERE username = %s", (username,))
-    userRaw = cursor.fetchone()
-    user = cast(str, userRaw[0]) if userRaw else None
+    cursor.execute("SELECT GET_LOCK(%s, 0)", (name,))
+    result = cast(Optional[Tuple[int]], cursor.fetchone())
+    cursor.close()
+
+    return bool(result and result[0] == 1)
+
+def release_named_lock(conn: MySQLConnection, name: str) -> None:
+    """
+    Release a MySQL named lock held by a connection.
+
+    Parameters:
+        conn (MySQLConnection): The connection holding the lock.
+        name (str): Name of the lock.
+    """
+    cursor = conn.cursor()
 
-    return user
\ No newline at end of file
+    cursor.execute("SELECT RELEASE_LOCK(%s)", (name,))
+    cursor.fetchone()
+    cursor.close()
@@ -8,12 +8,14 @@ def get_connection():
         "user": get_key('mysql-user'),
         "password": get_key('mysql-password'),
         "database": get_key('mysql-database'), 
+        # Report matched rows instead of changed rows so cursor.rowcount can detect missing users
+        "client_flags": [ClientFlag.FOUND_ROWS],
     }
 
     # Check if SSL is enabled
     if get_key('mysql-ssl'):
         # Add ssl get_key( to connection
-        mysql_configs['client_flags'] = [ClientFlag.SSL]
+        mysql_configs['client_flags'].append(ClientFlag.SSL)
         mysql_configs['ssl_ca'] = get_key('mysql-cert-path')
 
     conn = connect(**mysql_configs)
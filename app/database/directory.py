@@ -0,0 +1,160 @@
+from typing import Iterator, List, Tuple
+from app.database import connections
+from app.database import versions
+from app.database.rows import Principal
+
+# Sorts after every account id, used for cursors that point past a whole version
+END_OF_VERSION = 2 ** 63 - 1
+
+def encode_cursor(version: int, account_id: int = END_OF_VERSION) -> str:
+    """
+    Make a change feed cursor.
+
+    Parameters:
+        version (int): Directory version of the last change read.
+        account_id (int): Id of the last account read at that version. Leave out to point past the whole version.
+
+    Returns:
+        out (str): The cursor.
+    """
+    if account_id == END_OF_VERSION:
+        return str(version)
+
+    return f"{version}.{account_id}"
+
+def decode_cursor(cursor: str) -> Tuple[int, int]:
+    """
+    Read a change feed cursor.
+
+    Parameters:
+        cursor (str): Cursor made by encode_cursor().
+
+    Raises:
+        ValueError: The cursor is not valid.
+
+    Returns:
+        out (Tuple[int, int]): Directory version and account id of the last change read.
+    """
+    version, _, account_id = cursor.partition(".")
+    return int(version), int(account_id) if account_id else END_OF_VERSION
+
+def get_changes(after_version: int, after_id: int, limit: int) -> List[Principal]:
+    """
+    Get the accounts that changed after a point in the change feed, oldest change first.
+    Accounts that changed more than once are returned once with their current state.
+
+    Parameters:
+        after_version (int): Directory version of the last change read.
+        after_id (int): Id of the last account read at that version.
+        limit (int): Most accounts to return.
+
+    Returns:
+        out (List[Principal]): The changed accounts with their permission nodes.
+    """
+    conn = connections.get_connection()
+    cursor = conn.cursor()
+
+    # The default limit of 1024 bytes would cut off long permission lists
+    cursor.execute("SET SESSION group_concat_max_len = 1048576")
+
+    # Pick the page of accounts first so permissions are only joined for those
+    cursor.execute(
+        """SELECT a.id, a.user_id, a.username, a.role, a.row_version,
+                  GROUP_CONCAT(p.node ORDER BY p.node SEPARATOR '\\n')
+           FROM (
+               SELECT id, user_id, username, role, row_version FROM accounts
+               WHERE row_version > %s OR (row_version = %s AND id > %s)
+               ORDER BY row_version, id LIMIT %s
+           ) a
+           LEFT JOIN permissions p ON p.account_id = a.user_id
+           GROUP BY a.id, a.user_id, a.username, a.role, a.row_version
+           ORDER BY a.row_version, a.id""",
+        (after_version, after_version, after_id, limit)
+    )
+    rows = cursor.fetchall()
+    conn.close()
+
+    return [
+        Principal(
+            id=int(str(row[0])),
+            user_id=str(row[1]) if row[1] else None,
+            username=str(row[2]),
+            role=str(row[3]) if row[3] else None,
+            permissions=str(row[5]).split("\n") if row[5] else [],
+            row_version=int(str(row[4]))
+        )
+        for row in rows
+    ]
+
+def iter_snapshot(page_size: int = 1000) -> Iterator[Principal]:
+    """
+    Streams every account that has a user id, with its permission nodes, in user id order.
+    All pages are read from one consistent snapshot of the database, so the accounts match the directory
+    at the highest row version among them.
+
+    Parameters:
+        page_size (int): Accounts read per query.
+
+    Returns:
+        out (Iterator[Principal]): The accounts.
+    """
+    conn = connections.get_connection()
+
+    try:
+        cursor = conn.cursor()
+
+        # The default limit of 1024 bytes would cut off long permission lists
+        cursor.execute("SET SESSION group_concat_max_len = 1048576")
+        conn.start_transaction(consistent_snapshot=True, readonly=True)
+
+        after_user_id = ""
+
+        while True:
+            cursor.execute(
+                """SELECT a.id, a.user_id, a.username, a.role, a.row_version,
+                          GROUP_CONCAT(p.node ORDER BY p.node SEPARATOR '\\n')
+                   FROM (
+                       SELECT id, user_id, username, role, row_version FROM accounts
+                       WHERE user_id > %s ORDER BY user_id LIMIT %s
+                   ) a
+                   LEFT JOIN permissions p ON p.account_id = a.user_id
+                   GROUP BY a.id, a.user_id, a.username, a.role, a.row_version
+                   ORDER BY a.user_id""",
+                (after_user_id, page_size)
+            )
+            rows = cursor.fetchall()
+
+            for row in rows:
+                after_user_id = str(row[1])
+
+                yield Principal(
+                    id=int(str(row[0])),
+                    user_id=after_user_id,
+                    username=str(row[2]),
+                    role=str(row[3]) if row[3] else None,
+                    permissions=str(row[5]).split("\n") if row[5] else [],
+                    row_version=int(str(row[4]))
+                )
+
+            if len(rows) < page_size:
+                break
+
+        conn.commit()
+    finally:
+        conn.close()
+
+def get_current_version() -> int:
+    """
+    Get the latest directory version.
+
+    Returns:
+        out (int): The version.
+    """
+    conn = connections.get_connection()
+    cursor = conn.cursor()
+
+    cursor.execute("SELECT version FROM row_versions WHERE name = %s", (versions.DIRECTORY,))
+    row = cursor.fetchone()
+    conn.close()
+
+    return int(str(row[0])) if row else 0
@@ -0,0 +1,121 @@
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Tuple
+from mysql.connector.cursor import MySQLCursor
+from app.database import connections
+from app.database import versions
+
+# Event kinds
+TOKEN_REVOKED = "token"
+ROLE_CHANGED = "role"
+PERMISSIONS_CHANGED = "permissions"
+
+@dataclass(slots=True)
+class PrincipalEvent:
+    id: int
+    user_id: str
+    kind: str
+    role: Optional[str]
+
+_listeners: List[Callable[[], None]] = []
+
+def add_listener(listener: Callable[[], None]) -> None:
+    """
+    Get called after events are committed by this process, so they can be pushed without waiting for the next poll.
+
+    Parameters:
+        listener (Callable[[], None]): Called from the thread that committed the events. Must not block.
+    """
+    _listeners.append(listener)
+
+def notify() -> None:
+    """
+    Tell the listeners that events were committed. Call after the transaction that recorded them.
+    """
+    for listener in _listeners:
+        listener()
+
+def record(cursor: MySQLCursor, events: List[Tuple[str, str, Optional[str]]]) -> None:
+    """
+    Record events using an existing cursor, so they are committed if and only if the change they describe is.
+
+    Parameters:
+        cursor (MySQLCursor): Cursor of the transaction making the change.
+        events (List[Tuple[str, str, Optional[str]]]): UserId, kind and new role of each event.
+    """
+    if not events:
+        return
+
+    # Ids are taken from a counter that stays locked until commit, so they become visible in order
+    last_id = versions.next_version(cursor, versions.PRINCIPAL_EVENTS, count=len(events))
+    first_id = last_id - len(events) + 1
+
+    cursor.executemany(
+        "INSERT INTO principal_events (id, user_id, kind, role) VALUES (%s, %s, %s, %s)",
+        [(first_id + index, user_id, kind, role) for index, (user_id, kind, role) in enumerate(events)]
+    )
+
+def get_events(after_id: int, limit: int) -> List[PrincipalEvent]:
+    """
+    Get events in the order they happened.
+
+    Parameters:
+        after_id (int): Only return events with a larger id.
+        limit (int): Most events to return.
+
+    Returns:
+        out (List[PrincipalEvent]): The events.
+    """
+    conn = connections.get_connection()
+    cursor = conn.cursor()
+
+    cursor.execute(
+        "SELECT id, user_id, kind, role FROM principal_events WHERE id > %s ORDER BY id LIMIT %s",
+        (after_id, limit)
+    )
+    rows = cursor.fetchall()
+    conn.close()
+
+    return [
+        PrincipalEvent(id=int(str(row[0])), user_id=str(row[1]), kind=str(row[2]), role=str(row[3]) if row[3] else None)
+        for row in rows
+    ]
+
+def get_last_event_id() -> int:
+    """
+    Get the id of the latest committed event.
+
+    Returns:
+        out (int): The id, or 0 if there are no events.
+    """
+    conn = connections.get_connection()
+    cursor = conn.cursor()
+
+    cursor.execute("SELECT MAX(id) FROM principal_events")
+    row = cursor.fetchone()
+    conn.close()
+
+    return int(str(row[0])) if row and row[0] is not None else 0
+
+def purge_events(max_age: int) -> int:
+    """
+    Delete old events.
+
+    Parameters:
+        max_age (int): Seconds events are kept for.
+
+    Returns:
+        out (int): Number of events deleted.
+    """
+    conn = connections.get_connection()
+    cursor = conn.cursor()
+
+    cursor.execute(
+        "DELETE FROM principal_events WHERE created_at < NOW(3) - INTERVAL %s SECOND LIMIT 10000",
+        (max_age,)
+    )
+    deleted = cursor.rowcount
+
+    conn.commit()
+    conn.close()
+
+    return deleted
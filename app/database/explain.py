@@ -0,0 +1,182 @@
+import ast
+import os
+import re
+import sys
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Union, cast
+from mysql.connector.cursor import MySQLCursorDict
+from app.database import connections
+
+DATABASE_DIRECTORY = os.path.dirname(__file__)
+
+# Tooling modules that don't run application queries
+EXCLUDED_MODULES = {"explain.py", "migrate.py", "backfill.py"}
+
+# Queries marked with this comment are expected to read the whole table
+ALLOW_FULL_SCAN = "explain: allow-full-scan"
+
+# Values used for f-string parts when building queries to explain
+SUBSTITUTIONS = {
+    "placeholders": "%s",
+    "format_strings": "%s",
+    "searchColumn": "username",
+    "search_column": "username",
+}
+
+@dataclass
+class Query:
+    path: str
+    line: int
+    sql: Optional[str]
+    allow_full_scan: bool
+
+def _build_sql(node: ast.expr) -> Optional[str]:
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        return node.value
+
+    if isinstance(node, ast.JoinedStr):
+        parts = []
+
+        for value in node.values:
+            if isinstance(value, ast.Constant):
+                parts.append(str(value.value))
+            elif isinstance(value, ast.FormattedValue) and isinstance(value.value, ast.Name) \
+                    and value.value.id in SUBSTITUTIONS:
+                parts.append(SUBSTITUTIONS[value.value.id])
+            else:
+                # The query can't be rebuilt without running the code
+                return None
+
+        return "".join(parts)
+
+    return None
+
+def _find_assignment(function: ast.AST, name: str, line: int) -> Optional[ast.expr]:
+    # Find the last value assigned to a variable before it was used
+    value = None
+
+    for node in ast.walk(function):
+        if isinstance(node, ast.Assign) and node.lineno < line:
+            for target in node.targets:
+                if isinstance(target, ast.Name) and target.id == name:
+                    if value is None or node.lineno > value[0]:
+                        value = (node.lineno, node.value)
+
+    return value[1] if value else None
+
+def find_queries(directory: str = DATABASE_DIRECTORY) -> List[Query]:
+    """
+    Find the SQL queries passed to cursor.execute() and cursor.executemany() in the database modules.
+
+    Parameters:
+        directory (str): Folder with the database modules.
+
+    Returns:
+        out (List[Query]): The queries found. Queries that can't be rebuilt have no SQL.
+    """
+    queries = []
+
+    for filename in sorted(os.listdir(directory)):
+        if not filename.endswith(".py") or filename in EXCLUDED_MODULES:
+            continue
+
+        path = os.path.join(directory, filename)
+
+        with open(path, "r") as file:
+            source = file.read()
+
+        lines = source.splitlines()
+        tree = ast.parse(source)
+
+        for function in ast.walk(tree):
+            if not isinstance(function, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                continue
+
+            for node in ast.walk(function):
+                if not (
+                    isinstance(node, ast.Call)
+                    and isinstance(node.func, ast.Attribute)
+                    and node.func.attr in ("execute", "executemany")
+                    and node.args
+                ):
+                    continue
+
+                argument: Union[ast.expr, None] = node.args[0]
+
+                if isinstance(argument, ast.Name):
+                    argument = _find_assignment(function, argument.id, node.lineno)
+
+                # The pragma may be on the line of the call or the line above it
+                nearby = " ".join(lines[max(node.lineno - 2, 0):node.lineno])
+
+                queries.append(Query(
+                    path=os.path.relpath(path),
+                    line=node.lineno,
+                    sql=_build_sql(argument) if argument is not None else None,
+                    allow_full_scan=ALLOW_FULL_SCAN in nearby
+                ))
+
+    return queries
+
+def _explainable(sql: str) -> bool:
+    statement = " ".join(sql.split()).upper()
+
+    if statement.startswith("INSERT"):
+        return " SELECT " in statement
+
+    if statement.startswith(("UPDATE", "DELETE")):
+        return True
+
+    # Skip statements that don't read a table, such as SELECT GET_LOCK()
+    return statement.startswith("SELECT") and " FROM " in statement
+
+def explain(cursor: MySQLCursorDict, sql: str) -> List[Dict]:
+    """
+    Get the query plan for a query, using dummy values for its parameters.
+
+    Parameters:
+        cursor (MySQLCursorDict): Cursor to run EXPLAIN with.
+        sql (str): The query.
+
+    Returns:
+        out (List[Dict]): Rows returned by EXPLAIN.
+    """
+    sql = re.sub(r"LIMIT\s+%s", "LIMIT 1", sql, flags=re.IGNORECASE)
+    sql = sql.replace("%s", "'0'")
+
+    cursor.execute(f"EXPLAIN {sql}")
+    return cast(List[Dict], cursor.fetchall())
+
+def main() -> None:
+    conn = connections.get_connection()
+    cursor = cast(MySQLCursorDict, conn.cursor(dictionary=True))
+    problems = 0
+
+    for query in find_queries():
+        location = f"{query.path}:{query.line}"
+
+        if query.sql is None:
+            print(f"SKIPPED   {location}: query is built dynamically")
+            continue
+
+        if not _explainable(query.sql):
+            continue
+
+        for row in explain(cursor, query.sql):
+            # A type of ALL means every row of the table is read
+            if row.get("type") == "ALL" and not query.allow_full_scan:
+                problems += 1
+                print(f"FULL SCAN {location}: table '{row.get('table')}'")
+                print(f"          {' '.join(query.sql.split())}")
+
+    conn.rollback()
+    conn.close()
+
+    if problems:
+        print(f"{problems} queries would scan a whole table.")
+        sys.exit(1)
+
+    print("No full table scans found.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+from dataclasses import dataclass
+from typing import List
+from app.database import checkpoints
+from app.database import connections
+from app.database import versions
+from app.database import invalidations
+from app.database import profiles
+from app.database import resolver
+from app.database import availability
+
+@dataclass(slots=True)
+class NewAccount:
+    row: int
+    username: str
+    email: str
+    password_hash: str
+    salt: str
+    token: str
+    user_id: str
+    pronouns: str
+
+@dataclass(slots=True)
+class Conflict:
+    account: NewAccount
+    reason: str
+
+def insert_accounts(accounts: List[NewAccount], job_name: str, position: int) -> List[Conflict]:
+    """
+    Insert a batch of accounts in one transaction and save the import checkpoint with it.
+    Accounts whose username or email is already in use are skipped and returned as conflicts.
+
+    Parameters:
+        accounts (List[NewAccount]): Accounts to insert.
+        job_name (str): Name of the import checkpoint.
+        position (int): Number of input rows handled once this batch is committed.
+
+    Returns:
+        out (List[Conflict]): Accounts that were not inserted and why.
+    """
+    conn = connections.get_connection()
+    cursor = conn.cursor()
+    conflicts: List[Conflict] = []
+
+    if accounts:
+        # Only unique key errors are absorbed, any other error still fails the batch.
+        # executemany sends the whole batch as one multi-row insert.
+        version = versions.next_version(cursor)
+
+        cursor.executemany(
+            """INSERT INTO accounts (username, password, email, token, salt, bio, pronouns, user_id, row_version)
+               VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+               ON DUPLICATE KEY UPDATE id = id""",
+            [
+                (account.username, account.password_hash, account.email, account.token,
+                 account.salt, None, account.pronouns, account.user_id, version)
+                for account in accounts
+            ]
+        )
+
+        # Accounts that hit a unique key kept the existing row, so their new user id is missing
+        placeholders = ", ".join(["%s"] * len(accounts))
+        cursor.execute(
+            f"SELECT user_id FROM accounts WHERE user_id IN ({placeholders})",
+            [account.user_id for account in accounts]
+        )
+        inserted = {str(row[0]) for row in cursor.fetchall()}
+        skipped = [account for account in accounts if account.user_id not in inserted]
+
+        if skipped:
+            conflicts = _conflict_reasons(cursor, skipped)
+
+        # Other workers may have cached that the new accounts don't exist
+        invalidations.record(cursor, [
+            entry
+            for account in accounts if account.user_id in inserted
+            for entry in resolver.stale_entries(account.username, account.user_id)
+                + profiles.stale_entries(account.username)
+                + availability.stale_entries(account.username, account.email)
+        ])
+
+    checkpoints.save_checkpoint(cursor, job_name, position)
+
+    conn.commit()
+    conn.close()
+
+    return conflicts
+
+def _conflict_reasons(cursor, skipped: List[NewAccount]) -> List[Conflict]:
+    # Find out which unique key each skipped account ran into
+    placeholders = ", ".join(["%s"] * len(skipped))
+    cursor.execute(
+        f"SELECT username, email FROM accounts WHERE username IN ({placeholders}) OR email IN ({placeholders})",
+        [account.username for account in skipped] + [account.email for account in skipped]
+    )
+
+    rows = cursor.fetchall()
+    usernames = {str(username).casefold() for username, _ in rows}
+    emails = {str(email).casefold() for _, email in rows}
+
+    conflicts = []
+
+    for account in skipped:
+        taken = []
+
+        if account.username.casefold() in usernames:
+            taken.append("username")
+
+        if account.email.casefold() in emails:
+            taken.append("email")
+
+        conflicts.append(Conflict(account, " and ".join(taken) + " in use" if taken else "conflict"))
+
+    return conflicts
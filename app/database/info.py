@@ -1,8 +1,12 @@
+import base64
 from app.database import connections
-from typing import Tuple, Optional, cast, Literal, Dict, List
+from typing import Tuple, Optional, cast, Literal, Dict, Iterator, List, Set
 from app.database import exceptions as db_exceptions
+from app.database import profiles
+from app.database import resolver
+from app.database import availability
+from app.database.rows import AccountInfo, ExportedAccount, MailRecipient
 from app.models import database as db_models
-from mysql.connector.cursor import MySQLCursorDict
 
 def get_password_salt(username: str) -> Optional[str]:
     """
@@ -41,6 +45,7 @@ def retrieve_user_token(username: str) -> Optional[str]:
     # Get token from database
     cursor.execute("SELECT token FROM accounts WHERE username = %s", (username,))
     raw = cursor.fetchone()
+    conn.close()
     token = cast(Optional[Tuple[str]], raw)
 
     return token[0] if token else None
@@ -55,19 +60,12 @@ def get_bio(username: str) -> Optional[str]:
     Returns:
         out (str): Bio of the user.
     """
-    conn = connections.get_connection()
-    cursor = conn.cursor()
-
-    cursor.execute("SELECT bio FROM accounts WHERE username = %s", (username,))
-    raw = cursor.fetchone()
-    conn.close()
+    profile = profiles.get_profile(username)
 
-    if not raw:
+    if not profile:
         raise db_exceptions.UserNotFound()
-    
-    bio = cast(Optional[Tuple[str]], raw)
-    
-    return bio[0] if bio else None
+
+    return profile.bio
 
 def get_pronouns(username) -> Optional[str]:
     """
@@ -79,19 +77,12 @@ def get_pronouns(username) -> Optional[str]:
     Returns:
         out (str): Pronouns for the account.
     """
-    conn = connections.get_connection()
-    cursor = conn.cursor()
+    profile = profiles.get_profile(username)
 
-    cursor.execute("SELECT pronouns FROM accounts WHERE username = %s", (username,))
-    raw = cursor.fetchone()
-    conn.close()
-
-    if not raw:
+    if not profile:
         raise db_exceptions.UserNotFound()
-    
-    pronouns = cast(Optional[Tuple[str]], raw)
 
-    return pronouns[0] if pronouns else None
+    return profile.pronouns
 
 def get_user_email(username: str) -> Optional[str]:
     """
@@ -131,40 +122,64 @@ def get_bulk_emails(
     Returns:
         out (list): List of emails for each account. 
     """
-    conn = connections.get_connection()
-    cursor = conn.cursor()
+    emails = []
+    seen = set()
 
-    # Check search mode
-    if search_mode == "userID":
-        search_column = "user_id"
-    else:
-        search_column = "username"
+    # Look the accounts up in bounded chunks instead of one query for the whole list
+    for _, account in iter_bulk_emails(accounts, search_mode):
+        if not account or account.username in seen:
+            continue
 
-    # Create placeholders for the list of values
-    placeholders = ', '.join(['%s'] * len(accounts))
+        seen.add(account.username)
+        emails.append({"username": account.username, "email": account.email})
 
-    # Generate the SQL query dynamically with parameter placeholders
-    query = f"SELECT username, email FROM accounts WHERE {search_column} IN ({placeholders})"
+    return emails
 
-    # Execute the query with the list of values
-    cursor.execute(query, accounts)
+def iter_bulk_emails(
+    accounts: List[str],
+    search_mode: Literal["userID", "username"],
+    chunk_size: int = 500
+) -> Iterator[Tuple[str, Optional[MailRecipient]]]:
+    """
+    Streams the username and email of many accounts, in the order they were requested.
+    Accounts are looked up in chunks on a single connection so no query grows with the size of the request.
 
-    # Fetch the results
-    found_accounts = cursor.fetchall()
-    conn.close()
+    Parameters:
+        accounts (List[str]): Usernames or user ids of the accounts.
+        search_mode (str): Specify if the accounts parameter is a list of 'userID' or 'username'.
+        chunk_size (int): Accounts looked up per query.
 
-    emails = []
+    Returns:
+        out (Iterator[Tuple[str, Optional[MailRecipient]]]): Each requested account with its username and email, or None if it was not found.
+    """
+    search_column = "user_id" if search_mode == "userID" else "username"
 
-    for account in found_accounts:
-        username = account[0] if account and isinstance(account[0], str) else None
-        email = account[1] if account and isinstance(account[1], str) else None
+    # Usernames are compared case-insensitively by the database
+    def key(value: str) -> str:
+        return value.casefold() if search_mode == "username" else value
 
-        if not username or not email:
-            continue
+    conn = connections.get_connection()
 
-        emails.append({"username": username, "email": email})
+    try:
+        cursor = conn.cursor()
 
-    return emails
+        for start in range(0, len(accounts), chunk_size):
+            chunk = accounts[start:start + chunk_size]
+            placeholders = ', '.join(['%s'] * len(chunk))
+
+            cursor.execute(
+                f"SELECT {search_column}, username, email FROM accounts WHERE {search_column} IN ({placeholders})",
+                chunk
+            )
+            found = {
+                key(str(row[0])): MailRecipient(username=str(row[1]), email=str(row[2]))
+                for row in cursor.fetchall() if row[2]
+            }
+
+            for account in chunk:
+                yield account, found.get(key(account))
+    finally:
+        conn.close()
 
 def get_username(account_id: str) -> str:
     """
@@ -176,19 +191,12 @@ def get_username(account_id: str) -> str:
     Returns:
         out (str): Username for the account.
     """
-    conn = connections.get_connection()
-    cursor = conn.cursor()
-
-    cursor.execute("SELECT username FROM accounts WHERE user_id = %s", (account_id,))
-    raw = cursor.fetchone()
-    conn.close()
+    username = resolver.get_username(account_id)
 
-    if not raw:
+    if not username:
         raise db_exceptions.UserNotFound()
-    
-    username = cast(Tuple[str], raw)
 
-    return username[0]
+    return username
 
 def get_user_id(username: str) -> str:
     """
@@ -200,19 +208,37 @@ def get_user_id(username: str) -> str:
     Returns:
         out (str): Id of the user.
     """
+    userId = resolver.get_user_id(username)
+
+    if userId is None:
+        raise db_exceptions.UserNotFound()
+
+    # Accounts without a user id give None, callers check for it
+    return cast(str, userId or None)
+
+def get_existing_usernames(usernames: List[str]) -> Set[str]:
+    """
+    Checks which usernames from a list belong to an account.
+
+    Parameters:
+        usernames (List[str]): Usernames to check.
+
+    Returns:
+        out (Set[str]): The usernames that exist, as stored in the database.
+    """
+    if not usernames:
+        return set()
+
     conn = connections.get_connection()
     cursor = conn.cursor()
 
-    cursor.execute("SELECT user_id FROM accounts WHERE username = %s", (username,))
-    raw = cursor.fetchone()
+    # Check every username in one round trip
+    placeholders = ', '.join(['%s'] * len(usernames))
+    cursor.execute(f"SELECT username FROM accounts WHERE username IN ({placeholders})", usernames)
+    found = cursor.fetchall()
     conn.close()
 
-    if not raw:
-        raise db_exceptions.UserNotFound()
-    
-    userId = cast(Tuple[str], raw)
-
-    return userId[0]
+    return {str(row[0]) for row in found if row}
 
 def check_if_user_exists(user: str) -> bool:
     """
@@ -224,12 +250,18 @@ def check_if_user_exists(user: str) -> bool:
     Returns:
         out (bool): If the user exists.
     """
+    # Usernames missing from the filter definitely don't exist
+    if not availability.username_may_exist(user):
+        return False
+
     conn = connections.get_connection()
     cursor = conn.cursor()
 
-    cursor.execute("SELECT * FROM accounts WHERE username = %s", (user,))
+    cursor.execute("SELECT 1 FROM accounts WHERE username = %s LIMIT 1", (user,))
     data = cursor.fetchone()
-    cursor.close()
+    conn.close()
+
+    availability.record_probe(bool(data))
 
     return True if data else False
     
@@ -258,68 +290,174 @@ def get_role(username: str) -> Optional[str]:
     return role[0] if role else None
 
 
-def get_all_accounts() -> Optional[list]:
+def iter_mail_recipients(page_size: int = 1000, after_id: int = 0) -> Iterator[MailRecipient]:
     """
-    Gets all Lif Accounts.
+    Streams the username and email of every Lif Account in id order.
+    Accounts are read a page at a time using the primary key, so memory use
+    stays the same no matter how many accounts there are.
+
+    Parameters:
+        page_size (int): Accounts read per query.
+        after_id (int): Only return accounts with a larger id.
+
+    Returns:
+        out (Iterator[MailRecipient]): The accounts.
     """
     conn = connections.get_connection()
-    cursor = conn.cursor()
 
-    cursor.execute("SELECT * FROM accounts")
-    accounts = cursor.fetchall()
-    conn.close()
+    try:
+        # Unbuffered cursor so rows are read from the server as they are used
+        cursor = conn.cursor(buffered=False)
+
+        while True:
+            cursor.execute(
+                "SELECT id, username, email FROM accounts WHERE id > %s ORDER BY id LIMIT %s",
+                (after_id, page_size)
+            )
+            rows = cursor.fetchall()
 
-    return accounts
+            for row in rows:
+                after_id = int(str(row[0]))
 
-def search_users(query: str) -> List[db_models.UserSearch]:
+                # Accounts without an email can't be mailed
+                if row[2]:
+                    yield MailRecipient(username=str(row[1]), email=str(row[2]), account_id=after_id)
+
+            if len(rows) < page_size:
+                break
+    finally:
+        conn.close()
+
+def iter_account_export(page_size: int = 1000, after_id: int = 0) -> Iterator[ExportedAccount]:
     """
-    Search users in the database.
+    Streams every Lif Account with its permission nodes in id order.
+    Permissions are aggregated by the database, so each account is one row.
 
     Parameters:
-        query (str): The user to search.
+        page_size (int): Accounts read per query.
+        after_id (int): Only return accounts with a larger id.
 
     Returns:
-        out (List[UserSearch]): List of results from the search.
+        out (Iterator[ExportedAccount]): The accounts.
     """
     conn = connections.get_connection()
-    cursor = cast(MySQLCursorDict, conn.cursor(dictionary=True))
-
-    # Search database for users
-    cursor.execute("""SELECT username, user_id, role FROM accounts 
-                   WHERE username LIKE %s
-                   LIMIT 20""",
-                   (query,))
-    resultsRAW = cursor.fetchall()
-    results: list[db_models.UserSearch] = []
-
-    for result in resultsRAW:
-        if not result: continue
-
-        results.append(db_models.UserSearch(
-            userId=str(result["user_id"]),
-            username=str(result["username"]),
-            role=str(result["role"]),
-            permissions=[]
-        ))
-
-    # Add list of permissions to each result
-    user_ids = [result.userId for result in results]
-    format_strings = ','.join(['%s'] * len(user_ids))
-
-    sqlQuery = f"SELECT account_id, node FROM permissions WHERE account_id IN ({format_strings})"
-    cursor.execute(sqlQuery, user_ids)
-    permissions = cursor.fetchall()
-    conn.close()
 
-    for permission in permissions:
-        if not permission: continue
+    try:
+        # Unbuffered cursor so rows are read from the server as they are used
+        cursor = conn.cursor(buffered=False)
+
+        # The default limit of 1024 bytes would cut off long permission lists
+        cursor.execute("SET SESSION group_concat_max_len = 1048576")
 
-        for result in results:
-            if result.userId: result.permissions.append(
-                str(permission["node"])
+        while True:
+            cursor.execute(
+                """SELECT a.id, a.user_id, a.username, a.role, a.`2fa_enabled`,
+                          GROUP_CONCAT(p.node ORDER BY p.node SEPARATOR '\\n')
+                   FROM accounts a LEFT JOIN permissions p ON p.account_id = a.user_id
+                   WHERE a.id > %s GROUP BY a.id ORDER BY a.id LIMIT %s""",
+                (after_id, page_size)
             )
+            rows = cursor.fetchall()
+
+            for row in rows:
+                after_id = int(str(row[0]))
+
+                yield ExportedAccount(
+                    id=after_id,
+                    user_id=str(row[1]) if row[1] else None,
+                    username=str(row[2]),
+                    role=str(row[3]) if row[3] else None,
+                    two_fa_enabled=bool(row[4]),
+                    permissions=str(row[5]).split("\n") if row[5] else []
+                )
+
+            if len(rows) < page_size:
+                break
+    finally:
+        conn.close()
+
+def _like_prefix(value: str) -> str:
+    # Match the value literally, then anything after it
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+def search_users(
+    query: str,
+    search_mode: Literal["username", "userID", "email"] = "username",
+    page_cursor: Optional[str] = None,
+    limit: int = 20,
+    literal: bool = True
+) -> db_models.UserSearchPage:
+    """
+    Search users whose username, user id or email starts with a query.
+    Results are sorted by the searched column and read by keyset, with their permission nodes in the same query.
+
+    Parameters:
+        query (str): Start of the value to search for. It is matched literally, '%' and '_' are not wildcards.
+        search_mode (str): Search the 'username', 'userID' or 'email' of accounts.
+        page_cursor (str): Cursor returned with the last page. Leave out for the first page.
+        limit (int): Most results to return.
+        literal (bool): Set to False to use the query as a LIKE pattern, as the v1 search did.
+            It then only matches values starting with it if it ends with '%'.
+
+    Raises:
+        ValueError: The cursor is not valid.
+
+    Returns:
+        out (UserSearchPage): The results, the cursor for the next page and if there are more results.
+    """
+    search_column = {"userID": "user_id", "email": "email"}.get(search_mode, "username")
+
+    after = ""
+    next_cursor = page_cursor
 
-    return results
+    if page_cursor is not None:
+        try:
+            padded = page_cursor + "=" * (-len(page_cursor) % 4)
+            after = base64.b64decode(padded, altchars=b"-_", validate=True).decode()
+        except (ValueError, UnicodeDecodeError):
+            raise ValueError("Invalid cursor.")
+
+    conn = connections.get_connection()
+    cursor = conn.cursor()
+
+    # The default limit of 1024 bytes would cut off long permission lists
+    cursor.execute("SET SESSION group_concat_max_len = 1048576")
+
+    # The searched columns are unique, so the last value read is enough to continue from.
+    # Pick the page of accounts first so permissions are only joined for those.
+    cursor.execute(
+        f"""SELECT a.user_id, a.username, a.role, a.position,
+                   GROUP_CONCAT(p.node ORDER BY p.node SEPARATOR '\\n')
+            FROM (
+                SELECT user_id, username, role, {search_column} AS position FROM accounts
+                WHERE {search_column} LIKE %s AND {search_column} > %s
+                ORDER BY {search_column} LIMIT %s
+            ) a
+            LEFT JOIN permissions p ON p.account_id = a.user_id
+            GROUP BY a.user_id, a.username, a.role, a.position
+            ORDER BY a.position""",
+        (_like_prefix(query) if literal else query, after, limit + 1)
+    )
+    rows = cursor.fetchall()
+    conn.close()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    results = [
+        db_models.UserSearch(
+            userId=str(row[0]),
+            username=str(row[1]),
+            role=str(row[2]),
+            permissions=str(row[4]).split("\n") if row[4] else []
+        )
+        for row in rows
+    ]
+
+    if rows:
+        next_cursor = base64.urlsafe_b64encode(str(rows[-1][3]).encode()).decode().rstrip("=")
+
+    return db_models.UserSearchPage(results=results, cursor=next_cursor, hasMore=has_more)
 
 def get_user_info(account_id: str) -> db_models.UserInfo:
     """
@@ -332,20 +470,23 @@ def get_user_info(account_id: str) -> db_models.UserInfo:
         out (UserInfo): The user requested.
     """
     conn = connections.get_connection()
-    cursor = cast(MySQLCursorDict, conn.cursor(dictionary=True))
+    cursor = conn.cursor()
 
-    cursor.execute("SELECT * FROM accounts WHERE user_id = %s", (account_id,))
-    userInfo = cursor.fetchone()
+    cursor.execute("SELECT username, pronouns, bio, role FROM accounts WHERE user_id = %s", (account_id,))
+    row = cursor.fetchone()
 
-    if not userInfo:
+    if not row:
+        conn.close()
         raise db_exceptions.UserNotFound()
+
+    userInfo = AccountInfo(*row)
     
     user = db_models.UserInfo(
         userId=account_id,
-        username=str(userInfo["username"]),
-        pronouns=str(userInfo["pronouns"]),
-        bio=str(userInfo["bio"]),
-        role=str(userInfo["role"]),
+        username=str(userInfo.username),
+        pronouns=str(userInfo.pronouns),
+        bio=str(userInfo.bio),
+        role=str(userInfo.role),
         permissions=[]
     )
 
@@ -355,9 +496,8 @@ def get_user_info(account_id: str) -> db_models.UserInfo:
     permissions = cursor.fetchall()
     conn.close()
 
-    for node in permissions:
-        if not node: continue
-        user.permissions.append(str(node["node"]))
+    for node, in permissions:
+        user.permissions.append(str(node))
 
     return user
 
@@ -0,0 +1,107 @@
+import uuid
+from dataclasses import dataclass
+from typing import List, Tuple
+from mysql.connector.cursor import MySQLCursor
+from app.database import connections
+
+# Identifies this worker, so it can skip the invalidations it made itself
+WORKER_ID = uuid.uuid4().hex
+
+@dataclass(slots=True)
+class Invalidation:
+    id: int
+    cache_name: str
+    cache_key: str
+    origin: str
+    age_ms: float
+
+def record(cursor: MySQLCursor, entries: List[Tuple[str, str]]) -> None:
+    """
+    Log cache entries made stale by a write using an existing cursor,
+    so other workers evict them if and only if the write is committed.
+
+    Parameters:
+        cursor (MySQLCursor): Cursor of the transaction making the write.
+        entries (List[Tuple[str, str]]): Cache name and key of each stale entry.
+    """
+    if not entries:
+        return
+
+    cursor.executemany(
+        "INSERT INTO cache_invalidations (cache_name, cache_key, origin) VALUES (%s, %s, %s)",
+        [(name, key, WORKER_ID) for name, key in entries]
+    )
+
+def get_invalidations(after_id: int, limit: int) -> List[Invalidation]:
+    """
+    Get logged invalidations in id order.
+
+    Parameters:
+        after_id (int): Only return invalidations with a larger id.
+        limit (int): Most invalidations to return.
+
+    Returns:
+        out (List[Invalidation]): The invalidations, with how long ago the database logged them.
+    """
+    conn = connections.get_connection()
+    cursor = conn.cursor()
+
+    # The age is measured by the database so clock differences between servers don't skew it
+    cursor.execute(
+        """SELECT id, cache_name, cache_key, origin, TIMESTAMPDIFF(MICROSECOND, created_at, NOW(3))
+           FROM cache_invalidations WHERE id > %s ORDER BY id LIMIT %s""",
+        (after_id, limit)
+    )
+    rows = cursor.fetchall()
+    conn.close()
+
+    return [
+        Invalidation(
+            id=int(str(row[0])),
+            cache_name=str(row[1]),
+            cache_key=str(row[2]),
+            origin=str(row[3]),
+            age_ms=float(str(row[4])) / 1000
+        )
+        for row in rows
+    ]
+
+def get_last_id() -> int:
+    """
+    Get the id of the latest invalidation.
+
+    Returns:
+        out (int): The id, or 0 if the log is empty.
+    """
+    conn = connections.get_connection()
+    cursor = conn.cursor()
+
+    cursor.execute("SELECT MAX(id) FROM cache_invalidations")
+    row = cursor.fetchone()
+    conn.close()
+
+    return int(str(row[0])) if row and row[0] is not None else 0
+
+def purge_invalidations(max_age: int) -> int:
+    """
+    Delete old invalidations.
+
+    Parameters:
+        max_age (int): Seconds invalidations are kept for.
+
+    Returns:
+        out (int): Number of invalidations deleted.
+    """
+    conn = connections.get_connection()
+    cursor = conn.cursor()
+
+    cursor.execute(
+        "DELETE FROM cache_invalidations WHERE created_at < NOW(3) - INTERVAL %s SECOND LIMIT 10000",
+        (max_age,)
+    )
+    deleted = cursor.rowcount
+
+    conn.commit()
+    conn.close()
+
+    return deleted
@@ -0,0 +1,264 @@
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional, Set
+from app.database import connections
+
+@dataclass(slots=True)
+class Delivery:
+    username: str
+    email: str
+    status: str
+    attempts: int
+    error: Optional[str] = None
+    account_id: Optional[int] = None
+
+@dataclass(slots=True)
+class MailJob:
+    id: str
+    status: str
+    subject: str
+    text_body: str
+    html_body: Optional[str]
+    total: int
+    sent: int
+    failed: int
+    unknown: int
+    checkpoint: int
+    error: Optional[str]
+    created_at: Optional[datetime]
+    started_at: Optional[datetime]
+    finished_at: Optional[datetime]
+    # Seconds the job has been running, None if it hasn't started
+    elapsed: Optional[float]
+
+# The elapsed time is measured by the database so clock differences between servers don't skew it
+JOB_COLUMNS = """id, status, subject, text_body, html_body, total, sent, failed, unknown,
+                 checkpoint, error, created_at, started_at, finished_at,
+                 TIMESTAMPDIFF(MICROSECOND, started_at, COALESCE(finished_at, NOW(3)))"""
+
+def _to_job(row) -> MailJob:
+    return MailJob(
+        id=str(row[0]),
+        status=str(row[1]),
+        subject=str(row[2]),
+        text_body=str(row[3]),
+        html_body=str(row[4]) if row[4] is not None else None,
+        total=int(row[5]),
+        sent=int(row[6]),
+        failed=int(row[7]),
+        unknown=int(row[8]),
+        checkpoint=int(row[9]),
+        error=row[10],
+        created_at=row[11],
+        started_at=row[12],
+        finished_at=row[13],
+        elapsed=int(row[14]) / 1_000_000 if row[14] is not None else None
+    )
+
+def record_deliveries(send_id: str, deliveries: List[Delivery]) -> None:
+    """
+    Record the delivery status of recipients of a bulk send.
+
+    Parameters:
+        send_id (str): Id of the bulk send.
+        deliveries (List[Delivery]): Status of each recipient.
+    """
+    if not deliveries:
+        return
+
+    conn = connections.get_connection()
+    cursor = conn.cursor()
+
+    # Recipients retried after a failure replace their earlier status
+    cursor.executemany(
+        """INSERT INTO mail_deliveries (send_id, username, email, status, attempts, error, account_id)
+           VALUES (%s, %s, %s, %s, %s, %s, %s)
+           ON DUPLICATE KEY UPDATE status = VALUES(status), attempts = VALUES(attempts), error = VALUES(error)""",
+        [
+            (
+                send_id, delivery.username, delivery.email, delivery.status,
+                delivery.attempts, delivery.error, delivery.account_id
+            )
+            for delivery in deliveries
+        ]
+    )
+
+    conn.commit()
+    conn.close()
+
+def create_job(subject: str, text_body: str, html_body: Optional[str], created_by: Optional[str]) -> str:
+    """
+    Queue a mass mail send to every account.
+
+    Parameters:
+        subject (str): Subject of the email.
+        text_body (str): Text content of the email.
+        html_body (Optional[str]): HTML content of the email.
+        created_by (Optional[str]): User id of the account that started the send.
+
+    Returns:
+        out (str): Id of the job.
+    """
+    job_id = str(uuid.uuid4())
+
+    conn = connections.get_connection()
+    cursor = conn.cursor()
+
+    # Estimate the number of recipients for progress reporting
+    cursor.execute("SELECT COUNT(*) FROM accounts")
+    row = cursor.fetchone()
+
+    cursor.execute(
+        """INSERT INTO mail_jobs (id, subject, text_body, html_body, created_by, total)
+           VALUES (%s, %s, %s, %s, %s, %s)""",
+        (job_id, subject, text_body, html_body, created_by, int(str(row[0])) if row else 0)
+    )
+
+    conn.commit()
+    conn.close()
+
+    return job_id
+
+def get_job(job_id: str) -> Optional[MailJob]:
+    """
+    Get a mail job.
+
+    Parameters:
+        job_id (str): Id of the job.
+
+    Returns:
+        out (Optional[MailJob]): The job, or None if it doesn't exist.
+    """
+    conn = connections.get_connection()
+    cursor = conn.cursor()
+
+    cursor.execute(f"SELECT {JOB_COLUMNS} FROM mail_jobs WHERE id = %s", (job_id,))
+    row = cursor.fetchone()
+    conn.close()
+
+    return _to_job(row) if row else None
+
+def claim_job(lease: int) -> Optional[MailJob]:
+    """
+    Claim the oldest job that is queued, or was running on a worker that stopped (its lease ran out).
+
+    Parameters:
+        lease (int): Seconds the job is reserved for this worker. Renewed as the job makes progress.
+
+    Returns:
+        out (Optional[MailJob]): The claimed job, or None if there is nothing to run.
+    """
+    conn = connections.get_connection()
+    cursor = conn.cursor()
+
+    cursor.execute(
+        f"""SELECT {JOB_COLUMNS} FROM mail_jobs
+            WHERE status IN ('queued', 'running') AND (status = 'queued' OR lease_until < NOW(3))
+            ORDER BY created_at LIMIT 1 FOR UPDATE SKIP LOCKED"""
+    )
+    row = cursor.fetchone()
+
+    if not row:
+        conn.rollback()
+        conn.close()
+        return None
+
+    cursor.execute(
+        """UPDATE mail_jobs SET status = 'running', lease_until = NOW(3) + INTERVAL %s SECOND,
+           started_at = COALESCE(started_at, NOW(3)) WHERE id = %s""",
+        (lease, row[0])
+    )
+
+    conn.commit()
+    conn.close()
+
+    return _to_job(row)
+
+def prepare_resume(job_id: str, checkpoint: int) -> Set[str]:
+    """
+    Get a job ready to continue after it was interrupted.
+    Recipients that were being sent to when it stopped are marked as unknown and
+    the job counts are rebuilt from the recorded deliveries.
+
+    Parameters:
+        job_id (str): Id of the job.
+        checkpoint (int): Checkpoint of the job.
+
+    Returns:
+        out (Set[str]): Usernames past the checkpoint that were already handled and must be skipped.
+    """
+    conn = connections.get_connection()
+    cursor = conn.cursor()
+
+    # These recipients may have been emailed, so they aren't sent to again
+    cursor.execute(
+        "UPDATE mail_deliveries SET status = 'unknown' WHERE send_id = %s AND status = 'sending'",
+        (job_id,)
+    )
+
+    cursor.execute(
+        "SELECT status, COUNT(*) FROM mail_deliveries WHERE send_id = %s GROUP BY status",
+        (job_id,)
+    )
+    counts: Dict[str, int] = {str(row[0]): int(str(row[1])) for row in cursor.fetchall()}
+
+    cursor.execute(
+        "UPDATE mail_jobs SET sent = %s, failed = %s, unknown = %s WHERE id = %s",
+        (counts.get("sent", 0), counts.get("failed", 0), counts.get("unknown", 0), job_id)
+    )
+
+    cursor.execute(
+        "SELECT username FROM mail_deliveries WHERE send_id = %s AND account_id > %s",
+        (job_id, checkpoint)
+    )
+    handled = {str(row[0]) for row in cursor.fetchall()}
+
+    conn.commit()
+    conn.close()
+
+    return handled
+
+def update_job_progress(job_id: str, checkpoint: int, sent: int, failed: int, lease: int) -> None:
+    """
+    Record the progress of a running job and renew its lease.
+
+    Parameters:
+        job_id (str): Id of the job.
+        checkpoint (int): Every account with an id up to this one has been handled.
+        sent (int): Emails sent since the last update.
+        failed (int): Emails that failed since the last update.
+        lease (int): Seconds to renew the lease by.
+    """
+    conn = connections.get_connection()
+    cursor = conn.cursor()
+
+    cursor.execute(
+        """UPDATE mail_jobs SET checkpoint = GREATEST(checkpoint, %s), sent = sent + %s, failed = failed + %s,
+           lease_until = NOW(3) + INTERVAL %s SECOND WHERE id = %s""",
+        (checkpoint, sent, failed, lease, job_id)
+    )
+
+    conn.commit()
+    conn.close()
+
+def finish_job(job_id: str, status: str, error: Optional[str] = None) -> None:
+    """
+    Mark a job as finished.
+
+    Parameters:
+        job_id (str): Id of the job.
+        status (str): 'completed' or 'failed'.
+        error (Optional[str]): Why the job failed.
+    """
+    conn = connections.get_connection()
+    cursor = conn.cursor()
+
+    cursor.execute(
+        """UPDATE mail_jobs SET status = %s, error = %s, lease_until = NULL, finished_at = NOW(3)
+           WHERE id = %s""",
+        (status, error[:1024] if error else None, job_id)
+    )
+
+    conn.commit()
+    conn.close()
@@ -0,0 +1,175 @@
+import argparse
+import os
+import re
+from dataclasses import dataclass
+from typing import List, Optional, Set
+from mysql.connector import MySQLConnection, errorcode
+import mysql.connector
+from app.database import common as db_common
+from app.database import connections
+
+MIGRATIONS_DIRECTORY = os.path.join(os.path.dirname(__file__), "migrations")
+LOCK_NAME = "lif_auth_migrations"
+
+# Migrations may be run against databases that were set up by hand before migrations existed.
+# Objects that already exist are skipped so those databases can be brought up to date.
+IGNORED_ERRORS = {
+    errorcode.ER_TABLE_EXISTS_ERROR,
+    errorcode.ER_DUP_FIELDNAME,
+    errorcode.ER_DUP_KEYNAME,
+}
+
+@dataclass
+class Migration:
+    version: int
+    name: str
+    path: str
+
+def get_migrations() -> List[Migration]:
+    """
+    Get all migrations shipped with Auth Server.
+    Migrations are files named '<version>_<name>.sql' in the migrations folder.
+
+    Returns:
+        out (List[Migration]): The migrations ordered by version.
+    """
+    migrations = []
+
+    for filename in os.listdir(MIGRATIONS_DIRECTORY):
+        match = re.fullmatch(r"(\d+)_(\w+)\.sql", filename)
+
+        if match:
+            migrations.append(Migration(
+                version=int(match.group(1)),
+                name=match.group(2),
+                path=os.path.join(MIGRATIONS_DIRECTORY, filename)
+            ))
+
+    return sorted(migrations, key=lambda migration: migration.version)
+
+def split_statements(sql: str) -> List[str]:
+    """
+    Split a migration into statements. Statements end with a semicolon at the end of a line.
+
+    Parameters:
+        sql (str): Contents of the migration.
+
+    Returns:
+        out (List[str]): The statements in the migration.
+    """
+    # Drop comment lines
+    lines = [line for line in sql.splitlines() if not line.strip().startswith("--")]
+    statements = re.split(r";\s*$", "\n".join(lines), flags=re.MULTILINE)
+
+    return [statement.strip() for statement in statements if statement.strip()]
+
+def get_applied_versions(conn: MySQLConnection) -> Set[int]:
+    """
+    Get the migrations that were already applied to the database.
+
+    Parameters:
+        conn (MySQLConnection): Connection to the database.
+
+    Returns:
+        out (Set[int]): Versions of the applied migrations.
+    """
+    cursor = conn.cursor()
+
+    cursor.execute("""CREATE TABLE IF NOT EXISTS schema_migrations (
+                          version INT NOT NULL PRIMARY KEY,
+                          name VARCHAR(255) NOT NULL,
+                          applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+                      )""")
+    cursor.execute("SELECT version FROM schema_migrations")
+    versions = {int(row[0]) for row in cursor.fetchall()}
+    cursor.close()
+
+    return versions
+
+def apply_migration(conn: MySQLConnection, migration: Migration) -> None:
+    """
+    Run a migration and record it as applied.
+    MySQL commits schema changes as they run, so a migration that fails part way
+    is not rolled back. Fix the problem and run it again, finished steps are skipped.
+
+    Parameters:
+        conn (MySQLConnection): Connection to the database.
+        migration (Migration): The migration to apply.
+    """
+    cursor = conn.cursor()
+
+    with open(migration.path, "r") as file:
+        statements = split_statements(file.read())
+
+    for statement in statements:
+        try:
+            cursor.execute(statement)
+        except mysql.connector.Error as error:
+            if error.errno not in IGNORED_ERRORS:
+                raise
+
+    cursor.execute(
+        "INSERT INTO schema_migrations (version, name) VALUES (%s, %s)",
+        (migration.version, migration.name)
+    )
+    conn.commit()
+    cursor.close()
+
+def migrate(target: Optional[int] = None) -> List[Migration]:
+    """
+    Bring the database schema up to date.
+
+    Parameters:
+        target (Optional[int]): Stop after this version. Applies every migration if not given.
+
+    Raises:
+        RuntimeError: Another process is already running migrations.
+
+    Returns:
+        out (List[Migration]): The migrations that were applied.
+    """
+    conn = connections.get_connection()
+
+    try:
+        # Only one process may change the schema at a time
+        if not db_common.acquire_named_lock(conn, LOCK_NAME):
+            raise RuntimeError("Migrations are already being run by another process.")
+
+        applied = get_applied_versions(conn)
+        pending = [
+            migration for migration in get_migrations()
+            if migration.version not in applied and (target is None or migration.version <= target)
+        ]
+
+        for migration in pending:
+            apply_migration(conn, migration)
+
+        db_common.release_named_lock(conn, LOCK_NAME)
+        return pending
+    finally:
+        conn.close()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run Auth Server database migrations.")
+    parser.add_argument("--target", type=int, help="Stop after this migration version.")
+    parser.add_argument("--list", action="store_true", help="List migrations and whether they are applied.")
+    args = parser.parse_args()
+
+    if args.list:
+        conn = connections.get_connection()
+        applied = get_applied_versions(conn)
+        conn.close()
+
+        for migration in get_migrations():
+            status = "applied" if migration.version in applied else "pending"
+            print(f"{migration.version:04d} {migration.name}: {status}")
+
+        return
+
+    for migration in migrate(args.target):
+        print(f"Applied {migration.version:04d} {migration.name}")
+
+    print("Database is up to date.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+-- Tables used by Auth Server. Existing databases already have these tables,
+-- in which case this migration is recorded without changing anything.
+
+CREATE TABLE IF NOT EXISTS accounts (
+    id INT NOT NULL AUTO_INCREMENT,
+    username VARCHAR(255) NOT NULL,
+    password VARCHAR(64) NOT NULL,
+    email VARCHAR(255) NOT NULL,
+    token VARCHAR(64) NOT NULL,
+    salt VARCHAR(64) NOT NULL,
+    bio TEXT NULL,
+    pronouns VARCHAR(255) NULL,
+    user_id VARCHAR(36) NULL,
+    role VARCHAR(32) NULL,
+    `2fa_secret` VARCHAR(64) NULL,
+    `2fa_enabled` TINYINT(1) NOT NULL DEFAULT 0,
+    PRIMARY KEY (id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+CREATE TABLE IF NOT EXISTS permissions (
+    id INT NOT NULL AUTO_INCREMENT,
+    account_id VARCHAR(36) NOT NULL,
+    node VARCHAR(255) NOT NULL,
+    PRIMARY KEY (id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+CREATE TABLE IF NOT EXISTS reports (
+    id INT NOT NULL AUTO_INCREMENT,
+    user VARCHAR(255) NOT NULL,
+    service VARCHAR(32) NOT NULL,
+    reason VARCHAR(255) NOT NULL,
+    content TEXT NULL,
+    resolved TINYINT(1) NOT NULL DEFAULT 0,
+    PRIMARY KEY (id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
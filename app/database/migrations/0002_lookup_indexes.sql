@@ -0,0 +1,18 @@
+-- Unique constraints. These fail if the table already holds duplicates,
+-- which have to be cleaned up by hand before the migration can run.
+ALTER TABLE accounts ADD UNIQUE INDEX uq_accounts_username (username);
+ALTER TABLE accounts ADD UNIQUE INDEX uq_accounts_email (email);
+ALTER TABLE accounts ADD UNIQUE INDEX uq_accounts_user_id (user_id);
+ALTER TABLE permissions ADD UNIQUE INDEX uq_permissions_account_node (account_id, node);
+
+-- Covering indexes for the hot lookups, so they are answered from the index alone.
+-- check_token: username + token -> role
+ALTER TABLE accounts ADD INDEX ix_accounts_username_token_role (username, token, role);
+-- get_user_id: username -> user_id
+ALTER TABLE accounts ADD INDEX ix_accounts_username_user_id (username, user_id);
+-- get_username: user_id -> username
+ALTER TABLE accounts ADD INDEX ix_accounts_user_id_username (user_id, username);
+-- get_username_from_email: email -> username
+ALTER TABLE accounts ADD INDEX ix_accounts_email_username (email, username);
+-- get_reports: unresolved/resolved queues in id order
+ALTER TABLE reports ADD INDEX ix_reports_resolved_id (resolved, id);
@@ -0,0 +1,19 @@
+-- Emails waiting to be sent. Rows are written in the same transaction as the
+-- change that triggers them, so an email is never lost if the server stops.
+CREATE TABLE IF NOT EXISTS email_outbox (
+    id BIGINT NOT NULL AUTO_INCREMENT,
+    kind VARCHAR(32) NOT NULL,
+    recipient_email VARCHAR(255) NOT NULL,
+    recipient_name VARCHAR(255) NOT NULL,
+    -- Values used to render the email, cleared once it is sent
+    payload JSON NULL,
+    status VARCHAR(16) NOT NULL DEFAULT 'pending',
+    attempts INT NOT NULL DEFAULT 0,
+    -- Also used as a lease while a worker sends the email
+    next_attempt_at DATETIME(3) NOT NULL DEFAULT CURRENT_TIMESTAMP(3),
+    last_error VARCHAR(1024) NULL,
+    created_at DATETIME(3) NOT NULL DEFAULT CURRENT_TIMESTAMP(3),
+    sent_at DATETIME(3) NULL,
+    PRIMARY KEY (id),
+    INDEX ix_email_outbox_status_next_attempt (status, next_attempt_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
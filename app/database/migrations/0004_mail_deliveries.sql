@@ -0,0 +1,12 @@
+-- Delivery status of every recipient of a bulk send
+CREATE TABLE IF NOT EXISTS mail_deliveries (
+    send_id VARCHAR(36) NOT NULL,
+    username VARCHAR(255) NOT NULL,
+    email VARCHAR(255) NOT NULL,
+    status VARCHAR(16) NOT NULL,
+    attempts INT NOT NULL DEFAULT 1,
+    error VARCHAR(1024) NULL,
+    updated_at DATETIME(3) NOT NULL DEFAULT CURRENT_TIMESTAMP(3) ON UPDATE CURRENT_TIMESTAMP(3),
+    PRIMARY KEY (send_id, username),
+    INDEX ix_mail_deliveries_send_status (send_id, status)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
@@ -0,0 +1,26 @@
+-- Lets a resumed job find the recipients it already handled past its checkpoint
+ALTER TABLE mail_deliveries ADD COLUMN account_id INT NULL;
+ALTER TABLE mail_deliveries ADD INDEX ix_mail_deliveries_send_account (send_id, account_id);
+
+-- Mass mail sends that run in the background
+CREATE TABLE IF NOT EXISTS mail_jobs (
+    id VARCHAR(36) NOT NULL,
+    status VARCHAR(16) NOT NULL DEFAULT 'queued',
+    subject VARCHAR(998) NOT NULL,
+    text_body MEDIUMTEXT NOT NULL,
+    html_body MEDIUMTEXT NULL,
+    created_by VARCHAR(36) NULL,
+    total INT NOT NULL DEFAULT 0,
+    sent INT NOT NULL DEFAULT 0,
+    failed INT NOT NULL DEFAULT 0,
+    unknown INT NOT NULL DEFAULT 0,
+    -- Every account with an id up to the checkpoint has been handled
+    checkpoint INT NOT NULL DEFAULT 0,
+    lease_until DATETIME(3) NULL,
+    error VARCHAR(1024) NULL,
+    created_at DATETIME(3) NOT NULL DEFAULT CURRENT_TIMESTAMP(3),
+    started_at DATETIME(3) NULL,
+    finished_at DATETIME(3) NULL,
+    PRIMARY KEY (id),
+    INDEX ix_mail_jobs_status_created (status, created_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
@@ -0,0 +1,22 @@
+-- Account recovery sessions shared by every Auth Server instance
+CREATE TABLE IF NOT EXISTS recovery_sessions (
+    id VARCHAR(64) NOT NULL,
+    email VARCHAR(255) NOT NULL,
+    -- HMAC of the recovery code, the code itself is never stored
+    code_hash CHAR(64) NOT NULL,
+    attempts INT NOT NULL DEFAULT 0,
+    verified TINYINT(1) NOT NULL DEFAULT 0,
+    expires_at DATETIME(3) NOT NULL,
+    PRIMARY KEY (id),
+    INDEX ix_recovery_sessions_expires (expires_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+-- Fixed window rate limit counters
+CREATE TABLE IF NOT EXISTS rate_limits (
+    rate_key VARCHAR(255) NOT NULL,
+    window_start BIGINT NOT NULL,
+    hits INT NOT NULL DEFAULT 0,
+    expires_at DATETIME(3) NOT NULL,
+    PRIMARY KEY (rate_key, window_start),
+    INDEX ix_rate_limits_expires (expires_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
@@ -0,0 +1,7 @@
+-- Progress of long running jobs (imports, backfills, etc) so they can resume after a restart
+CREATE TABLE IF NOT EXISTS job_checkpoints (
+    job_name VARCHAR(255) NOT NULL,
+    position BIGINT NOT NULL DEFAULT 0,
+    updated_at DATETIME(3) NOT NULL DEFAULT CURRENT_TIMESTAMP(3) ON UPDATE CURRENT_TIMESTAMP(3),
+    PRIMARY KEY (job_name)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
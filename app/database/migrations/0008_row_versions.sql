@@ -0,0 +1,18 @@
+-- Version counter for the account directory. Every change to an account's
+-- username, role or permissions takes the next version inside its transaction.
+CREATE TABLE IF NOT EXISTS row_versions (
+    name VARCHAR(64) NOT NULL,
+    version BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (name)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+INSERT IGNORE INTO row_versions (name, version) VALUES ('directory', 0);
+
+-- Version of the last change to the account or its permissions
+ALTER TABLE accounts ADD COLUMN row_version BIGINT NOT NULL DEFAULT 0;
+ALTER TABLE accounts ADD COLUMN updated_at DATETIME(3) NOT NULL DEFAULT CURRENT_TIMESTAMP(3) ON UPDATE CURRENT_TIMESTAMP(3);
+ALTER TABLE accounts ADD INDEX ix_accounts_row_version (row_version, id);
+
+-- Version the permission node was added at
+ALTER TABLE permissions ADD COLUMN row_version BIGINT NOT NULL DEFAULT 0;
+ALTER TABLE permissions ADD COLUMN updated_at DATETIME(3) NOT NULL DEFAULT CURRENT_TIMESTAMP(3) ON UPDATE CURRENT_TIMESTAMP(3);
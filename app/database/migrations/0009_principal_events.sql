@@ -0,0 +1,13 @@
+-- Revocations and privilege changes pushed to services. Ids come from the
+-- 'principal_events' counter in row_versions so they become visible in order.
+CREATE TABLE IF NOT EXISTS principal_events (
+    id BIGINT NOT NULL,
+    user_id VARCHAR(36) NOT NULL,
+    kind VARCHAR(16) NOT NULL,
+    role VARCHAR(32) NULL,
+    created_at DATETIME(3) NOT NULL DEFAULT CURRENT_TIMESTAMP(3),
+    PRIMARY KEY (id),
+    INDEX ix_principal_events_created (created_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+INSERT IGNORE INTO row_versions (name, version) VALUES ('principal_events', 0);
@@ -0,0 +1,11 @@
+-- Cache entries made stale by a write. Every worker follows this log and
+-- evicts the entries written by other workers.
+CREATE TABLE IF NOT EXISTS cache_invalidations (
+    id BIGINT NOT NULL AUTO_INCREMENT,
+    cache_name VARCHAR(64) NOT NULL,
+    cache_key VARCHAR(512) NOT NULL,
+    origin VARCHAR(32) NOT NULL,
+    created_at DATETIME(3) NOT NULL DEFAULT CURRENT_TIMESTAMP(3),
+    PRIMARY KEY (id),
+    INDEX ix_cache_invalidations_created (created_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
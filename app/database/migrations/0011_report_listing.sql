@@ -0,0 +1,17 @@
+-- When each report was submitted. Reports from before this migration get the
+-- time it ran, so they keep their id order when sorted by time.
+ALTER TABLE reports ADD COLUMN created_at DATETIME(3) NOT NULL DEFAULT CURRENT_TIMESTAMP(3);
+
+-- list_reports: every filter has an index for each sort order. InnoDB appends the
+-- primary key to secondary indexes, so (column, created_at) is read in (created_at, id) order.
+-- All reports, by time or in a date range
+ALTER TABLE reports ADD INDEX ix_reports_created (created_at);
+-- Unresolved/resolved queues by time, ix_reports_resolved_id covers id order
+ALTER TABLE reports ADD INDEX ix_reports_resolved_created (resolved, created_at);
+-- Reports from one service
+ALTER TABLE reports ADD INDEX ix_reports_service_id (service, id);
+ALTER TABLE reports ADD INDEX ix_reports_service_created (service, created_at);
+-- Reports against one user, few enough per user to sort them in id order
+ALTER TABLE reports ADD INDEX ix_reports_user_created (user, created_at);
+-- Reports with one reason. The whole column is indexed, a prefix index can't be read in order.
+ALTER TABLE reports ADD INDEX ix_reports_reason_created (reason, created_at);
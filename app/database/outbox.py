@@ -0,0 +1,156 @@
+import json
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+from mysql.connector.cursor import MySQLCursor
+from app.database import connections
+
+@dataclass(slots=True)
+class OutboxEmail:
+    id: int
+    kind: str
+    recipient_email: str
+    recipient_name: str
+    payload: Dict[str, Any]
+    attempts: int
+
+def enqueue(cursor: MySQLCursor, kind: str, email: str, name: str, payload: Optional[Dict[str, Any]] = None) -> int:
+    """
+    Add an email to the outbox using an existing cursor, so it is only sent if the surrounding transaction commits.
+
+    Parameters:
+        cursor (MySQLCursor): Cursor of the transaction.
+        kind (str): Kind of email, such as 'welcome' or 'recovery'.
+        email (str): Email of the recipient.
+        name (str): Name of the recipient.
+        payload (Optional[dict]): Values used to render the email.
+
+    Returns:
+        out (int): Id of the outbox entry.
+    """
+    cursor.execute(
+        "INSERT INTO email_outbox (kind, recipient_email, recipient_name, payload) VALUES (%s, %s, %s, %s)",
+        (kind, email, name, json.dumps(payload or {}))
+    )
+
+    return int(cursor.lastrowid or 0)
+
+def enqueue_email(kind: str, email: str, name: str, payload: Optional[Dict[str, Any]] = None) -> int:
+    """
+    Add an email to the outbox in its own transaction.
+
+    Parameters:
+        kind (str): Kind of email, such as 'welcome' or 'recovery'.
+        email (str): Email of the recipient.
+        name (str): Name of the recipient.
+        payload (Optional[dict]): Values used to render the email.
+
+    Returns:
+        out (int): Id of the outbox entry.
+    """
+    conn = connections.get_connection()
+    cursor = conn.cursor()
+
+    outbox_id = enqueue(cursor, kind, email, name, payload)
+
+    conn.commit()
+    conn.close()
+
+    return outbox_id
+
+def claim_due(limit: int, lease: int) -> List[OutboxEmail]:
+    """
+    Claim emails that are due to be sent.
+    Claimed emails are hidden from other workers for the length of the lease.
+    If the worker stops before finishing, they are picked up again once the lease runs out.
+
+    Parameters:
+        limit (int): Most emails to claim.
+        lease (int): Seconds the emails are reserved for this worker.
+
+    Returns:
+        out (List[OutboxEmail]): The claimed emails.
+    """
+    conn = connections.get_connection()
+    cursor = conn.cursor()
+
+    # Lock due rows, skipping the ones another worker is claiming right now
+    cursor.execute(
+        """SELECT id, kind, recipient_email, recipient_name, payload, attempts FROM email_outbox
+           WHERE status = 'pending' AND next_attempt_at <= NOW(3)
+           ORDER BY next_attempt_at LIMIT %s FOR UPDATE SKIP LOCKED""",
+        (limit,)
+    )
+    rows = cursor.fetchall()
+
+    if not rows:
+        conn.rollback()
+        conn.close()
+        return []
+
+    ids = [row[0] for row in rows]
+    placeholders = ', '.join(['%s'] * len(ids))
+    cursor.execute(
+        f"""UPDATE email_outbox SET attempts = attempts + 1, next_attempt_at = NOW(3) + INTERVAL %s SECOND
+            WHERE id IN ({placeholders})""",
+        [lease, *ids]
+    )
+
+    conn.commit()
+    conn.close()
+
+    return [
+        OutboxEmail(
+            id=int(str(row[0])),
+            kind=str(row[1]),
+            recipient_email=str(row[2]),
+            recipient_name=str(row[3]),
+            payload=json.loads(str(row[4])) if row[4] else {},
+            attempts=int(str(row[5])) + 1
+        )
+        for row in rows
+    ]
+
+def mark_sent(outbox_id: int) -> None:
+    """
+    Record that an email was sent. The payload is cleared since it may hold secrets such as recovery codes.
+
+    Parameters:
+        outbox_id (int): Id of the outbox entry.
+    """
+    conn = connections.get_connection()
+    cursor = conn.cursor()
+
+    cursor.execute(
+        "UPDATE email_outbox SET status = 'sent', payload = NULL, last_error = NULL, sent_at = NOW(3) WHERE id = %s",
+        (outbox_id,)
+    )
+
+    conn.commit()
+    conn.close()
+
+def mark_failed(outbox_id: int, error: str, retry_in: Optional[float]) -> None:
+    """
+    Record that sending an email failed.
+
+    Parameters:
+        outbox_id (int): Id of the outbox entry.
+        error (str): Why the email could not be sent.
+        retry_in (Optional[float]): Seconds until the next attempt, or None to give up on the email.
+    """
+    conn = connections.get_connection()
+    cursor = conn.cursor()
+
+    if retry_in is None:
+        cursor.execute(
+            "UPDATE email_outbox SET status = 'failed', payload = NULL, last_error = %s WHERE id = %s",
+            (error[:1024], outbox_id)
+        )
+    else:
+        cursor.execute(
+            """UPDATE email_outbox SET last_error = %s, next_attempt_at = NOW(3) + INTERVAL %s SECOND
+               WHERE id = %s""",
+            (error[:1024], int(retry_in), outbox_id)
+        )
+
+    conn.commit()
+    conn.close()
@@ -0,0 +1,153 @@
+import dataclasses
+from typing import Dict, List, Optional, Tuple
+from app.cache import LRUCache, MISSING
+from app.database import connections
+from app.database.rows import PublicProfile
+from app import invalidation
+import app.config as config
+
+# Profiles are keyed by the casefolded username since usernames are case-insensitive in the database.
+# The TTL bounds how long a profile can stay stale if an invalidation from another worker is missed.
+profile_cache = LRUCache(
+    "profiles",
+    max_size=int(config.get_key("profile-cache-size") or 10000),
+    ttl=float(config.get_key("profile-cache-ttl") or 300)
+)
+
+# Other workers drop profiles by account id when this name is logged
+BY_USER_ID = "profiles_by_user_id"
+
+def _key(username: str) -> str:
+    return username.casefold()
+
+def stale_entries(username: str) -> List[Tuple[str, str]]:
+    """
+    Get the cache entries to log as stale when a profile changes.
+
+    Parameters:
+        username (str): Username of the account.
+
+    Returns:
+        out (List[Tuple[str, str]]): Cache name and key of each entry.
+    """
+    return [(profile_cache.name, _key(username))]
+
+def stale_entries_by_id(user_ids: List[str]) -> List[Tuple[str, str]]:
+    """
+    Get the cache entries to log as stale when profiles change and only their account ids are known.
+
+    Parameters:
+        user_ids (List[str]): Ids of the accounts.
+
+    Returns:
+        out (List[Tuple[str, str]]): Cache name and key of each entry.
+    """
+    return [(BY_USER_ID, user_id) for user_id in user_ids]
+
+def get_profiles(usernames: List[str]) -> Dict[str, PublicProfile]:
+    """
+    Get the public profiles for a list of users.
+    Cached profiles are served from memory and the rest are loaded with one query.
+
+    Parameters:
+        usernames (List[str]): Usernames of the accounts.
+
+    Returns:
+        out (Dict[str, PublicProfile]): Profiles by the requested username. Unknown users are left out.
+    """
+    profiles: Dict[str, PublicProfile] = {}
+    missing: Dict[str, List[str]] = {}
+
+    for username in usernames:
+        profile = profile_cache.get(_key(username))
+
+        if profile is MISSING:
+            missing.setdefault(_key(username), []).append(username)
+        else:
+            profiles[username] = profile
+
+    if not missing:
+        return profiles
+
+    # Profiles read before an invalidation must not be cached after it
+    generation = profile_cache.generation
+
+    conn = connections.get_connection()
+    cursor = conn.cursor()
+
+    # Load every profile that wasn't cached in one round trip
+    requested = [names[0] for names in missing.values()]
+    placeholders = ', '.join(['%s'] * len(requested))
+    cursor.execute(
+        f"SELECT user_id, username, bio, pronouns, role FROM accounts WHERE username IN ({placeholders})",
+        requested
+    )
+    rows = cursor.fetchall()
+    conn.close()
+
+    for row in rows:
+        profile = PublicProfile(*row)
+        profile_cache.set(_key(profile.username), profile, generation=generation)
+
+        for username in missing.get(_key(profile.username), []):
+            profiles[username] = profile
+
+    return profiles
+
+def get_profile(username: str) -> Optional[PublicProfile]:
+    """
+    Get the public profile of a user.
+
+    Parameters:
+        username (str): Username of the account.
+
+    Returns:
+        out (Optional[PublicProfile]): The profile or None if the user was not found.
+    """
+    return get_profiles([username]).get(username)
+
+def update_cached_profile(username: str, **fields) -> None:
+    """
+    Write new profile fields through to the cache after they are saved to the database.
+
+    Parameters:
+        username (str): Username of the account.
+        fields: Profile fields that changed.
+    """
+    profile_cache.update(_key(username), lambda profile: dataclasses.replace(profile, **fields))
+
+def update_cached_profile_by_id(user_id: str, **fields) -> None:
+    """
+    Write new profile fields through to the cache for an account id.
+
+    Parameters:
+        user_id (str): Id of the account.
+        fields: Profile fields that changed.
+    """
+    profile_cache.update_where(
+        lambda key, profile: profile.user_id == user_id,
+        lambda profile: dataclasses.replace(profile, **fields)
+    )
+
+def update_cached_roles(roles: Dict[str, str]) -> None:
+    """
+    Write new roles through to the cache for many accounts at once.
+
+    Parameters:
+        roles (Dict[str, str]): New role by account id.
+    """
+    profile_cache.update_where(
+        lambda key, profile: profile.user_id in roles,
+        lambda profile: dataclasses.replace(profile, role=roles[profile.user_id])
+    )
+
+def invalidate_profile_by_id(user_id: str) -> None:
+    """
+    Remove the cached profile for an account id.
+
+    Parameters:
+        user_id (str): Id of the account.
+    """
+    profile_cache.delete_where(lambda key, profile: profile.user_id == user_id)
+
+invalidation.register(BY_USER_ID, invalidate_profile_by_id)
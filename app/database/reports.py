@@ -1,5 +1,79 @@
+import base64
+import json
+from dataclasses import dataclass
+from datetime import datetime
 from app.database import connections
-from typing import Literal, Optional, Tuple, cast
+from app.database.rows import Report
+from typing import List, Literal, Optional, Tuple
+
+# Columns read for every report, in the order _to_report expects them
+COLUMNS = "id, user, service, reason, content, resolved, created_at"
+
+# Sort orders for list_reports
+ORDER_ID = "id"
+ORDER_CREATED = "created"
+
+@dataclass(slots=True)
+class ReportFilter:
+    resolved: Optional[bool] = None
+    service: Optional[str] = None
+    user: Optional[str] = None
+    reason: Optional[str] = None
+    created_after: Optional[datetime] = None
+    created_before: Optional[datetime] = None
+
+def _to_report(row: tuple) -> Report:
+    id, user, service, reason, content, resolved, created_at = row
+    return Report(id, user, service, reason, content, bool(resolved), created_at)
+
+def encode_cursor(report: Report, order: str, descending: bool) -> str:
+    """
+    Make a cursor pointing after a report in a listing.
+
+    Parameters:
+        report (Report): Last report read.
+        order (str): Sort order of the listing, 'id' or 'created'.
+        descending (bool): If the listing is sorted newest first.
+
+    Returns:
+        out (str): The cursor. Clients shouldn't rely on what is inside it.
+    """
+    position = {"o": order, "d": descending, "i": report.id}
+
+    if order == ORDER_CREATED:
+        position["t"] = report.created_at.isoformat() if report.created_at else None
+
+    return base64.urlsafe_b64encode(json.dumps(position, separators=(",", ":")).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, order: str, descending: bool) -> Tuple[int, Optional[datetime]]:
+    """
+    Read a cursor made by encode_cursor().
+
+    Parameters:
+        cursor (str): The cursor.
+        order (str): Sort order of the listing it is used with.
+        descending (bool): If the listing it is used with is sorted newest first.
+
+    Raises:
+        ValueError: The cursor is not valid or was made for another sort order.
+
+    Returns:
+        out (Tuple[int, Optional[datetime]]): Id and submission time of the last report read.
+    """
+    try:
+        position = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        report_id = int(position["i"])
+        created_at = datetime.fromisoformat(position["t"]) if position.get("t") else None
+    except (ValueError, TypeError, KeyError):
+        raise ValueError("Invalid cursor.")
+
+    if position.get("o") != order or bool(position.get("d")) != descending:
+        raise ValueError("The cursor was made for another sort order.")
+
+    if order == ORDER_CREATED and created_at is None:
+        raise ValueError("Invalid cursor.")
+
+    return report_id, created_at
 
 def submit_report(user: str, service: str, reason: str, content: str) -> None:
     """
@@ -26,35 +100,94 @@ def submit_report(user: str, service: str, reason: str, content: str) -> None:
 def get_reports(
     search_filter: Optional[Literal["unresolved", "resolved"]] = None,
     limit: int = 100
-) -> list:
+) -> List[Report]:
     """
-    Get a list of reports.
+    Get a list of reports, oldest first.
 
     Parameters:
         search_filter (Literal["unresolved", "resolved"]): Filter between resolved and unresolved reports.
         limit (int): Specify a limit to how many reports are returned.
     
     Returns:
-        out (list): List of reports.
+        out (List[Report]): List of reports.
+    """
+    resolved = None if search_filter is None else search_filter == "resolved"
+    return list_reports(ReportFilter(resolved=resolved), limit=limit)
+
+def list_reports(
+    filter: ReportFilter,
+    order: str = ORDER_ID,
+    descending: bool = False,
+    after: Optional[Tuple[int, Optional[datetime]]] = None,
+    limit: int = 100
+) -> List[Report]:
+    """
+    Get a page of reports. Pages are read by keyset, so later pages are as fast as the first one.
+
+    Parameters:
+        filter (ReportFilter): Only return reports matching every field that is set.
+        order (str): Sort by 'id' or by 'created' time. Reports submitted at the same time are sorted by id.
+        descending (bool): Sort newest first.
+        after (Tuple[int, Optional[datetime]]): Id and submission time of the last report read, from decode_cursor().
+        limit (int): Most reports to return.
+
+    Returns:
+        out (List[Report]): The reports.
     """
     conn = connections.get_connection()
     cursor = conn.cursor()
 
-    filter = True if search_filter == "resolved" else False
-    
-    # Check filter and execute correct SQL query
-    if search_filter:
-        cursor.execute("SELECT * FROM reports WHERE resolved = %s LIMIT %s", (filter, limit))
+    conditions = []
+    params: list = []
+
+    # Equality filters first, they pick the index
+    for column, value in (
+        ("resolved", filter.resolved),
+        ("service", filter.service),
+        ("user", filter.user),
+        ("reason", filter.reason),
+    ):
+        if value is not None:
+            conditions.append(f"{column} = %s")
+            params.append(value)
+
+    if filter.created_after is not None:
+        conditions.append("created_at >= %s")
+        params.append(filter.created_after)
+
+    if filter.created_before is not None:
+        conditions.append("created_at < %s")
+        params.append(filter.created_before)
+
+    compare = "<" if descending else ">"
+    direction = "DESC" if descending else "ASC"
+
+    if after is not None:
+        after_id, after_created = after
+
+        if order == ORDER_CREATED:
+            # Spelled out instead of a row comparison so MySQL can use it as an index range
+            conditions.append(f"(created_at {compare} %s OR (created_at = %s AND id {compare} %s))")
+            params.extend([after_created, after_created, after_id])
+        else:
+            conditions.append(f"id {compare} %s")
+            params.append(after_id)
+
+    if order == ORDER_CREATED:
+        order_by = f"created_at {direction}, id {direction}"
     else:
-        cursor.execute("SELECT * FROM reports LIMIT %s", (limit,))
+        order_by = f"id {direction}"
 
-    reportsRAW = cursor.fetchall()
-    reports = cast(list[Tuple], reportsRAW) if reportsRAW else []
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    params.append(limit)
+
+    cursor.execute(f"SELECT {COLUMNS} FROM reports {where} ORDER BY {order_by} LIMIT %s", params)
+    reports = [_to_report(row) for row in cursor.fetchall()]
     conn.close()
 
     return reports
 
-def get_report(report_id: int) -> Optional[Tuple]:
+def get_report(report_id: int) -> Optional[Report]:
     """
     Get a report by id.
 
@@ -62,16 +195,19 @@ def get_report(report_id: int) -> Optional[Tuple]:
         report_id (int): The id of the report.
 
     Returns:
-        out (Optional[Tuple]): The report or None if not found.
+        out (Optional[Report]): The report or None if not found.
     """
     conn = connections.get_connection()
     cursor = conn.cursor()
 
-    cursor.execute("SELECT * FROM reports WHERE id = %s", (report_id,))
-    report = cast(Optional[Tuple], cursor.fetchone())
+    cursor.execute(
+        "SELECT id, user, service, reason, content, resolved, created_at FROM reports WHERE id = %s",
+        (report_id,)
+    )
+    row = cursor.fetchone()
     conn.close()
 
-    return report
+    return _to_report(row) if row else None
 
 def resolve_report(report_id: int) -> None:
     """
@@ -0,0 +1,184 @@
+from typing import Dict, List, Optional, Tuple
+from app.cache import LRUCache, MISSING
+from app.database import connections
+import app.config as config
+
+_cache_size = int(config.get_key("resolver-cache-size") or 50000)
+_negative_ttl = float(config.get_key("resolver-negative-ttl") or 30)
+
+# Usernames are casefolded since they are case-insensitive in the database.
+# A cached None means the account is known not to exist.
+ids_by_username = LRUCache("user_ids_by_username", max_size=_cache_size)
+usernames_by_id = LRUCache("usernames_by_user_id", max_size=_cache_size)
+
+# Cached for accounts that exist but have no user id
+NO_USER_ID = ""
+
+def _key(username: str) -> str:
+    return username.casefold()
+
+def stale_entries(username: str, user_id: str) -> List[Tuple[str, str]]:
+    """
+    Get the cache entries to log as stale when an account is created, such as cached "user not found" entries.
+
+    Parameters:
+        username (str): Username of the account.
+        user_id (str): Id of the account.
+
+    Returns:
+        out (List[Tuple[str, str]]): Cache name and key of each entry.
+    """
+    return [(ids_by_username.name, _key(username)), (usernames_by_id.name, user_id)]
+
+def remember(username: str, user_id: str) -> None:
+    """
+    Add a username and user id pair to the resolver, replacing any negative entries.
+
+    Parameters:
+        username (str): Username of the account.
+        user_id (str): Id of the account.
+    """
+    ids_by_username.set(_key(username), user_id)
+    usernames_by_id.set(user_id, username)
+
+def resolve_user_ids(usernames: List[str]) -> Dict[str, Optional[str]]:
+    """
+    Get the user ids for a list of usernames.
+
+    Parameters:
+        usernames (List[str]): Usernames of the accounts.
+
+    Returns:
+        out (Dict[str, Optional[str]]): User id by username, or None if the user was not found.
+    """
+    # Accounts without a user id are treated as unknown
+    return {username: user_id or None for username, user_id in _lookup_user_ids(usernames).items()}
+
+def _lookup_user_ids(usernames: List[str]) -> Dict[str, Optional[str]]:
+    """
+    Get the user ids for a list of usernames, loading uncached ones from the database.
+
+    Parameters:
+        usernames (List[str]): Usernames of the accounts.
+
+    Returns:
+        out (Dict[str, Optional[str]]): User id by username, NO_USER_ID if the account has no user id or None if the user was not found.
+    """
+    results: Dict[str, Optional[str]] = {}
+    missing: Dict[str, List[str]] = {}
+
+    for username in usernames:
+        user_id = ids_by_username.get(_key(username))
+
+        if user_id is MISSING:
+            missing.setdefault(_key(username), []).append(username)
+        else:
+            results[username] = user_id
+
+    if not missing:
+        return results
+
+    conn = connections.get_connection()
+    cursor = conn.cursor()
+
+    # Look up every uncached username in one round trip
+    requested = [names[0] for names in missing.values()]
+    placeholders = ', '.join(['%s'] * len(requested))
+    cursor.execute(
+        f"SELECT username, user_id FROM accounts WHERE username IN ({placeholders})",
+        requested
+    )
+    rows = cursor.fetchall()
+    conn.close()
+
+    for username, user_id in rows:
+        if user_id:
+            remember(str(username), str(user_id))
+        else:
+            # The account exists, but may be given a user id later
+            ids_by_username.set(_key(str(username)), NO_USER_ID, ttl=_negative_ttl)
+
+        for requested_username in missing.pop(_key(str(username)), []):
+            results[requested_username] = str(user_id) if user_id else NO_USER_ID
+
+    # Remember the usernames that don't exist for a short time
+    for key, requested_usernames in missing.items():
+        ids_by_username.set(key, None, ttl=_negative_ttl)
+
+        for requested_username in requested_usernames:
+            results[requested_username] = None
+
+    return results
+
+def resolve_usernames(user_ids: List[str]) -> Dict[str, Optional[str]]:
+    """
+    Get the usernames for a list of user ids.
+
+    Parameters:
+        user_ids (List[str]): Ids of the accounts.
+
+    Returns:
+        out (Dict[str, Optional[str]]): Username by user id, or None if the user was not found.
+    """
+    results: Dict[str, Optional[str]] = {}
+    missing = set()
+
+    for user_id in user_ids:
+        username = usernames_by_id.get(user_id)
+
+        if username is MISSING:
+            missing.add(user_id)
+        else:
+            results[user_id] = username
+
+    if not missing:
+        return results
+
+    conn = connections.get_connection()
+    cursor = conn.cursor()
+
+    # Look up every uncached id in one round trip
+    requested = list(missing)
+    placeholders = ', '.join(['%s'] * len(requested))
+    cursor.execute(
+        f"SELECT username, user_id FROM accounts WHERE user_id IN ({placeholders})",
+        requested
+    )
+    rows = cursor.fetchall()
+    conn.close()
+
+    for username, user_id in rows:
+        remember(str(username), str(user_id))
+        results[str(user_id)] = str(username)
+        missing.discard(str(user_id))
+
+    # Remember the ids that don't exist for a short time
+    for user_id in missing:
+        usernames_by_id.set(user_id, None, ttl=_negative_ttl)
+        results[user_id] = None
+
+    return results
+
+def get_user_id(username: str) -> Optional[str]:
+    """
+    Get the user id for a username.
+
+    Parameters:
+        username (str): Username of the account.
+
+    Returns:
+        out (Optional[str]): Id of the user, NO_USER_ID if the account has no user id or None if the user was not found.
+    """
+    return _lookup_user_ids([username]).get(username)
+
+def get_username(user_id: str) -> Optional[str]:
+    """
+    Get the username for a user id.
+
+    Parameters:
+        user_id (str): Id of the account.
+
+    Returns:
+        out (Optional[str]): Username of the user or None if the user was not found.
+    """
+    return resolve_usernames([user_id]).get(user_id)
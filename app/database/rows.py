@@ -0,0 +1,52 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List, Optional
+
+@dataclass(slots=True)
+class PublicProfile:
+    user_id: str
+    username: str
+    bio: Optional[str]
+    pronouns: Optional[str]
+    role: Optional[str]
+
+@dataclass(slots=True)
+class AccountInfo:
+    username: str
+    pronouns: Optional[str]
+    bio: Optional[str]
+    role: Optional[str]
+
+@dataclass(slots=True)
+class MailRecipient:
+    username: str
+    email: str
+    account_id: int = 0
+
+@dataclass(slots=True)
+class ExportedAccount:
+    id: int
+    user_id: Optional[str]
+    username: str
+    role: Optional[str]
+    two_fa_enabled: bool
+    permissions: List[str]
+
+@dataclass(slots=True)
+class Principal:
+    id: int
+    user_id: Optional[str]
+    username: str
+    role: Optional[str]
+    permissions: List[str]
+    row_version: int
+
+@dataclass(slots=True)
+class Report:
+    id: int
+    user: str
+    service: str
+    reason: str
+    content: str
+    resolved: bool
+    created_at: Optional[datetime] = None
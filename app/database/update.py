@@ -1,10 +1,16 @@
 import secrets
 from app.database import connections
-from typing import Optional, Tuple, cast, List
+from typing import cast, List
 from app.database import exceptions as db_exceptions
 import hashlib
 from app.database import common as db_common
+from app.database import profiles
+from app.database import availability
+from app.database import versions
+from app.database import events
+from app.database import invalidations
 from mysql.connector import MySQLConnection
+from mysql.connector.errors import IntegrityError
 from app.models import database as db_models
 
 def update_user_bio(username, data) -> None:
@@ -18,18 +24,22 @@ def update_user_bio(username, data) -> None:
     conn = connections.get_connection()
     cursor = conn.cursor()
 
-    # Check if the user exists
-    cursor.execute("SELECT username FROM accounts WHERE username = %s", (username,))
-    user = cast(Optional[Tuple[str]], cursor.fetchone())
+    # Update bio in database
+    cursor.execute("UPDATE accounts SET bio = %s WHERE username = %s", (data, username))
 
-    if not user:
+    # No matched rows means the user doesn't exist
+    if cursor.rowcount == 0:
+        conn.close()
         raise db_exceptions.UserNotFound()
 
-    # Grab user info from database
-    cursor.execute("UPDATE accounts SET bio = %s WHERE username = %s", (data, username))
+    invalidations.record(cursor, profiles.stale_entries(username))
+
     conn.commit()
     conn.close()
 
+    # Keep the cached profile in sync
+    profiles.update_cached_profile(username, bio=data)
+
 def update_user_pronouns(username, data) -> None:
     """
     Updates user pronouns for an account.
@@ -41,18 +51,53 @@ def update_user_pronouns(username, data) -> None:
     conn = connections.get_connection()
     cursor = conn.cursor()
 
-    # Check if the user exists
-    cursor.execute("SELECT username FROM accounts WHERE username = %s", (username,))
-    user = cast(Optional[Tuple[str]], cursor.fetchone())
+    # Update pronouns in database
+    cursor.execute("UPDATE accounts SET pronouns = %s WHERE username = %s", (data, username))
 
-    if not user:
+    # No matched rows means the user doesn't exist
+    if cursor.rowcount == 0:
+        conn.close()
         raise db_exceptions.UserNotFound()
 
-    # Update pronouns in database
-    cursor.execute("UPDATE accounts SET pronouns = %s WHERE username = %s", (data, username))
+    invalidations.record(cursor, profiles.stale_entries(username))
+
+    conn.commit()
+    conn.close()
+
+    # Keep the cached profile in sync
+    profiles.update_cached_profile(username, pronouns=data)
+
+def update_user_personalization(username: str, bio: str, pronouns: str) -> None:
+    """
+    Updates the bio and pronouns for an account at once.
+
+    Parameters:
+        username (str): Username of the account.
+        bio (str): The new bio.
+        pronouns (str): The new pronouns.
+    """
+    conn = connections.get_connection()
+    cursor = conn.cursor()
+
+    # Update bio and pronouns in one statement
+    cursor.execute(
+        "UPDATE accounts SET bio = %s, pronouns = %s WHERE username = %s",
+        (bio, pronouns, username)
+    )
+
+    # No matched rows means the user doesn't exist
+    if cursor.rowcount == 0:
+        conn.close()
+        raise db_exceptions.UserNotFound()
+
+    invalidations.record(cursor, profiles.stale_entries(username))
+
     conn.commit()
     conn.close()
 
+    # Keep the cached profile in sync
+    profiles.update_cached_profile(username, bio=bio, pronouns=pronouns)
+
 def update_user_salt(username: str, salt: str) -> None:
     """
     Updates the salt for the password of a user account.
@@ -64,15 +109,14 @@ def update_user_salt(username: str, salt: str) -> None:
     conn = connections.get_connection()
     cursor = conn.cursor()
 
-    # Check if the user exists
-    cursor.execute("SELECT username FROM accounts WHERE username = %s", (username,))
-    user = cast(Optional[Tuple[str]], cursor.fetchone())
+    # Update salt in database
+    cursor.execute("UPDATE accounts SET salt = %s WHERE username = %s", (salt, username))
 
-    if not user:
+    # No matched rows means the user doesn't exist
+    if cursor.rowcount == 0:
+        conn.close()
         raise db_exceptions.UserNotFound()
 
-    # Update salt in database
-    cursor.execute("UPDATE accounts SET salt = %s WHERE username = %s", (salt, username))
     conn.commit()
     conn.close()
 
@@ -86,22 +130,23 @@ def update_password(username: str, password: str) -> None:
     """
     conn = connections.get_connection()
     cursor = conn.cursor()
-
-    # Check if the user exists
-    cursor.execute("SELECT username FROM accounts WHERE username = %s", (username,))
-    user = cast(Optional[Tuple[str]], cursor.fetchone())
-
-    if not user:
-        raise db_exceptions.UserNotFound()
     
     # Generate a new password salt and hash the new password
     salt = secrets.token_bytes(16).hex()
     saltedPassword = password+salt
     passwordHash = hashlib.sha256(saltedPassword.encode()).hexdigest()
 
-    # Update password and salt in database
-    cursor.execute("UPDATE accounts SET password = %s WHERE username = %s", (passwordHash, username))
-    cursor.execute("UPDATE accounts SET salt = %s WHERE username = %s", (salt, username,))
+    # Update password and salt in one statement
+    cursor.execute(
+        "UPDATE accounts SET password = %s, salt = %s WHERE username = %s",
+        (passwordHash, salt, username)
+    )
+
+    # No matched rows means the user doesn't exist
+    if cursor.rowcount == 0:
+        conn.close()
+        raise db_exceptions.UserNotFound()
+
     conn.commit()
     conn.close()
 
@@ -113,21 +158,32 @@ def set_role(account_id, role) -> None:
         account_id (str): UserId of the account.
         role (str): Role that the account will be set to.
     """
-    conn = cast(MySQLConnection, connections.get_connection())
+    conn = connections.get_connection()
     cursor = conn.cursor()
 
-    # Check if the user exists
-    if not db_common.check_user_exists_by_id(
-        user_id=account_id,
-        conn=conn
-    ):
+    # Set role of user
+    version = versions.next_version(cursor)
+    cursor.execute(
+        "UPDATE accounts SET role = %s, row_version = %s WHERE user_id = %s",
+        (role, version, account_id,)
+    )
+
+    # No matched rows means the user doesn't exist
+    if cursor.rowcount == 0:
+        conn.close()
         raise db_exceptions.UserNotFound()
 
-    # Set role of user
-    cursor.execute("UPDATE accounts SET role = %s WHERE user_id = %s", (role, account_id,))
+    events.record(cursor, [(account_id, events.ROLE_CHANGED, role)])
+    invalidations.record(cursor, profiles.stale_entries_by_id([account_id]))
+
     conn.commit()
     conn.close()
 
+    events.notify()
+
+    # Keep the cached profile in sync
+    profiles.update_cached_profile_by_id(account_id, role=role)
+
 def update_roles(users: List[db_models.RoleList]) -> None:
     """
     Update roles in bulk.
@@ -138,13 +194,22 @@ def update_roles(users: List[db_models.RoleList]) -> None:
     conn = connections.get_connection()
     cursor = conn.cursor()
 
-    query = "UPDATE accounts SET role = %s WHERE user_id = %s"
-    values = [(user.role, user.userId) for user in users]
+    version = versions.next_version(cursor)
+
+    query = "UPDATE accounts SET role = %s, row_version = %s WHERE user_id = %s"
+    values = [(user.role, version, user.userId) for user in users]
 
     cursor.executemany(query, values)
+    events.record(cursor, [(user.userId, events.ROLE_CHANGED, user.role) for user in users])
+    invalidations.record(cursor, profiles.stale_entries_by_id([user.userId for user in users]))
     conn.commit()
     conn.close()
 
+    events.notify()
+
+    # Keep the cached profiles in sync
+    profiles.update_cached_roles({user.userId: user.role for user in users})
+
 def update_permissions(users: List[db_models.PermissionsList]) -> None:
     """
     Update permissions in bulk. Will remove all existing permissions for users and add new ones.
@@ -155,6 +220,8 @@ def update_permissions(users: List[db_models.PermissionsList]) -> None:
     conn = connections.get_connection()
     cursor = conn.cursor()
 
+    version = versions.next_version(cursor)
+
     # Delete all existing permissions for all listed users
     query = "DELETE FROM permissions WHERE account_id = %s"
     values = [(user.userId,) for user in users]
@@ -162,17 +229,22 @@ def update_permissions(users: List[db_models.PermissionsList]) -> None:
     cursor.executemany(query, values)
 
     # Add new permissions for all users
-    query = "INSERT INTO permissions (account_id, node) VALUES (%s, %s)"
+    # Duplicate nodes are skipped by the unique (account_id, node) index
+    query = "INSERT IGNORE INTO permissions (account_id, node, row_version) VALUES (%s, %s, %s)"
     masterValues = []
 
     for user in users:
-        values = [(user.userId, permission) for permission in user.permissions]
+        values = [(user.userId, permission, version) for permission in user.permissions]
         masterValues.extend(values)
 
     cursor.executemany(query, masterValues)
+    versions.touch_accounts(cursor, [user.userId for user in users], version)
+    events.record(cursor, [(user.userId, events.PERMISSIONS_CHANGED, None) for user in users])
     conn.commit()
     conn.close()
 
+    events.notify()
+
 def update_email(account_id: str, email: str) -> None:
     """
     Updates the email on a Lif Account.
@@ -180,22 +252,35 @@ def update_email(account_id: str, email: str) -> None:
     Parameters:
         account_id (str): UserId of the account.
         email (str): New email the account.
+
+    Raises:
+        app.database.exceptions.UserNotFound: The user was not found.
+        app.database.exceptions.Conflict: Another account uses the email.
     """
-    conn = cast(MySQLConnection, connections.get_connection())
+    conn = connections.get_connection()
     cursor = conn.cursor()
 
-    # Check if the user exists
-    if not db_common.check_user_exists_by_id(
-        user_id=account_id,
-        conn=conn
-    ):
+    # Update user email, the unique index rejects emails taken since they were checked
+    try:
+        cursor.execute("UPDATE accounts SET email = %s WHERE user_id = %s", (email, account_id,))
+    except IntegrityError:
+        conn.close()
+        raise db_exceptions.Conflict()
+
+    # No matched rows means the user doesn't exist
+    if cursor.rowcount == 0:
+        conn.close()
         raise db_exceptions.UserNotFound()
 
-    # Update user email
-    cursor.execute("UPDATE accounts SET email = %s WHERE user_id = %s", (email, account_id,))
+    invalidations.record(cursor, profiles.stale_entries_by_id([account_id]) + availability.stale_entries(email=email))
+
     conn.commit()
     conn.close()
 
+    # Drop the cached profile so it is reloaded with the new account state
+    profiles.invalidate_profile_by_id(account_id)
+    availability.add_email(email)
+
 def add_permission_node(account_id: str, node: str) -> None:
     """
     Adds a permission node to a user.
@@ -207,18 +292,33 @@ def add_permission_node(account_id: str, node: str) -> None:
     conn = cast(MySQLConnection, connections.get_connection())
     cursor = conn.cursor()
 
-    # Check if user exists
-    if not db_common.check_user_exists_by_id(
+    version = versions.next_version(cursor)
+
+    # Add user permissions, the insert only produces a row if the user exists.
+    # Nodes the user already has are skipped by the unique (account_id, node) index.
+    cursor.execute(
+        """INSERT IGNORE INTO permissions (account_id, node, row_version)
+           SELECT user_id, %s, %s FROM accounts WHERE user_id = %s""",
+        (node, version, account_id,)
+    )
+
+    # Nothing was added, only now check if that's because the user doesn't exist
+    if cursor.rowcount == 0 and not db_common.check_user_exists_by_id(
         user_id=account_id,
         conn=conn
     ):
+        conn.close()
         raise db_exceptions.UserNotFound()
 
-    # Add user permissions
-    cursor.execute("INSERT INTO permissions (account_id, node) VALUES (%s, %s)", (account_id, node,))
+    if cursor.rowcount:
+        versions.touch_accounts(cursor, [account_id], version)
+        events.record(cursor, [(account_id, events.PERMISSIONS_CHANGED, None)])
+
     conn.commit()
     conn.close()
 
+    events.notify()
+
 def remove_permission_node(account_id: str, node: str) -> None:
     """
     Removes a permission node from an account.
@@ -230,18 +330,28 @@ def remove_permission_node(account_id: str, node: str) -> None:
     conn = cast(MySQLConnection, connections.get_connection())
     cursor = conn.cursor()
 
-    # Check if user exists
-    if not db_common.check_user_exists_by_id(
+    version = versions.next_version(cursor)
+
+    # Remove user permissions
+    cursor.execute("DELETE FROM permissions WHERE account_id = %s AND node = %s", (account_id, node,))
+
+    # Nothing was deleted, only now check if that's because the user doesn't exist
+    if cursor.rowcount == 0 and not db_common.check_user_exists_by_id(
         user_id=account_id,
         conn=conn
     ):
+        conn.close()
         raise db_exceptions.UserNotFound()
 
-    # Remove user permissions
-    cursor.execute("DELETE FROM permissions WHERE account_id = %s AND node = %s", (account_id, node,))
+    if cursor.rowcount:
+        versions.touch_accounts(cursor, [account_id], version)
+        events.record(cursor, [(account_id, events.PERMISSIONS_CHANGED, None)])
+
     conn.commit()
     conn.close()
 
+    events.notify()
+
 def reset_token(username: str) -> None:
     """
     Resets the token on an account.
@@ -257,9 +367,19 @@ def reset_token(username: str) -> None:
 
     # Update token in database
     cursor.execute("UPDATE accounts SET token = %s WHERE username = %s", (token, username))
+
+    # Tell services caching the old token that it no longer works
+    cursor.execute("SELECT user_id FROM accounts WHERE username = %s", (username,))
+    account = cursor.fetchone()
+
+    if account and account[0]:
+        events.record(cursor, [(str(account[0]), events.TOKEN_REVOKED, None)])
+
     conn.commit()
     conn.close()
 
+    events.notify()
+
 def save_2fa_secret(account_id: str, secret: str) -> None:
     """
     Save the users 2-factor auth secret.
@@ -0,0 +1,49 @@
+from typing import List
+from mysql.connector.cursor import MySQLCursor
+
+# Name of the counter used for account directory changes
+DIRECTORY = "directory"
+
+# Name of the counter used for principal event ids.
+# Transactions that take both lock the directory counter first.
+PRINCIPAL_EVENTS = "principal_events"
+
+def next_version(cursor: MySQLCursor, name: str = DIRECTORY, count: int = 1) -> int:
+    """
+    Take the next version of a counter using an existing cursor.
+    The counter row stays locked until the transaction ends, so versions become visible in the order they were taken
+    and readers following the versions never skip a change that commits late.
+
+    Parameters:
+        cursor (MySQLCursor): Cursor of the transaction making the change.
+        name (str): Name of the counter.
+        count (int): How many versions to take.
+
+    Returns:
+        out (int): The last version taken. The versions taken are the `count` numbers up to and including it.
+    """
+    # LAST_INSERT_ID(expr) returns the new version without a second query
+    cursor.execute(
+        "UPDATE row_versions SET version = LAST_INSERT_ID(version + %s) WHERE name = %s",
+        (count, name)
+    )
+
+    return int(cursor.lastrowid or 0)
+
+def touch_accounts(cursor: MySQLCursor, user_ids: List[str], version: int) -> None:
+    """
+    Mark accounts as changed at a version, such as when their permissions change.
+
+    Parameters:
+        cursor (MySQLCursor): Cursor of the transaction making the change.
+        user_ids (List[str]): UserIds of the accounts.
+        version (int): Version taken with next_version().
+    """
+    if not user_ids:
+        return
+
+    placeholders = ", ".join(["%s"] * len(user_ids))
+    cursor.execute(
+        f"UPDATE accounts SET row_version = %s WHERE user_id IN ({placeholders})",
+        [version, *user_ids]
+    )
@@ -0,0 +1,142 @@
+import asyncio
+from collections import deque
+from typing import AsyncIterator, Deque, List, Optional
+from app.database import events as db_events
+from app.database.events import PrincipalEvent
+
+# Events read from the database per query
+PAGE_SIZE = 500
+
+# Kind of the event sent when events a subscriber asked for are gone.
+# Its id is the position the subscriber continues from.
+RESYNC = "resync"
+
+class EventHub:
+    """
+    Reads new principal events once per worker and hands them to every subscriber.
+    Recent events are kept in memory, subscribers further behind read from the database until they catch up.
+    """
+    def __init__(self):
+        self.buffer: Deque[PrincipalEvent] = deque()
+        # Every event after this id is in the buffer
+        self.buffer_start = 0
+        self.last_id = 0
+        self.running = False
+        self.changed: Optional[asyncio.Condition] = None
+        self.wakeup: Optional[asyncio.Event] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def notify(self) -> None:
+        """
+        Check for new events now instead of at the next poll. Safe to call from any thread.
+        """
+        if self.loop is not None and self.wakeup is not None:
+            self.loop.call_soon_threadsafe(self.wakeup.set)
+
+    def _add(self, events: List[PrincipalEvent]) -> None:
+        for event in events:
+            # The oldest event is about to be dropped, the buffer now starts after it
+            if len(self.buffer) == self.buffer.maxlen:
+                self.buffer_start = self.buffer[0].id
+
+            self.buffer.append(event)
+
+        self.last_id = events[-1].id
+
+    async def run(self, poll_interval: float, buffer_size: int) -> None:
+        """
+        Read new events until cancelled.
+
+        Parameters:
+            poll_interval (float): Most seconds between checks for events committed by other workers.
+            buffer_size (int): How many recent events are kept in memory.
+        """
+        self.buffer = deque(maxlen=buffer_size)
+        self.loop = asyncio.get_running_loop()
+        self.changed = asyncio.Condition()
+        self.wakeup = asyncio.Event()
+
+        self.last_id = self.buffer_start = await asyncio.to_thread(db_events.get_last_event_id)
+        self.running = True
+
+        try:
+            while True:
+                self.wakeup.clear()
+                events = await asyncio.to_thread(db_events.get_events, self.last_id, PAGE_SIZE)
+
+                if events:
+                    self._add(events)
+
+                    async with self.changed:
+                        self.changed.notify_all()
+
+                    # There may be more, read them right away
+                    if len(events) == PAGE_SIZE:
+                        continue
+
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), timeout=poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self.running = False
+
+    async def _wait(self, position: int, timeout: float) -> bool:
+        assert self.changed is not None
+
+        async with self.changed:
+            try:
+                await asyncio.wait_for(self.changed.wait_for(lambda: self.last_id > position), timeout=timeout)
+            except asyncio.TimeoutError:
+                return False
+
+        return True
+
+    async def subscribe(self, after_id: Optional[int], keepalive: float) -> AsyncIterator[Optional[PrincipalEvent]]:
+        """
+        Follow events as they happen.
+        Event ids have no gaps, so if the events after the position were purged a RESYNC event is sent
+        before continuing. The subscriber has to reload what it keeps from the snapshot and change feed.
+
+        Parameters:
+            after_id (int): Replay the events after this id first. Leave out to only get new events.
+            keepalive (float): Seconds without events after which None is yielded, so idle connections can be kept open.
+
+        Returns:
+            out (AsyncIterator[Optional[PrincipalEvent]]): The events, and None when there were none for a while.
+        """
+        position = self.last_id if after_id is None else after_id
+
+        while True:
+            if position >= self.last_id:
+                if not await self._wait(position, keepalive):
+                    yield None
+
+                continue
+
+            if position >= self.buffer_start:
+                events = [event for event in self.buffer if event.id > position]
+            else:
+                # Too far behind for the buffer, replay from the database
+                events = await asyncio.to_thread(db_events.get_events, position, PAGE_SIZE)
+
+                if not events or events[0].id > position + 1:
+                    # Events after the position were purged, tell the subscriber it missed some
+                    position = events[0].id - 1 if events else self.last_id
+                    yield PrincipalEvent(id=position, user_id="", kind=RESYNC, role=None)
+                    continue
+
+            for event in events:
+                position = event.id
+                yield event
+
+_hub = EventHub()
+
+def get_hub() -> EventHub:
+    """
+    Get the event hub of this worker.
+
+    Returns:
+        out (EventHub): The hub.
+    """
+    return _hub
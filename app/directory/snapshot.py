@@ -0,0 +1,271 @@
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+import time
+from dataclasses import dataclass
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple
+from app.database.rows import Principal
+
+# Layout of a snapshot file. All numbers are little endian.
+#
+#   header      magic, format, flags, directory version, generated at (unix ms),
+#               account count, node count and the offsets of the sections below
+#   accounts    one fixed size record per account, sorted by user id:
+#               offset and length of the user id, username and role in the strings section,
+#               index of the first permission in the permissions section and the number of permissions
+#   nodes       offset and length of each distinct permission node in the strings section
+#   permissions node index of every permission, grouped by account
+#   strings     UTF-8 text the other sections point into
+#
+# Every section has fixed size entries, so a memory mapped file can be searched without parsing it.
+MAGIC = b"LDIR"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<4sHHQQIIIIII")
+ACCOUNT = struct.Struct("<IHIHIHIH")
+NODE = struct.Struct("<IH")
+PERMISSION = struct.Struct("<I")
+
+# Set when accounts are not in user id byte order, binary search can't be used then
+FLAG_UNSORTED = 1
+
+# Role value for accounts without a role
+NO_ROLE = 0xFFFFFFFF
+
+@dataclass(slots=True)
+class SnapshotInfo:
+    version: int
+    generated_at: int
+    accounts: int
+    nodes: int
+
+class _Strings:
+    def __init__(self, file: BinaryIO):
+        self.file = file
+        self.size = 0
+        self.interned: Dict[str, int] = {}
+
+    def add(self, value: str, intern: bool = False) -> Tuple[int, int]:
+        if intern and value in self.interned:
+            offset = self.interned[value]
+            return offset, len(value.encode())
+
+        data = value.encode()
+        offset = self.size
+
+        self.file.write(data)
+        self.size += len(data)
+
+        if intern:
+            self.interned[value] = offset
+
+        return offset, len(data)
+
+def write_snapshot(path: str, principals: Iterable[Principal]) -> SnapshotInfo:
+    """
+    Write a directory snapshot. Accounts are written as they are read, so memory use only grows with
+    the number of distinct roles and permission nodes. The file is replaced in one step once it is complete.
+
+    Parameters:
+        path (str): Where to write the snapshot.
+        principals (Iterable[Principal]): Accounts to include, in user id order.
+
+    Returns:
+        out (SnapshotInfo): Details of the snapshot. Its version is the highest row version of the accounts in it.
+    """
+    version = 0
+    accounts = 0
+    flags = 0
+    previous: Optional[bytes] = None
+    nodes: Dict[str, int] = {}
+    node_list: List[str] = []
+    permission_count = 0
+
+    with tempfile.TemporaryFile() as records, tempfile.TemporaryFile() as permissions, \
+            tempfile.TemporaryFile() as heap:
+        strings = _Strings(heap)
+
+        for principal in principals:
+            user_id = str(principal.user_id)
+            encoded = user_id.encode()
+
+            if previous is not None and encoded <= previous:
+                flags |= FLAG_UNSORTED
+
+            previous = encoded
+
+            user_id_offset, user_id_length = strings.add(user_id)
+            username_offset, username_length = strings.add(principal.username)
+
+            if principal.role is None:
+                role_offset, role_length = NO_ROLE, 0
+            else:
+                role_offset, role_length = strings.add(principal.role, intern=True)
+
+            records.write(ACCOUNT.pack(
+                user_id_offset, user_id_length,
+                username_offset, username_length,
+                role_offset, role_length,
+                permission_count, len(principal.permissions)
+            ))
+
+            for node in principal.permissions:
+                if node not in nodes:
+                    nodes[node] = len(node_list)
+                    node_list.append(node)
+
+                permissions.write(PERMISSION.pack(nodes[node]))
+
+            permission_count += len(principal.permissions)
+            version = max(version, principal.row_version)
+            accounts += 1
+
+        node_table = b"".join(NODE.pack(*strings.add(node, intern=True)) for node in node_list)
+
+        accounts_offset = HEADER.size
+        nodes_offset = accounts_offset + accounts * ACCOUNT.size
+        permissions_offset = nodes_offset + len(node_table)
+        strings_offset = permissions_offset + permission_count * PERMISSION.size
+
+        info = SnapshotInfo(version=version, generated_at=int(time.time() * 1000), accounts=accounts, nodes=len(node_list))
+
+        directory = os.path.dirname(os.path.abspath(path))
+        descriptor, temporary_path = tempfile.mkstemp(dir=directory, prefix=".snapshot-")
+
+        try:
+            with os.fdopen(descriptor, "wb") as output:
+                output.write(HEADER.pack(
+                    MAGIC, FORMAT_VERSION, flags, info.version, info.generated_at,
+                    accounts, len(node_list), accounts_offset, nodes_offset, permissions_offset, strings_offset
+                ))
+
+                records.seek(0)
+                shutil.copyfileobj(records, output)
+                output.write(node_table)
+
+                permissions.seek(0)
+                shutil.copyfileobj(permissions, output)
+
+                heap.seek(0)
+                shutil.copyfileobj(heap, output)
+
+            # Readers see either the old or the new snapshot, never a partial one
+            os.replace(temporary_path, path)
+        except BaseException:
+            os.unlink(temporary_path)
+            raise
+
+    return info
+
+def read_info(file: BinaryIO) -> Optional[SnapshotInfo]:
+    """
+    Read the header of a snapshot.
+
+    Parameters:
+        file (BinaryIO): The snapshot, opened for reading in binary mode. It is left at the end of the header.
+
+    Returns:
+        out (Optional[SnapshotInfo]): Details of the snapshot, or None if the file isn't a valid snapshot.
+    """
+    header = file.read(HEADER.size)
+
+    if len(header) < HEADER.size:
+        return None
+
+    magic, format_version, _, version, generated_at, accounts, nodes, *_ = HEADER.unpack(header)
+
+    if magic != MAGIC or format_version != FORMAT_VERSION:
+        return None
+
+    return SnapshotInfo(version=version, generated_at=generated_at, accounts=accounts, nodes=nodes)
+
+class SnapshotReader:
+    """
+    Reads a snapshot through a memory map, without loading it.
+    This is the reference reader for services that bootstrap from snapshots.
+    """
+    def __init__(self, path: str):
+        with open(path, "rb") as file:
+            self.data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        (magic, format_version, self.flags, version, generated_at, accounts, nodes,
+         self.accounts_offset, self.nodes_offset, self.permissions_offset, self.strings_offset) = \
+            HEADER.unpack_from(self.data, 0)
+
+        if magic != MAGIC or format_version != FORMAT_VERSION:
+            self.data.close()
+            raise ValueError("Not a directory snapshot of a supported format.")
+
+        self.info = SnapshotInfo(version=version, generated_at=generated_at, accounts=accounts, nodes=nodes)
+
+    def close(self) -> None:
+        self.data.close()
+
+    def _string(self, offset: int, length: int) -> str:
+        start = self.strings_offset + offset
+        return self.data[start:start + length].decode()
+
+    def _user_id(self, index: int) -> bytes:
+        offset, length = struct.unpack_from("<IH", self.data, self.accounts_offset + index * ACCOUNT.size)
+        start = self.strings_offset + offset
+        return self.data[start:start + length]
+
+    def _principal(self, index: int) -> Principal:
+        (user_id_offset, user_id_length, username_offset, username_length,
+         role_offset, role_length, first_permission, permission_count) = \
+            ACCOUNT.unpack_from(self.data, self.accounts_offset + index * ACCOUNT.size)
+
+        permissions = []
+
+        for position in range(first_permission, first_permission + permission_count):
+            node, = PERMISSION.unpack_from(self.data, self.permissions_offset + position * PERMISSION.size)
+            permissions.append(self._string(*NODE.unpack_from(self.data, self.nodes_offset + node * NODE.size)))
+
+        # Snapshots don't hold database ids, the position in the snapshot is used instead
+        return Principal(
+            id=index,
+            user_id=self._string(user_id_offset, user_id_length),
+            username=self._string(username_offset, username_length),
+            role=None if role_offset == NO_ROLE else self._string(role_offset, role_length),
+            permissions=permissions,
+            row_version=self.info.version
+        )
+
+    def __iter__(self) -> Iterator[Principal]:
+        for index in range(self.info.accounts):
+            yield self._principal(index)
+
+    def find(self, user_id: str) -> Optional[Principal]:
+        """
+        Find an account by user id.
+
+        Parameters:
+            user_id (str): UserId of the account.
+
+        Returns:
+            out (Optional[Principal]): The account, or None if it isn't in the snapshot.
+        """
+        target = user_id.encode()
+
+        if self.flags & FLAG_UNSORTED:
+            for index in range(self.info.accounts):
+                if self._user_id(index) == target:
+                    return self._principal(index)
+
+            return None
+
+        low, high = 0, self.info.accounts
+
+        while low < high:
+            middle = (low + high) // 2
+
+            if self._user_id(middle) < target:
+                low = middle + 1
+            else:
+                high = middle
+
+        if low < self.info.accounts and self._user_id(low) == target:
+            return self._principal(low)
+
+        return None
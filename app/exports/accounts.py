@@ -0,0 +1,83 @@
+import importlib.util
+import json
+from typing import Iterator
+from app.database import info as db_info
+from app.database.rows import ExportedAccount
+
+# Bytes of NDJSON collected before a chunk is sent or written
+CHUNK_SIZE = 64 * 1024
+
+def to_json(account: ExportedAccount) -> dict:
+    """
+    Get the exported fields of an account.
+
+    Parameters:
+        account (ExportedAccount): The account.
+
+    Returns:
+        out (dict): The account as it appears in the export.
+    """
+    return {
+        "userId": account.user_id,
+        "username": account.username,
+        "role": account.role,
+        "permissions": account.permissions,
+        "flags": {
+            "twoFactorEnabled": account.two_fa_enabled,
+            "suspended": account.role == "SUSPENDED",
+        },
+    }
+
+def _ndjson_chunks(after_id: int) -> Iterator[bytes]:
+    buffer = []
+    size = 0
+
+    for account in db_info.iter_account_export(after_id=after_id):
+        line = (json.dumps(to_json(account)) + "\n").encode()
+        buffer.append(line)
+        size += len(line)
+
+        if size >= CHUNK_SIZE:
+            yield b"".join(buffer)
+            buffer, size = [], 0
+
+    if buffer:
+        yield b"".join(buffer)
+
+def export_accounts(compress: bool = False, after_id: int = 0) -> Iterator[bytes]:
+    """
+    Export every Lif Account as NDJSON, one account per line, in id order.
+    Output is produced in chunks as accounts are read, so memory use stays the same no matter how many accounts there are.
+
+    Parameters:
+        compress (bool): Compress the output with zstd. Needs the optional 'zstandard' package.
+        after_id (int): Only export accounts with a larger id.
+
+    Returns:
+        out (Iterator[bytes]): Chunks of the export.
+    """
+    if not compress:
+        yield from _ndjson_chunks(after_id)
+        return
+
+    try:
+        import zstandard
+    except ImportError:
+        raise RuntimeError("The 'zstandard' package is needed to compress exports.")
+
+    compressor = zstandard.ZstdCompressor().compressobj()
+
+    for chunk in _ndjson_chunks(after_id):
+        # Flush each block so the receiver gets data as it is produced instead of at the end
+        yield compressor.compress(chunk) + compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    yield compressor.flush()
+
+def compression_available() -> bool:
+    """
+    Check if exports can be compressed.
+
+    Returns:
+        out (bool): If the 'zstandard' package is installed.
+    """
+    return importlib.util.find_spec("zstandard") is not None
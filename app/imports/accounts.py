@@ -0,0 +1,263 @@
+import csv
+import json
+import logging
+import multiprocessing
+import os
+import secrets
+import threading
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Callable, Iterable, Iterator, List, Literal, Optional, Union
+from app.database import availability
+from app.database import checkpoints
+from app.database import imports as db_imports
+from app.database import resolver
+from app.database.imports import NewAccount
+from app.imports import hashing
+import app.config as config
+
+logger = logging.getLogger(__name__)
+
+ImportFormat = Literal["ndjson", "csv"]
+
+# Longest value the accounts table stores for each field
+MAX_LENGTH = 255
+
+# Passwords hashed per task sent to a worker process
+HASH_TASK_SIZE = 250
+
+@dataclass(slots=True)
+class ImportRow:
+    row: int
+    username: str
+    email: str
+    password: str
+    pronouns: str
+
+@dataclass(slots=True)
+class ImportIssue:
+    row: int
+    username: Optional[str]
+    reason: str
+
+@dataclass
+class ImportResult:
+    import_id: str
+    skipped: int = 0
+    imported: int = 0
+    conflicts: int = 0
+    invalid: int = 0
+    issues: List[ImportIssue] = field(default_factory=list)
+    issues_truncated: bool = False
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+def get_pool() -> ProcessPoolExecutor:
+    """
+    Get the worker processes used to hash imported passwords.
+    Hashing is CPU bound, so it is spread over processes instead of threads.
+
+    Returns:
+        out (ProcessPoolExecutor): The worker pool.
+    """
+    global _pool
+
+    with _pool_lock:
+        if _pool is None:
+            workers = int(config.get_key("import-hash-workers") or 0) or os.cpu_count() or 1
+
+            # Forking a server with running threads can copy held locks, start clean processes instead
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+        return _pool
+
+def _parse_values(row: int, values: dict) -> Union[ImportRow, ImportIssue]:
+    username = values.get("username")
+    email = values.get("email")
+    password = values.get("password")
+    pronouns = values.get("pronouns") or "Prefer not to say"
+
+    if not isinstance(username, str) or not username:
+        return ImportIssue(row, None, "missing username")
+
+    for name, value in (("email", email), ("password", password), ("pronouns", pronouns)):
+        if not isinstance(value, str) or not value:
+            return ImportIssue(row, username, f"missing {name}")
+
+    # Longer values would fail the whole batch, reject them on their own instead
+    if len(username) > MAX_LENGTH or len(email) > MAX_LENGTH or len(pronouns) > MAX_LENGTH:
+        return ImportIssue(row, username, "value too long")
+
+    return ImportRow(row, username, email, password, pronouns)
+
+def parse_rows(lines: Iterable[str], format: ImportFormat) -> Iterator[Union[ImportRow, ImportIssue]]:
+    """
+    Read accounts from NDJSON or CSV, one at a time.
+    Both formats have the fields 'username', 'email', 'password' and optionally 'pronouns'. CSV needs a header row.
+
+    Parameters:
+        lines (Iterable[str]): Lines of the input.
+        format (ImportFormat): 'ndjson' or 'csv'.
+
+    Returns:
+        out (Iterator[Union[ImportRow, ImportIssue]]): Each input row, or the reason it can't be imported.
+            Rows are numbered from 1, not counting blank lines or the CSV header.
+    """
+    if format == "csv":
+        for row, values in enumerate(csv.DictReader(lines), start=1):
+            yield _parse_values(row, values)
+
+        return
+
+    row = 0
+
+    for line in lines:
+        if not line.strip():
+            continue
+
+        row += 1
+
+        try:
+            values = json.loads(line)
+        except ValueError:
+            yield ImportIssue(row, None, "invalid JSON")
+            continue
+
+        if not isinstance(values, dict):
+            yield ImportIssue(row, None, "invalid JSON")
+            continue
+
+        yield _parse_values(row, values)
+
+def _hash_batch(rows: List[ImportRow]) -> List[Future]:
+    pool = get_pool()
+    passwords = [row.password for row in rows]
+
+    return [
+        pool.submit(hashing.hash_passwords, passwords[start:start + HASH_TASK_SIZE])
+        for start in range(0, len(passwords), HASH_TASK_SIZE)
+    ]
+
+def _new_accounts(rows: List[ImportRow], hashed: List[Future]) -> List[NewAccount]:
+    hashes = [result for future in hashed for result in future.result()]
+
+    return [
+        NewAccount(
+            row=row.row,
+            username=row.username,
+            email=row.email,
+            password_hash=password_hash,
+            salt=salt,
+            token=secrets.token_hex(8),
+            user_id=str(uuid.uuid4()),
+            pronouns=row.pronouns
+        )
+        for row, (password_hash, salt) in zip(rows, hashes)
+    ]
+
+def run_import(
+    lines: Iterable[str],
+    format: ImportFormat,
+    import_id: Optional[str] = None,
+    batch_size: Optional[int] = None,
+    max_issues: Optional[int] = None,
+    on_issue: Optional[Callable[[ImportIssue], None]] = None
+) -> ImportResult:
+    """
+    Create accounts from NDJSON or CSV.
+    Passwords are hashed by worker processes while the previous batch is inserted.
+    Each batch is inserted in one transaction together with the import checkpoint,
+    so running an import again with the same id continues after the last committed batch.
+
+    Parameters:
+        lines (Iterable[str]): Lines of the input. Read lazily, one batch at a time.
+        format (ImportFormat): 'ndjson' or 'csv'.
+        import_id (str): Id of the import, used to resume it. A new id is made if not given.
+        batch_size (int): Rows inserted per transaction. Defaults to the 'import-batch-size' config.
+        max_issues (int): Most issues kept in the result. All issues are kept if not given.
+        on_issue (Callable[[ImportIssue], None]): Called for every row that was not imported.
+
+    Returns:
+        out (ImportResult): Totals for the import and the rows that were not imported.
+    """
+    batch_size = batch_size or int(config.get_key("import-batch-size") or 1000)
+    result = ImportResult(import_id=import_id or uuid.uuid4().hex)
+    job_name = f"import:{result.import_id}"
+
+    def report(issue: ImportIssue) -> None:
+        if on_issue:
+            on_issue(issue)
+
+        if max_issues is None or len(result.issues) < max_issues:
+            result.issues.append(issue)
+        else:
+            result.issues_truncated = True
+
+    # Skip the rows committed by an earlier run of the import
+    result.skipped = checkpoints.get_checkpoint(job_name)
+    parsed = islice(parse_rows(lines, format), result.skipped, None)
+
+    position = result.skipped
+    pending = None
+
+    while True:
+        batch = list(islice(parsed, batch_size))
+
+        # Start hashing this batch before inserting the previous one
+        rows = [item for item in batch if isinstance(item, ImportRow)]
+        hashed = _hash_batch(rows) if rows else []
+
+        if pending:
+            _insert(pending, job_name, result, report)
+
+        if not batch:
+            break
+
+        for item in batch:
+            if isinstance(item, ImportIssue):
+                result.invalid += 1
+                report(item)
+
+        position += len(batch)
+        pending = (rows, hashed, position)
+
+    logger.info(
+        f"Import {result.import_id} finished: {result.imported} imported, "
+        f"{result.conflicts} conflicts, {result.invalid} invalid, {result.skipped} skipped"
+    )
+
+    return result
+
+def _insert(pending, job_name: str, result: ImportResult, report: Callable[[ImportIssue], None]) -> None:
+    rows, hashed, position = pending
+    accounts = _new_accounts(rows, hashed)
+    conflicts = db_imports.insert_accounts(accounts, job_name, position)
+
+    conflicted = {conflict.account.user_id for conflict in conflicts}
+
+    for conflict in conflicts:
+        result.conflicts += 1
+        report(ImportIssue(conflict.account.row, conflict.account.username, conflict.reason))
+
+    for account in accounts:
+        if account.user_id not in conflicted:
+            result.imported += 1
+
+            # Replace any cached "user not found" entries for the new account
+            resolver.remember(account.username, account.user_id)
+            availability.add_username(account.username)
+            availability.add_email(account.email)
+
+    logger.info(f"Import {result.import_id}: {position} rows handled, {result.imported} imported")
+
+def restart_import(import_id: str) -> None:
+    """
+    Forget the checkpoint of an import, so running it again starts from the first row.
+
+    Parameters:
+        import_id (str): Id of the import.
+    """
+    checkpoints.clear_checkpoint(f"import:{import_id}")
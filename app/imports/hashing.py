@@ -0,0 +1,28 @@
+import hashlib
+import secrets
+from typing import List, Tuple
+
+def hash_password(password: str) -> Tuple[str, str]:
+    """
+    Hash a password with a new salt.
+
+    Parameters:
+        password (str): The password.
+
+    Returns:
+        out (Tuple[str, str]): Hash of the password and its salt.
+    """
+    salt = secrets.token_bytes(16).hex()
+    return hashlib.sha256((password + salt).encode()).hexdigest(), salt
+
+def hash_passwords(passwords: List[str]) -> List[Tuple[str, str]]:
+    """
+    Hash many passwords. Kept free of app imports so worker processes start quickly.
+
+    Parameters:
+        passwords (List[str]): The passwords.
+
+    Returns:
+        out (List[Tuple[str, str]]): Hash and salt of each password, in the same order.
+    """
+    return [hash_password(password) for password in passwords]
@@ -0,0 +1,188 @@
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Set
+from app.cache import get_caches
+from app.database import invalidations as db_invalidations
+
+# Invalidations read from the database per query
+PAGE_SIZE = 1000
+
+_handlers: Dict[str, Callable[[str], None]] = {}
+
+def register(name: str, handler: Callable[[str], None]) -> None:
+    """
+    Set how invalidations logged under a name are applied.
+    Names without a handler evict the key from the cache with that name.
+
+    Parameters:
+        name (str): Name the invalidations are logged under.
+        handler (Callable[[str], None]): Receives the key of each invalidation.
+    """
+    _handlers[name] = handler
+
+def apply(name: str, key: str) -> None:
+    """
+    Evict a stale entry from this worker's caches.
+
+    Parameters:
+        name (str): Name the invalidation was logged under.
+        key (str): Key of the stale entry.
+    """
+    handler = _handlers.get(name)
+
+    if handler is not None:
+        handler(key)
+        return
+
+    for cache in get_caches():
+        if cache.name == name:
+            cache.delete(key)
+
+class InvalidationFollower:
+    """
+    Follows the invalidation log and applies the invalidations made by other workers.
+
+    Ids are handed out when rows are inserted, not when they are committed, so a slow transaction can
+    commit a lower id after higher ones were read. Ids that are missing below the highest one read are
+    looked for again on every poll until they show up or the gap timeout passes.
+    """
+    def __init__(self, gap_timeout: float):
+        self.gap_timeout = gap_timeout
+        # Every id up to here was applied or given up on
+        self.floor = 0
+        self.seen: Set[int] = set()
+        self.gaps: Dict[int, float] = {}
+        self.lock = threading.Lock()
+
+        self.applied = 0
+        self.skipped_own = 0
+        self.gaps_given_up = 0
+        self.last_lag_ms: Optional[float] = None
+        self.max_lag_ms = 0.0
+        self.average_lag_ms: Optional[float] = None
+        self.last_poll: Optional[float] = None
+
+    def start(self, last_id: int) -> None:
+        """
+        Skip everything logged before this worker started, its caches were empty then.
+
+        Parameters:
+            last_id (int): Id of the latest invalidation.
+        """
+        with self.lock:
+            self.floor = last_id
+            self.seen.clear()
+            self.gaps.clear()
+
+    def poll(self) -> int:
+        """
+        Apply new invalidations.
+
+        Returns:
+            out (int): Number of invalidations applied.
+        """
+        with self.lock:
+            floor = self.floor
+
+        # Read without holding the lock so the metrics aren't blocked by the query
+        entries = db_invalidations.get_invalidations(floor, PAGE_SIZE)
+
+        with self.lock:
+            applied = 0
+
+            for entry in entries:
+                # Skip entries read before start() moved the floor past them
+                if entry.id <= self.floor or entry.id in self.seen:
+                    continue
+
+                self.seen.add(entry.id)
+                self.gaps.pop(entry.id, None)
+
+                # This worker already updated its own caches when it made the write
+                if entry.origin == db_invalidations.WORKER_ID:
+                    self.skipped_own += 1
+                    continue
+
+                apply(entry.cache_name, entry.cache_key)
+                self._record_lag(entry.age_ms)
+                applied += 1
+
+            self._advance()
+            self.applied += applied
+            self.last_poll = time.time()
+
+            return applied
+
+    def _record_lag(self, lag_ms: float) -> None:
+        self.last_lag_ms = lag_ms
+        self.max_lag_ms = max(self.max_lag_ms, lag_ms)
+
+        # Moving average that favours recent invalidations
+        if self.average_lag_ms is None:
+            self.average_lag_ms = lag_ms
+        else:
+            self.average_lag_ms = self.average_lag_ms * 0.9 + lag_ms * 0.1
+
+    def _advance(self) -> None:
+        now = time.monotonic()
+        highest = max(self.seen, default=self.floor)
+
+        for missing in range(self.floor + 1, highest):
+            if missing not in self.seen:
+                self.gaps.setdefault(missing, now)
+
+        # Move the floor past applied ids and past gaps that are too old to still be committed
+        while True:
+            next_id = self.floor + 1
+
+            if next_id in self.seen:
+                self.seen.remove(next_id)
+            elif next_id in self.gaps and now - self.gaps[next_id] > self.gap_timeout:
+                del self.gaps[next_id]
+                self.gaps_given_up += 1
+            else:
+                break
+
+            self.floor = next_id
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the metrics for this worker.
+
+        Returns:
+            out (dict): Position in the log, applied invalidations and how far behind the writes they were applied.
+        """
+        with self.lock:
+            return {
+                "workerId": db_invalidations.WORKER_ID,
+                "position": self.floor,
+                "applied": self.applied,
+                "skippedOwn": self.skipped_own,
+                "openGaps": len(self.gaps),
+                "gapsGivenUp": self.gaps_given_up,
+                "lastLagMs": self.last_lag_ms,
+                "averageLagMs": self.average_lag_ms,
+                "maxLagMs": self.max_lag_ms,
+                "lastPoll": self.last_poll,
+            }
+
+_follower: Optional[InvalidationFollower] = None
+
+def get_follower() -> Optional[InvalidationFollower]:
+    """
+    Get the invalidation follower of this worker.
+
+    Returns:
+        out (Optional[InvalidationFollower]): The follower, or None if invalidations are not followed.
+    """
+    return _follower
+
+def set_follower(follower: Optional[InvalidationFollower]) -> None:
+    """
+    Replace the invalidation follower of this worker.
+
+    Parameters:
+        follower (Optional[InvalidationFollower]): The new follower.
+    """
+    global _follower
+    _follower = follower
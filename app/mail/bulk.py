@@ -0,0 +1,204 @@
+import logging
+import random
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from app.database import mail as db_mail
+from app.database.mail import Delivery
+from app.database.rows import MailRecipient
+from app.mail.transports import Message, Transport, TransportError, get_transport
+import app.config as config
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class BulkSendResult:
+    send_id: str
+    sent: int = 0
+    failed: int = 0
+    retries: int = 0
+    started: float = field(default_factory=time.monotonic)
+    finished: Optional[float] = None
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished or time.monotonic()) - self.started
+
+    @property
+    def throughput(self) -> float:
+        """
+        Emails sent per second.
+        """
+        return self.sent / self.elapsed if self.elapsed > 0 else 0
+
+    @property
+    def error_rate(self) -> float:
+        """
+        Share of finished recipients that could not be sent to.
+        """
+        done = self.sent + self.failed
+        return self.failed / done if done else 0
+
+@dataclass
+class _Chunk:
+    recipients: List[MailRecipient]
+    attempts: int = 0
+    not_before: float = 0
+
+def _chunks(recipients: Iterable[MailRecipient], size: int) -> Iterator[_Chunk]:
+    iterator = iter(recipients)
+
+    while chunk := list(islice(iterator, size)):
+        yield _Chunk(chunk)
+
+def _send_chunk(
+    transport: Transport,
+    chunk: _Chunk,
+    build_message: Callable[[MailRecipient], Message]
+) -> List[Optional[TransportError]]:
+    # Wait out the backoff of a retried chunk
+    delay = chunk.not_before - time.monotonic()
+
+    if delay > 0:
+        time.sleep(delay)
+
+    chunk.attempts += 1
+    return transport.send([build_message(recipient) for recipient in chunk.recipients])
+
+def send_bulk(
+    recipients: Iterable[MailRecipient],
+    build_message: Callable[[MailRecipient], Message],
+    send_id: Optional[str] = None,
+    transport: Optional[Transport] = None,
+    on_chunk: Optional[Callable[[BulkSendResult, List[MailRecipient]], None]] = None
+) -> BulkSendResult:
+    """
+    Send an email to many recipients.
+    Recipients are split into chunks the mail provider accepts in one request and chunks are sent in parallel.
+    The provider's status for each recipient is recorded, and only recipients that failed temporarily are retried.
+
+    Parameters:
+        recipients (Iterable[MailRecipient]): Who to send the email to. Read lazily, one chunk at a time.
+        build_message (Callable): Builds the email for one recipient.
+        send_id (Optional[str]): Id deliveries are recorded under. A new id is generated if not given.
+        transport (Optional[Transport]): Transport to send with. Defaults to the configured transport.
+        on_chunk (Optional[Callable]): Called with the running totals and recipients of every finished chunk.
+
+    Returns:
+        out (BulkSendResult): Totals for the send.
+    """
+    chunk_size = int(config.get_key("mail-bulk-chunk-size") or 50)
+    concurrency = int(config.get_key("mail-bulk-concurrency") or 4)
+    max_attempts = int(config.get_key("mail-bulk-max-attempts") or 3)
+    progress_interval = float(config.get_key("mail-bulk-progress-interval") or 10)
+
+    transport = transport or get_transport()
+    result = BulkSendResult(send_id=send_id or str(uuid.uuid4()))
+    chunks = _chunks(recipients, chunk_size)
+    retry_queue: List[_Chunk] = []
+    in_flight: Dict[Future, _Chunk] = {}
+    last_report = time.monotonic()
+
+    def delivery(recipient: MailRecipient, status: str, attempts: int, error: Optional[TransportError]) -> Delivery:
+        return Delivery(
+            username=recipient.username,
+            email=recipient.email,
+            status=status,
+            attempts=attempts,
+            error=str(error) if error else None,
+            account_id=recipient.account_id or None
+        )
+
+    def finish(attempts: int, outcomes: List[Tuple[MailRecipient, Optional[TransportError]]]) -> None:
+        db_mail.record_deliveries(result.send_id, [
+            delivery(recipient, "failed" if error else "sent", attempts, error)
+            for recipient, error in outcomes
+        ])
+
+        failed = sum(1 for _, error in outcomes if error)
+        result.failed += failed
+        result.sent += len(outcomes) - failed
+
+        if on_chunk:
+            on_chunk(result, [recipient for recipient, _ in outcomes])
+
+    def next_chunk() -> Optional[_Chunk]:
+        # Retries go first so failed recipients aren't left until the end
+        if retry_queue:
+            return retry_queue.pop(0)
+
+        return next(chunks, None)
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="bulk-mail") as executor:
+        exhausted = False
+
+        while True:
+            # Only read as many recipients as can be sent right now, so memory stays flat
+            while not exhausted and len(in_flight) < concurrency:
+                chunk = next_chunk()
+
+                if chunk is None:
+                    exhausted = True
+                    break
+
+                # Record recipients before sending to them. If the server stops mid-send,
+                # recipients still marked as sending may have been emailed and are not sent to again.
+                if not chunk.attempts:
+                    db_mail.record_deliveries(result.send_id, [
+                        delivery(recipient, "sending", 0, None) for recipient in chunk.recipients
+                    ])
+
+                in_flight[executor.submit(_send_chunk, transport, chunk, build_message)] = chunk
+
+            if not in_flight:
+                break
+
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                chunk = in_flight.pop(future)
+
+                try:
+                    errors = future.result()
+                except TransportError as error:
+                    # Nothing in the chunk was sent
+                    errors = [error] * len(chunk.recipients)
+                except Exception as error:
+                    errors = [TransportError(repr(error), permanent=True)] * len(chunk.recipients)
+
+                retry = []
+                finished = []
+
+                for recipient, error in zip(chunk.recipients, errors):
+                    if error is not None and not error.permanent and chunk.attempts < max_attempts:
+                        retry.append(recipient)
+                    else:
+                        finished.append((recipient, error))
+
+                if finished:
+                    finish(chunk.attempts, finished)
+
+                if retry:
+                    # Back off before sending to the recipients that failed again
+                    not_before = time.monotonic() + min(2 ** chunk.attempts, 60) * random.uniform(0.5, 1)
+                    result.retries += 1
+                    retry_queue.append(_Chunk(retry, attempts=chunk.attempts, not_before=not_before))
+                    exhausted = False
+
+            if time.monotonic() - last_report >= progress_interval:
+                last_report = time.monotonic()
+                logger.info(
+                    f"Bulk send {result.send_id}: {result.sent} sent, {result.failed} failed, "
+                    f"{result.throughput:.1f} emails/s, {result.error_rate:.1%} errors"
+                )
+
+    result.finished = time.monotonic()
+    logger.info(
+        f"Bulk send {result.send_id} finished in {result.elapsed:.1f}s: {result.sent} sent, "
+        f"{result.failed} failed, {result.retries} chunk retries, {result.throughput:.1f} emails/s"
+    )
+
+    return result
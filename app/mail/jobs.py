@@ -0,0 +1,87 @@
+import logging
+from typing import Iterator, List, Set
+from app.database import info as db_info
+from app.database import mail as db_mail
+from app.database.mail import MailJob
+from app.database.rows import MailRecipient
+from app.mail import bulk
+from app.mail.bulk import BulkSendResult
+from app.mail.templates import BulkEmail
+
+logger = logging.getLogger(__name__)
+
+class _Checkpoint:
+    """
+    Tracks the highest account id below which every recipient has been handled.
+    Chunks finish out of order, so the checkpoint only moves past recipients once all earlier ones are done.
+    """
+    def __init__(self, start: int):
+        self.position = start
+        self.last_read = start
+        self.pending: Set[int] = set()
+
+    def read(self, recipients: Iterator[MailRecipient]) -> Iterator[MailRecipient]:
+        for recipient in recipients:
+            self.pending.add(recipient.account_id)
+            self.last_read = recipient.account_id
+            yield recipient
+
+    def finish(self, recipients: List[MailRecipient]) -> None:
+        for recipient in recipients:
+            self.pending.discard(recipient.account_id)
+
+        self.position = min(self.pending) - 1 if self.pending else self.last_read
+
+def run_job(job: MailJob, lease: int) -> BulkSendResult:
+    """
+    Send a mail job to every account, continuing from its checkpoint if it was interrupted.
+
+    Parameters:
+        job (MailJob): The claimed job.
+        lease (int): Seconds the job lease is renewed by as it makes progress.
+
+    Returns:
+        out (BulkSendResult): Totals for this run of the job.
+    """
+    handled: Set[str] = set()
+
+    # The job was started before, skip everyone it already handled
+    if job.started_at is not None:
+        handled = db_mail.prepare_resume(job.id, job.checkpoint)
+        logger.info(f"Resuming mail job {job.id} after account {job.checkpoint}")
+
+    checkpoint = _Checkpoint(job.checkpoint)
+    recipients = (
+        recipient for recipient in db_info.iter_mail_recipients(after_id=job.checkpoint)
+        if recipient.username not in handled
+    )
+
+    reported = {"sent": 0, "failed": 0}
+
+    def on_chunk(result: BulkSendResult, finished: List[MailRecipient]) -> None:
+        checkpoint.finish(finished)
+
+        db_mail.update_job_progress(
+            job.id,
+            checkpoint=checkpoint.position,
+            sent=result.sent - reported["sent"],
+            failed=result.failed - reported["failed"],
+            lease=lease
+        )
+
+        reported["sent"], reported["failed"] = result.sent, result.failed
+
+    try:
+        result = bulk.send_bulk(
+            recipients=checkpoint.read(recipients),
+            build_message=BulkEmail(job.subject, job.text_body, job.html_body).message_for,
+            send_id=job.id,
+            on_chunk=on_chunk
+        )
+    except Exception as error:
+        logger.error(f"Mail job {job.id} failed: {error!r}")
+        db_mail.finish_job(job.id, "failed", repr(error))
+        raise
+
+    db_mail.finish_job(job.id, "completed")
+    return result
@@ -0,0 +1,46 @@
+from typing import Any, Dict
+from app.mail import templates
+from app.mail.transports import Message
+
+def welcome(email: str, name: str, payload: Dict[str, Any]) -> Message:
+    values = {"username": name}
+
+    return Message(
+        to_email=email,
+        to_name=name,
+        subject="Welcome To Lif Platforms",
+        text=templates.load("text documents/welcome.txt").render(values),
+        html=templates.load("html documents/welcome.html").render(values)
+    )
+
+def recovery(email: str, name: str, payload: Dict[str, Any]) -> Message:
+    code = payload["code"]
+
+    return Message(
+        to_email=email,
+        to_name=name,
+        subject="Lif Account Recovery",
+        text=f"Hello, we have recived a request to reset your password. Here is your recovery code {code}",
+        html=templates.load("html documents/recovery.html").render({"RECOVERY CODE": code})
+    )
+
+# Builders for each kind of email stored in the outbox
+KINDS = {
+    "welcome": welcome,
+    "recovery": recovery,
+}
+
+def render(kind: str, email: str, name: str, payload: Dict[str, Any]) -> Message:
+    """
+    Build an email from an outbox entry.
+
+    Parameters:
+        kind (str): Kind of email, such as 'welcome' or 'recovery'.
+        email (str): Email of the recipient.
+        name (str): Name of the recipient.
+        payload (dict): Values used in the email.
+
+    Returns:
+        out (Message): The email to send.
+    """
+    return KINDS[kind](email, name, payload)
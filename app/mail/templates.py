@@ -0,0 +1,155 @@
+import html
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Mapping, Optional, Tuple, Union
+from urllib.parse import quote
+from app.database.rows import MailRecipient
+from app.mail.transports import Message
+import app.config as config
+
+RESOURCES_DIRECTORY = os.path.join(os.path.dirname(__file__), "../resources")
+
+# Placeholders look like {{username}} or {{RECOVERY CODE}}
+PLACEHOLDER = re.compile(r"{{\s*([A-Za-z_][A-Za-z0-9_ ]*?)\s*}}")
+
+# Seconds between checks for changed template files
+RELOAD_CHECK_INTERVAL = 1
+
+class Template:
+    """
+    A template parsed once into literal text and placeholders, so rendering
+    is a single join instead of a search and replace per placeholder.
+    """
+    def __init__(self, source: str, escape: bool = False):
+        self.escape = escape
+        # Placeholders keep their original text so it can be left in place when there is no value
+        self.segments: List[Union[str, Tuple[str, str]]] = []
+
+        position = 0
+
+        for match in PLACEHOLDER.finditer(source):
+            self.segments.append(source[position:match.start()])
+            self.segments.append((match.group(1), match.group(0)))
+            position = match.end()
+
+        self.segments.append(source[position:])
+        self.placeholders = {segment[0] for segment in self.segments if isinstance(segment, tuple)}
+
+    def render(self, values: Mapping[str, str]) -> str:
+        """
+        Fill in the placeholders. Placeholders without a value are left as they are written.
+
+        Parameters:
+            values (Mapping[str, str]): Value of each placeholder.
+
+        Returns:
+            out (str): The rendered template.
+        """
+        parts = []
+
+        for segment in self.segments:
+            if isinstance(segment, str):
+                parts.append(segment)
+            elif segment[0] in values:
+                value = str(values[segment[0]])
+                parts.append(html.escape(value) if self.escape else value)
+            else:
+                parts.append(segment[1])
+
+        return "".join(parts)
+
+@dataclass
+class _LoadedTemplate:
+    template: Template
+    modified: float
+    checked: float
+
+_templates: Dict[str, _LoadedTemplate] = {}
+_lock = threading.Lock()
+
+def load(path: str) -> Template:
+    """
+    Get a compiled template from the resources folder.
+    Templates are read and compiled once, then compiled again only when the file changes.
+
+    Parameters:
+        path (str): Path of the template in the resources folder, such as 'html documents/welcome.html'.
+
+    Returns:
+        out (Template): The compiled template. HTML templates escape the values put into them.
+    """
+    now = time.monotonic()
+    loaded = _templates.get(path)
+
+    # Only look at the file once in a while so rendering doesn't stat it every time
+    if loaded and now - loaded.checked < RELOAD_CHECK_INTERVAL:
+        return loaded.template
+
+    full_path = os.path.join(RESOURCES_DIRECTORY, path)
+    modified = os.stat(full_path).st_mtime
+
+    with _lock:
+        loaded = _templates.get(path)
+
+        if loaded and loaded.modified == modified:
+            loaded.checked = now
+            return loaded.template
+
+        with open(full_path, "r") as document:
+            template = Template(document.read(), escape=path.endswith(".html"))
+
+        _templates[path] = _LoadedTemplate(template, modified, now)
+        return template
+
+class BulkEmail:
+    """
+    An email sent to many recipients. The subject and bodies are compiled once and rendered for each recipient.
+    """
+    # Placeholders filled in for every recipient
+    PLACEHOLDERS = {"username", "unsubscribe_link"}
+
+    def __init__(self, subject: str, text: str, html_body: Optional[str] = None):
+        self.subject = Template(subject)
+        self.text = Template(text)
+        self.html = Template(html_body, escape=True) if html_body is not None else None
+
+        # Read once per send rather than once per recipient
+        self.unsubscribe_url = config.get_key("mail-unsubscribe-url") or ""
+
+    def unknown_placeholders(self) -> List[str]:
+        """
+        Get the placeholders in the email that no value is known for, such as misspelled ones.
+
+        Returns:
+            out (List[str]): Names of the unknown placeholders, sorted.
+        """
+        templates = [self.subject, self.text] + ([self.html] if self.html else [])
+        used = set().union(*(template.placeholders for template in templates))
+
+        return sorted(used - self.PLACEHOLDERS)
+
+    def message_for(self, recipient: MailRecipient) -> Message:
+        """
+        Build the email for one recipient.
+
+        Parameters:
+            recipient (MailRecipient): The recipient.
+
+        Returns:
+            out (Message): The email to send.
+        """
+        values = {
+            "username": recipient.username,
+            "unsubscribe_link": self.unsubscribe_url.replace("{username}", quote(recipient.username)),
+        }
+
+        return Message(
+            to_email=recipient.email,
+            to_name=recipient.username,
+            subject=self.subject.render(values),
+            text=self.text.render(values),
+            html=self.html.render(values) if self.html else None
+        )
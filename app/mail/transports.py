@@ -0,0 +1,223 @@
+import json
+import os
+import smtplib
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from dataclasses import asdict, dataclass
+from email.message import EmailMessage
+from email.utils import formataddr
+from typing import List, Optional
+import requests
+from requests.adapters import HTTPAdapter
+import app.config as config
+
+SENDER_EMAIL = "no_reply@lifplatforms.com"
+SENDER_NAME = "Lif Platforms"
+
+MAILJET_SEND_URL = "https://api.mailjet.com/v3.1/send"
+
+@dataclass
+class Message:
+    to_email: str
+    to_name: str
+    subject: str
+    text: str
+    html: Optional[str] = None
+
+class TransportError(Exception):
+    """
+    An email could not be sent. Permanent errors are not worth retrying.
+    """
+    def __init__(self, message: str, permanent: bool = False):
+        super().__init__(message)
+        self.permanent = permanent
+
+class Transport(ABC):
+    """
+    Sends emails. Every method may be called from several threads at once.
+    """
+    @abstractmethod
+    def send(self, messages: List[Message]) -> List[Optional[TransportError]]:
+        """
+        Send one or more emails.
+
+        Parameters:
+            messages (List[Message]): The emails to send.
+
+        Raises:
+            TransportError: None of the emails could be sent.
+
+        Returns:
+            out (List[Optional[TransportError]]): Result of each email in the order given, None for emails that were sent.
+        """
+
+class MailjetTransport(Transport):
+    """
+    Sends emails with the Mailjet Send API v3.1 over a pooled HTTP session,
+    so connections are reused instead of opened for every email.
+    """
+    def __init__(self, api_key: str, api_secret: str, pool_size: int = 10, timeout: float = 10):
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.auth = (api_key, api_secret)
+
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+
+    def _to_mailjet(self, message: Message) -> dict:
+        data = {
+            "From": {"Email": SENDER_EMAIL, "Name": SENDER_NAME},
+            "To": [{"Email": message.to_email, "Name": message.to_name}],
+            "Subject": message.subject,
+            "TextPart": message.text,
+        }
+
+        if message.html is not None:
+            data["HTMLPart"] = message.html
+
+        return data
+
+    def _message_error(self, result: dict) -> Optional[TransportError]:
+        if result.get("Status") == "success":
+            return None
+
+        errors = result.get("Errors") or []
+        details = "; ".join(f"{error.get('ErrorCode')}: {error.get('ErrorMessage')}" for error in errors)
+        codes = [int(error.get("StatusCode") or 400) for error in errors]
+
+        # Rate limits and server errors for one message can pass, anything else is a problem with the message
+        permanent = not any(code == 429 or code >= 500 for code in codes)
+
+        return TransportError(f"Mailjet rejected the message: {details or result.get('Status')}", permanent=permanent)
+
+    def send(self, messages: List[Message]) -> List[Optional[TransportError]]:
+        try:
+            response = self.session.post(
+                MAILJET_SEND_URL,
+                json={"Messages": [self._to_mailjet(message) for message in messages]},
+                timeout=self.timeout
+            )
+        except requests.RequestException as error:
+            raise TransportError(f"Mailjet request failed: {error}")
+
+        if response.status_code == 429 or response.status_code >= 500:
+            raise TransportError(f"Mailjet returned {response.status_code}")
+
+        # Mailjet reports the status of every message, also when some of them were rejected
+        try:
+            results = response.json().get("Messages")
+        except (ValueError, AttributeError):
+            results = None
+
+        if isinstance(results, list) and len(results) == len(messages):
+            return [self._message_error(result) for result in results]
+
+        # Other client errors mean the request itself is bad, sending it again won't help
+        if response.status_code >= 400:
+            raise TransportError(f"Mailjet returned {response.status_code}: {response.text[:500]}", permanent=True)
+
+        return [None] * len(messages)
+
+class SMTPTransport(Transport):
+    """
+    Sends emails to an SMTP server, for example a local MailHog or Mailpit instance while testing.
+    """
+    def __init__(self, host: str, port: int = 25, timeout: float = 10):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+
+    def send(self, messages: List[Message]) -> List[Optional[TransportError]]:
+        results: List[Optional[TransportError]] = []
+
+        try:
+            with smtplib.SMTP(self.host, self.port, timeout=self.timeout) as smtp:
+                for message in messages:
+                    email = EmailMessage()
+                    email["From"] = formataddr((SENDER_NAME, SENDER_EMAIL))
+                    email["To"] = formataddr((message.to_name, message.to_email))
+                    email["Subject"] = message.subject
+                    email.set_content(message.text)
+
+                    if message.html is not None:
+                        email.add_alternative(message.html, subtype="html")
+
+                    try:
+                        smtp.send_message(email)
+                    except smtplib.SMTPRecipientsRefused as error:
+                        results.append(TransportError(f"SMTP server refused the recipient: {error}", permanent=True))
+                        continue
+
+                    results.append(None)
+        except (smtplib.SMTPException, OSError) as error:
+            if not results:
+                raise TransportError(f"SMTP send failed: {error}")
+
+            # The emails accepted before the connection failed were sent, the rest can be tried again
+            failure = TransportError(f"SMTP send failed: {error}")
+            results.extend([failure] * (len(messages) - len(results)))
+
+        return results
+
+class FileTransport(Transport):
+    """
+    Writes emails to JSON files in a folder instead of sending them. Used for local development and tests.
+    """
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def send(self, messages: List[Message]) -> List[Optional[TransportError]]:
+        for message in messages:
+            path = os.path.join(self.directory, f"{time.time_ns()}-{uuid.uuid4().hex}.json")
+
+            with open(path, "w") as file:
+                json.dump(asdict(message), file, indent=4)
+
+        return [None] * len(messages)
+
+def create_transport() -> Transport:
+    """
+    Create the email transport described by the config.
+
+    Returns:
+        out (Transport): The configured transport.
+    """
+    transport = config.get_key("mail-transport") or "mailjet"
+
+    if transport == "mailjet":
+        return MailjetTransport(
+            api_key=config.get_key("mailjet-api-key"),
+            api_secret=config.get_key("mailjet-api-secret"),
+            pool_size=int(config.get_key("mail-outbox-concurrency") or 4)
+        )
+    elif transport == "smtp":
+        return SMTPTransport(
+            host=config.get_key("mail-smtp-host") or "localhost",
+            port=int(config.get_key("mail-smtp-port") or 25)
+        )
+    elif transport == "file":
+        return FileTransport(config.get_key("mail-file-path") or "mail_outbox")
+
+    raise ValueError(f"Unknown mail transport: {transport}")
+
+_transport: Optional[Transport] = None
+_lock = threading.Lock()
+
+def get_transport() -> Transport:
+    """
+    Get the email transport shared by the whole process.
+
+    Returns:
+        out (Transport): The transport.
+    """
+    global _transport
+
+    if _transport is None:
+        with _lock:
+            if _transport is None:
+                _transport = create_transport()
+
+    return _transport
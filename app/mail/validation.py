@@ -0,0 +1,182 @@
+import asyncio
+import logging
+import re
+from typing import Any, Dict, Optional, Protocol
+import dns.asyncresolver
+import dns.exception
+import dns.resolver
+from app.cache import LRUCache, MISSING
+import app.config as config
+
+logger = logging.getLogger(__name__)
+
+EMAIL_PATTERN = re.compile(r"[^@\s]+@[^@\s]+\.[^@\s]+")
+
+class DNSResolver(Protocol):
+    """
+    Anything that can resolve DNS records like dns.asyncresolver.Resolver.
+    """
+    async def resolve(self, qname: str, rdtype: str) -> Any: ...
+
+class DomainValidator:
+    """
+    Checks if email domains can receive mail, without blocking the event loop.
+
+    A domain is valid if it has MX records, or no MX records but an A/AAAA record (the implicit MX).
+    Domains that don't exist or publish a null MX are invalid. Results are cached per domain,
+    and concurrent checks of the same domain share a single lookup.
+    """
+    def __init__(
+        self,
+        resolver: Optional[DNSResolver] = None,
+        timeout: float = 3,
+        positive_ttl: float = 3600,
+        negative_ttl: float = 300,
+        fail_open: bool = True,
+        cache_size: int = 10000
+    ):
+        self.resolver = resolver
+        self.timeout = timeout
+        self.positive_ttl = positive_ttl
+        self.negative_ttl = negative_ttl
+        self.fail_open = fail_open
+        self.cache = LRUCache("email_domains", max_size=cache_size)
+        self.lookups: Dict[str, asyncio.Future] = {}
+
+    def _get_resolver(self) -> DNSResolver:
+        # Created lazily since reading the system resolver config can fail on some hosts
+        if self.resolver is None:
+            self.resolver = dns.asyncresolver.Resolver()
+
+        return self.resolver
+
+    async def _has_records(self, domain: str, rdtype: str) -> Optional[bool]:
+        try:
+            answer = await self._get_resolver().resolve(domain, rdtype)
+        except dns.resolver.NXDOMAIN:
+            # The domain doesn't exist
+            return False
+        except dns.resolver.NoAnswer:
+            return None
+
+        if rdtype == "MX":
+            # A single MX pointing at "." means the domain accepts no mail (RFC 7505)
+            records = list(answer)
+
+            if len(records) == 1 and str(records[0].exchange) == ".":
+                return False
+
+        return True
+
+    async def _lookup(self, domain: str) -> bool:
+        has_mx = await self._has_records(domain, "MX")
+
+        if has_mx is not None:
+            return has_mx
+
+        # Without MX records mail is delivered to the domain's address
+        for rdtype in ("A", "AAAA"):
+            if await self._has_records(domain, rdtype):
+                return True
+
+        return False
+
+    async def _lookup_and_cache(self, domain: str) -> bool:
+        try:
+            valid = await asyncio.wait_for(self._lookup(domain), timeout=self.timeout)
+        except (asyncio.TimeoutError, dns.exception.DNSException) as error:
+            # Resolver failures say nothing about the domain, so they are not cached
+            logger.warning(f"Could not look up email domain {domain}: {error!r}")
+            return self.fail_open
+
+        self.cache.set(domain, valid, ttl=self.positive_ttl if valid else self.negative_ttl)
+        return valid
+
+    async def is_valid_domain(self, domain: str) -> bool:
+        """
+        Check if a domain can receive email.
+
+        Parameters:
+            domain (str): The domain to check.
+
+        Returns:
+            out (bool): If the domain can receive email.
+        """
+        try:
+            domain = domain.rstrip(".").encode("idna").decode().lower()
+        except UnicodeError:
+            return False
+
+        cached = self.cache.get(domain)
+
+        if cached is not MISSING:
+            return cached
+
+        # Join a lookup for the same domain that is already running
+        lookup = self.lookups.get(domain)
+
+        if lookup is None:
+            lookup = asyncio.ensure_future(self._lookup_and_cache(domain))
+            self.lookups[domain] = lookup
+            lookup.add_done_callback(lambda _: self.lookups.pop(domain, None))
+
+        # Shielded so one caller giving up doesn't cancel the lookup for the others
+        return await asyncio.shield(lookup)
+
+    async def is_valid_email(self, email: str) -> bool:
+        """
+        Check if an email address is well formed and its domain can receive email.
+
+        Parameters:
+            email (str): The email address to check.
+
+        Returns:
+            out (bool): If the email is valid.
+        """
+        if not EMAIL_PATTERN.fullmatch(email):
+            return False
+
+        return await self.is_valid_domain(email.rsplit("@", 1)[1])
+
+_validator: Optional[DomainValidator] = None
+
+def get_validator() -> DomainValidator:
+    """
+    Get the validator shared by the whole process.
+
+    Returns:
+        out (DomainValidator): The validator.
+    """
+    global _validator
+
+    if _validator is None:
+        _validator = DomainValidator(
+            timeout=float(config.get_key("email-dns-timeout") or 3),
+            positive_ttl=float(config.get_key("email-dns-positive-ttl") or 3600),
+            negative_ttl=float(config.get_key("email-dns-negative-ttl") or 300),
+            fail_open=config.get_key("email-dns-fail-open") is not False
+        )
+
+    return _validator
+
+def set_validator(validator: DomainValidator) -> None:
+    """
+    Replace the shared validator, for example with one using a stub resolver.
+
+    Parameters:
+        validator (DomainValidator): The validator to use.
+    """
+    global _validator
+    _validator = validator
+
+async def is_valid_email(email: str) -> bool:
+    """
+    Check if an email address is well formed and its domain can receive email.
+
+    Parameters:
+        email (str): The email address to check.
+
+    Returns:
+        out (bool): If the email is valid.
+    """
+    return await get_validator().is_valid_email(email)
@@ -1,4 +1,6 @@
 from fastapi import FastAPI
+from contextlib import asynccontextmanager
+import asyncio
 from fastapi.middleware.cors import CORSMiddleware
 from app.__version__ import __version__
 import os
@@ -11,7 +13,18 @@ from app.routers import (
     reports,
     profile,
     mail,
+    metrics,
+    directory,
 )
+from app.tasks import image_gc
+from app.tasks import availability
+from app.tasks import email_outbox
+from app.tasks import mail_jobs
+from app.tasks import directory_snapshot
+from app.tasks import principal_events
+from app.tasks import cache_invalidations
+from app.database import migrate
+from app.recovery import service as recovery
 
 # Get run environment 
 __env__= os.getenv('RUN_ENVIRONMENT')
@@ -35,12 +48,39 @@ sentry_sdk.init(
 # Initialize the config
 init_config()
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Refuse to start with a config that would break account recovery
+    recovery.check_config()
+
+    # Bring the database schema up to date before serving requests
+    if get_key("mysql-auto-migrate"):
+        await asyncio.to_thread(migrate.migrate)
+
+    # Start background jobs
+    jobs = [
+        asyncio.create_task(image_gc.run()),
+        asyncio.create_task(availability.run()),
+        asyncio.create_task(email_outbox.run()),
+        asyncio.create_task(mail_jobs.run()),
+        asyncio.create_task(directory_snapshot.run()),
+        asyncio.create_task(principal_events.run()),
+        asyncio.create_task(cache_invalidations.run()),
+    ]
+
+    yield
+
+    # Stop background jobs
+    for job in jobs:
+        job.cancel()
+
 app = FastAPI(
      title="Lif Authentication Server",
      description="Official API for Lif Platforms authentication services.",
      version=__version__,
      docs_url=enable_dev_docs,
-     redoc_url=None
+     redoc_url=None,
+     lifespan=lifespan
 )
 
 # Get allowed origins from config
@@ -65,4 +105,6 @@ app.include_router(router=account.router)
 app.include_router(router=moderation.router)
 app.include_router(router=reports.router)
 app.include_router(router=profile.router)
-app.include_router(router=mail.router)
\ No newline at end of file
+app.include_router(router=mail.router)
+app.include_router(router=metrics.router)
+app.include_router(router=directory.router)
\ No newline at end of file
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
 
 class PermissionsList(BaseModel):
     userId: str
@@ -15,6 +15,11 @@ class UserSearch(BaseModel):
     role: str
     permissions: List[str]
 
+class UserSearchPage(BaseModel):
+    results: List[UserSearch]
+    cursor: Optional[str]
+    hasMore: bool
+
 class UserInfo(BaseModel):
     userId: str
     username: str
@@ -0,0 +1,8 @@
+from pydantic import BaseModel
+from typing import Optional
+
+class PublicProfile(BaseModel):
+    userId: str
+    username: str
+    bio: Optional[str]
+    pronouns: Optional[str]
@@ -0,0 +1,81 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Optional
+
+@dataclass
+class RecoverySession:
+    id: str
+    email: str
+    code_hash: str
+    attempts: int
+    verified: bool
+
+class RecoveryStore(ABC):
+    """
+    Shared storage for account recovery sessions and rate limits.
+    Every entry expires on its own, so nothing has to clean up abandoned recoveries.
+    """
+    @abstractmethod
+    def create_session(self, session: RecoverySession, ttl: int) -> None:
+        """
+        Save a new recovery session.
+
+        Parameters:
+            session (RecoverySession): The session.
+            ttl (int): Seconds until the session expires.
+        """
+
+    @abstractmethod
+    def get_session(self, session_id: str) -> Optional[RecoverySession]:
+        """
+        Get a recovery session.
+
+        Parameters:
+            session_id (str): Id of the session.
+
+        Returns:
+            out (Optional[RecoverySession]): The session, or None if it doesn't exist or has expired.
+        """
+
+    @abstractmethod
+    def add_attempt(self, session_id: str) -> int:
+        """
+        Count an attempt at entering the code of a session.
+
+        Parameters:
+            session_id (str): Id of the session.
+
+        Returns:
+            out (int): Number of attempts including this one.
+        """
+
+    @abstractmethod
+    def mark_verified(self, session_id: str) -> None:
+        """
+        Record that the code of a session was entered correctly.
+
+        Parameters:
+            session_id (str): Id of the session.
+        """
+
+    @abstractmethod
+    def delete_session(self, session_id: str) -> None:
+        """
+        Remove a recovery session.
+
+        Parameters:
+            session_id (str): Id of the session.
+        """
+
+    @abstractmethod
+    def hit(self, key: str, window: int) -> int:
+        """
+        Count a request against a rate limit. Counts reset every window.
+
+        Parameters:
+            key (str): What is being limited, such as an email.
+            window (int): Length of the rate limit window in seconds.
+
+        Returns:
+            out (int): Number of requests in the current window including this one.
+        """
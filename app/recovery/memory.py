@@ -0,0 +1,74 @@
+import threading
+import time
+from dataclasses import replace
+from typing import Dict, Optional, Tuple
+from app.recovery.base import RecoverySession, RecoveryStore
+
+class MemoryRecoveryStore(RecoveryStore):
+    """
+    Keeps recovery sessions in the memory of one process.
+    Only for tests and single worker setups, sessions aren't shared between workers.
+    """
+    def __init__(self):
+        self.sessions: Dict[str, Tuple[RecoverySession, float]] = {}
+        self.counters: Dict[str, Tuple[int, float]] = {}
+        self.lock = threading.Lock()
+
+    def _get(self, session_id: str) -> Optional[RecoverySession]:
+        entry = self.sessions.get(session_id)
+
+        if entry is None:
+            return None
+
+        if entry[1] < time.monotonic():
+            del self.sessions[session_id]
+            return None
+
+        return entry[0]
+
+    def create_session(self, session: RecoverySession, ttl: int) -> None:
+        with self.lock:
+            self.sessions[session.id] = (replace(session), time.monotonic() + ttl)
+
+    def get_session(self, session_id: str) -> Optional[RecoverySession]:
+        with self.lock:
+            session = self._get(session_id)
+            return replace(session) if session else None
+
+    def add_attempt(self, session_id: str) -> int:
+        with self.lock:
+            session = self._get(session_id)
+
+            if session is None:
+                return 0
+
+            session.attempts += 1
+            return session.attempts
+
+    def mark_verified(self, session_id: str) -> None:
+        with self.lock:
+            session = self._get(session_id)
+
+            if session:
+                session.verified = True
+
+    def delete_session(self, session_id: str) -> None:
+        with self.lock:
+            self.sessions.pop(session_id, None)
+
+    def hit(self, key: str, window: int) -> int:
+        now = time.monotonic()
+
+        with self.lock:
+            # Forget finished windows so the counters don't grow forever
+            if len(self.counters) > 10000:
+                self.counters = {name: entry for name, entry in self.counters.items() if entry[1] >= now}
+
+            count, expires = self.counters.get(key, (0, 0))
+
+            # Start a new window once the last one is over
+            if expires < now:
+                count, expires = 0, now + window
+
+            self.counters[key] = (count + 1, expires)
+            return count + 1
@@ -0,0 +1,114 @@
+import time
+from typing import Optional
+from app.database import connections
+from app.recovery.base import RecoverySession, RecoveryStore
+
+# Seconds between removals of expired rows
+PURGE_INTERVAL = 60
+
+class MySQLRecoveryStore(RecoveryStore):
+    """
+    Keeps recovery sessions in the Auth Server database, so every instance sees them.
+    """
+    def __init__(self):
+        self.last_purge = 0.0
+
+    def _purge_expired(self, cursor) -> None:
+        # Expired rows are ignored by every query, this only keeps the tables small
+        if time.monotonic() - self.last_purge < PURGE_INTERVAL:
+            return
+
+        self.last_purge = time.monotonic()
+        cursor.execute("DELETE FROM recovery_sessions WHERE expires_at < NOW(3) LIMIT 1000")
+        cursor.execute("DELETE FROM rate_limits WHERE expires_at < NOW(3) LIMIT 1000")
+
+    def create_session(self, session: RecoverySession, ttl: int) -> None:
+        conn = connections.get_connection()
+        cursor = conn.cursor()
+
+        self._purge_expired(cursor)
+        cursor.execute(
+            """INSERT INTO recovery_sessions (id, email, code_hash, attempts, verified, expires_at)
+               VALUES (%s, %s, %s, %s, %s, NOW(3) + INTERVAL %s SECOND)""",
+            (session.id, session.email, session.code_hash, session.attempts, session.verified, ttl)
+        )
+
+        conn.commit()
+        conn.close()
+
+    def get_session(self, session_id: str) -> Optional[RecoverySession]:
+        conn = connections.get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute(
+            """SELECT id, email, code_hash, attempts, verified FROM recovery_sessions
+               WHERE id = %s AND expires_at > NOW(3)""",
+            (session_id,)
+        )
+        row = cursor.fetchone()
+        conn.close()
+
+        if not row:
+            return None
+
+        return RecoverySession(
+            id=str(row[0]),
+            email=str(row[1]),
+            code_hash=str(row[2]),
+            attempts=int(str(row[3])),
+            verified=bool(row[4])
+        )
+
+    def add_attempt(self, session_id: str) -> int:
+        conn = connections.get_connection()
+        cursor = conn.cursor()
+
+        # LAST_INSERT_ID(expr) returns the new count without a second query racing other workers
+        cursor.execute(
+            """UPDATE recovery_sessions SET attempts = LAST_INSERT_ID(attempts + 1)
+               WHERE id = %s AND expires_at > NOW(3)""",
+            (session_id,)
+        )
+        attempts = int(cursor.lastrowid or 0) if cursor.rowcount else 0
+
+        conn.commit()
+        conn.close()
+
+        return attempts
+
+    def mark_verified(self, session_id: str) -> None:
+        conn = connections.get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute("UPDATE recovery_sessions SET verified = 1 WHERE id = %s", (session_id,))
+
+        conn.commit()
+        conn.close()
+
+    def delete_session(self, session_id: str) -> None:
+        conn = connections.get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute("DELETE FROM recovery_sessions WHERE id = %s", (session_id,))
+
+        conn.commit()
+        conn.close()
+
+    def hit(self, key: str, window: int) -> int:
+        window_start = int(time.time()) // window * window
+
+        conn = connections.get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute(
+            """INSERT INTO rate_limits (rate_key, window_start, hits, expires_at)
+               VALUES (%s, %s, LAST_INSERT_ID(1), NOW(3) + INTERVAL %s SECOND)
+               ON DUPLICATE KEY UPDATE hits = LAST_INSERT_ID(hits + 1)""",
+            (key, window_start, window)
+        )
+        hits = int(cursor.lastrowid or 1)
+
+        conn.commit()
+        conn.close()
+
+        return hits
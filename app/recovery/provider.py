@@ -0,0 +1,54 @@
+import threading
+from typing import Optional
+from app.recovery.base import RecoveryStore
+from app.recovery.memory import MemoryRecoveryStore
+from app.recovery.mysql import MySQLRecoveryStore
+from app.recovery.redis import RedisRecoveryStore
+import app.config as config
+
+_store: Optional[RecoveryStore] = None
+_lock = threading.Lock()
+
+def create_store() -> RecoveryStore:
+    """
+    Create the recovery store described by the config.
+
+    Returns:
+        out (RecoveryStore): The configured recovery store.
+    """
+    backend = config.get_key("recovery-store") or "mysql"
+
+    if backend == "mysql":
+        return MySQLRecoveryStore()
+    elif backend == "redis":
+        return RedisRecoveryStore(config.get_key("recovery-redis-url") or "redis://localhost:6379/0")
+    elif backend == "memory":
+        return MemoryRecoveryStore()
+
+    raise ValueError(f"Unknown recovery store: {backend}")
+
+def get_store() -> RecoveryStore:
+    """
+    Get the recovery store shared by the whole process.
+
+    Returns:
+        out (RecoveryStore): The recovery store.
+    """
+    global _store
+
+    if _store is None:
+        with _lock:
+            if _store is None:
+                _store = create_store()
+
+    return _store
+
+def set_store(store: RecoveryStore) -> None:
+    """
+    Replace the shared recovery store, for example with an in-memory store in tests.
+
+    Parameters:
+        store (RecoveryStore): The store to use.
+    """
+    global _store
+    _store = store
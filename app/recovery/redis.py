@@ -0,0 +1,74 @@
+import time
+from typing import Optional
+from app.recovery.base import RecoverySession, RecoveryStore
+
+SESSION_PREFIX = "lif-auth:recovery:"
+RATE_PREFIX = "lif-auth:rate:"
+
+class RedisRecoveryStore(RecoveryStore):
+    """
+    Keeps recovery sessions in Redis or a Redis compatible server (Valkey, KeyDB, etc).
+    Needs the optional 'redis' package.
+    """
+    def __init__(self, url: str):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("The 'redis' package is needed to use the redis recovery store.")
+
+        self.client = redis.Redis.from_url(url, decode_responses=True)
+
+    def create_session(self, session: RecoverySession, ttl: int) -> None:
+        key = SESSION_PREFIX + session.id
+
+        pipeline = self.client.pipeline()
+        pipeline.hset(key, mapping={
+            "email": session.email,
+            "code_hash": session.code_hash,
+            "attempts": session.attempts,
+            "verified": int(session.verified),
+        })
+        pipeline.expire(key, ttl)
+        pipeline.execute()
+
+    def get_session(self, session_id: str) -> Optional[RecoverySession]:
+        data = self.client.hgetall(SESSION_PREFIX + session_id)
+
+        if not data:
+            return None
+
+        return RecoverySession(
+            id=session_id,
+            email=data["email"],
+            code_hash=data["code_hash"],
+            attempts=int(data["attempts"]),
+            verified=data["verified"] == "1"
+        )
+
+    def add_attempt(self, session_id: str) -> int:
+        key = SESSION_PREFIX + session_id
+
+        # Don't create a partial session if it expired in the meantime
+        if not self.client.exists(key):
+            return 0
+
+        return int(self.client.hincrby(key, "attempts", 1))
+
+    def mark_verified(self, session_id: str) -> None:
+        key = SESSION_PREFIX + session_id
+
+        if self.client.exists(key):
+            self.client.hset(key, "verified", 1)
+
+    def delete_session(self, session_id: str) -> None:
+        self.client.delete(SESSION_PREFIX + session_id)
+
+    def hit(self, key: str, window: int) -> int:
+        window_key = f"{RATE_PREFIX}{key}:{int(time.time()) // window}"
+
+        pipeline = self.client.pipeline()
+        pipeline.incr(window_key)
+        pipeline.expire(window_key, window)
+        hits, _ = pipeline.execute()
+
+        return int(hits)
@@ -0,0 +1,160 @@
+import hashlib
+import hmac
+import secrets
+from typing import Tuple
+from app.database import auth as db_auth
+from app.database import common as db_common
+from app.database import info as db_info
+from app.database import outbox as db_outbox
+from app.database import update as db_update
+from app.recovery.base import RecoverySession
+from app.recovery.provider import get_store
+import app.config as config
+
+class RateLimited(Exception):
+    pass
+
+class InvalidSession(Exception):
+    pass
+
+class InvalidCode(Exception):
+    pass
+
+class NotVerified(Exception):
+    pass
+
+# Key for the memory store when none is configured, its sessions never leave this process
+_process_secret = secrets.token_hex(32)
+
+def check_config() -> None:
+    """
+    Make sure recovery codes can be hashed with a key every instance shares.
+
+    Raises:
+        RuntimeError: No key is configured for a store shared between instances.
+    """
+    # Without a key the few possible codes could be hashed and compared with the stored hash
+    if not config.get_key("recovery-code-secret") and (config.get_key("recovery-store") or "mysql") != "memory":
+        raise RuntimeError(
+            "The recovery-code-secret option must be set to the same random value on every instance."
+        )
+
+def _hash_code(session_id: str, code: str) -> str:
+    check_config()
+    secret = str(config.get_key("recovery-code-secret") or _process_secret)
+
+    # Keyed with the session id so equal codes in different sessions don't share a hash
+    return hmac.new(secret.encode(), f"{session_id}:{code}".encode(), hashlib.sha256).hexdigest()
+
+def _generate_code() -> str:
+    length = int(config.get_key("recovery-code-length") or 8)
+    return "".join(str(secrets.randbelow(10)) for _ in range(length))
+
+def start_recovery(email: str) -> Tuple[str, bool]:
+    """
+    Start recovering an account and email the recovery code.
+
+    Parameters:
+        email (str): Email of the account.
+
+    Raises:
+        RateLimited: Too many recoveries were started for the email recently.
+
+    Returns:
+        out (Tuple[str, bool]): Id of the recovery session and if an account uses the email.
+            A session id is returned either way so callers can hide whether the account exists.
+    """
+    window = int(config.get_key("recovery-rate-window") or 3600)
+    limit = int(config.get_key("recovery-rate-limit") or 5)
+    store = get_store()
+
+    if store.hit(f"recovery:{email.casefold()}", window) > limit:
+        raise RateLimited()
+
+    session_id = secrets.token_urlsafe(32)
+    ttl = int(config.get_key("recovery-code-ttl") or 900)
+
+    # A stale filter would turn away a real account
+    if not db_auth.check_email(email, use_filter=False):
+        # Store a session no code can match, so verifying it fails the same way a wrong code does
+        store.create_session(
+            RecoverySession(id=session_id, email=email, code_hash=secrets.token_hex(32), attempts=0, verified=False),
+            ttl=ttl
+        )
+        return session_id, False
+
+    code = _generate_code()
+    store.create_session(
+        RecoverySession(id=session_id, email=email, code_hash=_hash_code(session_id, code), attempts=0, verified=False),
+        ttl=ttl
+    )
+
+    # The code is only kept in the outbox until the email is sent
+    db_outbox.enqueue_email("recovery", email, "Lif Platforms User", {"code": code})
+
+    return session_id, True
+
+def verify_code(session_id: str, code: str) -> None:
+    """
+    Check the recovery code of a session.
+
+    Parameters:
+        session_id (str): Id of the recovery session.
+        code (str): Code entered by the user.
+
+    Raises:
+        InvalidSession: The session doesn't exist, has expired or ran out of attempts.
+        InvalidCode: The code is wrong.
+    """
+    store = get_store()
+    session = store.get_session(session_id)
+
+    if session is None:
+        raise InvalidSession()
+
+    # Count the attempt before comparing so parallel guesses can't get around the limit
+    attempts = store.add_attempt(session_id)
+    max_attempts = int(config.get_key("recovery-max-attempts") or 5)
+
+    if attempts == 0 or attempts > max_attempts:
+        store.delete_session(session_id)
+        raise InvalidSession()
+
+    if not hmac.compare_digest(session.code_hash, _hash_code(session_id, str(code))):
+        raise InvalidCode()
+
+    store.mark_verified(session_id)
+
+def reset_password(session_id: str, password: str) -> Tuple[str, str]:
+    """
+    Set a new password for the account of a verified recovery session and end the session.
+
+    Parameters:
+        session_id (str): Id of the recovery session.
+        password (str): The new password.
+
+    Raises:
+        InvalidSession: The session doesn't exist or has expired.
+        NotVerified: The recovery code has not been entered yet.
+
+    Returns:
+        out (Tuple[str, str]): Username and token of the account.
+    """
+    store = get_store()
+    session = store.get_session(session_id)
+
+    if session is None:
+        raise InvalidSession()
+
+    if not session.verified:
+        raise NotVerified()
+
+    username = db_common.get_username_from_email(session.email)
+
+    if not username:
+        raise InvalidSession()
+
+    db_update.update_password(username, password)
+    store.delete_session(session_id)
+
+    return username, str(db_info.retrieve_user_token(username))
@@ -6,8 +6,8 @@ from fastapi import (
     UploadFile,
     File,
     WebSocket,
-    BackgroundTasks,
     Header,
+    Body,
 )
 import app.database.exceptions as db_exceptions
 from app.database import auth as db_auth
@@ -15,16 +15,23 @@ from app.database import update as db_update
 from app.database import info as db_info
 from app.database import common as db_common
 from app.database import reports as db_reports
+from app.database import resolver as db_resolver
 from app.models import account as account_models
 from app.models import common as common_models
-import os
-import app.config as config
+from app.storage import provider as storage
+from app.mail import validation as email_validation
+from app.tasks import email_outbox
+from app.recovery import service as recovery
+from app.imports import accounts as account_imports
+from app.exports import accounts as account_exports
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from anyio import from_thread
 import app.access_control as access_control
-from typing import cast, Optional
-import re
-import socket
+from typing import cast, Optional, Iterator, List, Dict, Literal
+import codecs
+import json
 import pyotp
-from mailjet_rest import Client
 
 router = APIRouter(
     prefix="/account",
@@ -77,13 +84,13 @@ async def update_pfp(file: UploadFile = File(), username: str = Form(), token: s
     except db_exceptions.AccountSuspended:
         raise HTTPException(status_code=403, detail="Account suspended.")
 
-    # Read the contents of the profile image
-    contents = await file.read()
-
-    # Save user avatar
-    with open(f"user_images/pfp/{username}.png", "wb") as write_file:
-        write_file.write(contents)
-        write_file.close()
+    # Stream the avatar into storage
+    await run_in_threadpool(
+        storage.get_storage().write,
+        f"pfp/{username}.png",
+        file.file,
+        "image/png"
+    )
 
     return {'Status': 'Ok'}
 
@@ -109,13 +116,13 @@ async def update_banner(file: UploadFile = File(), username: str = Form(), token
     except db_exceptions.AccountSuspended:
         raise HTTPException(status_code=403, detail="Account suspended.")
 
-    # Read the contents of the profile image
-    contents = await file.read()
-
-    # Save user avatar
-    with open(f"user_images/banner/{username}.png", "wb") as write_file:
-        write_file.write(contents)
-        write_file.close()
+    # Stream the banner into storage
+    await run_in_threadpool(
+        storage.get_storage().write,
+        f"banner/{username}.png",
+        file.file,
+        "image/png"
+    )
 
     return {'Status': 'Ok'}
 
@@ -147,8 +154,7 @@ async def update_account_info(
     except db_exceptions.AccountSuspended:
         raise HTTPException(status_code=403, detail="Account suspended.")
 
-    db_update.update_user_bio(username=username, data=bio)
-    db_update.update_user_pronouns(username=username, data=pronouns)
+    db_update.update_user_personalization(username=username, bio=bio, pronouns=pronouns)
 
     return "Updated Successfully"
 
@@ -212,53 +218,167 @@ async def get_account_data(data, account, request: Request, search_mode: str = "
             raise HTTPException(status_code=400, detail="Unknown Data Type!")
     else:
         raise HTTPException(status_code=403, detail="Invalid Token!")
-    
-def send_welcome_email(email: str, username: str):
-    # Load html email document
-    document_path = os.path.join(os.path.dirname(__file__), "../resources/html documents/welcome.html")
 
-    with open(document_path, "r") as document:
-        email_body = document.read()
-        document.close()
+@router.post('/v2/get_info/email')
+def get_bulk_account_emails(
+    accounts: List[str] = Body(),
+    search_mode: str = "username",
+    access_token: str = Header()
+):
+    """
+    ## Get Account Emails
+    Allows services to get the emails of many Lif Accounts at once.
+
+    ### Headers
+    - **access-token (str):** Services access token.
+
+    ### Parameters:
+    - **search_mode (str):** Specify if the accounts are 'username' or 'userID'.
+
+    ### Body:
+    - **accounts (list):** Usernames or user ids of the accounts. Up to 100000 per request.
+
+    ### Returns:
+    - **NDJSON:** One line per requested account, in the order they were requested.
+        Found accounts look like `{"account": ..., "found": true, "username": ..., "email": ...}`,
+        accounts that were not found look like `{"account": ..., "found": false}`.
+    """
+    if not access_control.verify_token(access_token):
+        raise HTTPException(status_code=403, detail="Invalid Token!")
+
+    if not access_control.has_perms(token=access_token, permission='account.email'):
+        raise HTTPException(status_code=403, detail="No Permission!")
+
+    if search_mode != "username" and search_mode != "userID":
+        raise HTTPException(status_code=400, detail="Invalid search mode.")
+
+    if len(accounts) > 100000:
+        raise HTTPException(status_code=413, detail="Too many accounts. Max 100000 per request.")
 
-    textDocumentPath = os.path.join(os.path.dirname(__file__), "../resources/text documents/welcome.txt")
+    def lines():
+        for account, found in db_info.iter_bulk_emails(accounts, cast(Literal["userID", "username"], search_mode)):
+            if found:
+                line = {"account": account, "found": True, "username": found.username, "email": found.email}
+            else:
+                line = {"account": account, "found": False}
+
+            yield json.dumps(line) + "\n"
 
-    with open(textDocumentPath, "r") as document:
-        email_text = document.read()
-        document.close()
+    # Results are sent as they are read so large lookups aren't held in memory
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+@router.get('/v2/export')
+def export_accounts(compression: Optional[str] = None, access_token: str = Header()):
+    """
+    ## Export Accounts
+    Allows services to download the account directory, such as for analytics or to seed other services.
 
-    mailjetKey = config.get_key("mailjet-api-key")
-    mailjetSecret = config.get_key("mailjet-api-secret")
+    ### Headers
+    - **access-token (str):** Services access token.
+
+    ### Parameters:
+    - **compression (str):** Set to 'zstd' to compress the export.
+
+    ### Returns:
+    - **NDJSON:** One line per account in the form `{"userId": ..., "username": ..., "role": ..., "permissions": [...], "flags": {...}}`.
+    """
+    if not access_control.verify_token(access_token):
+        raise HTTPException(status_code=403, detail="Invalid Token!")
 
-    mailjet = Client(
-        auth=(mailjetKey, mailjetSecret),
-        version="v3.1"
+    if not access_control.has_perms(token=access_token, permission='account.export'):
+        raise HTTPException(status_code=403, detail="No Permission!")
+
+    if compression not in (None, "zstd"):
+        raise HTTPException(status_code=400, detail="Invalid compression.")
+
+    if compression == "zstd" and not account_exports.compression_available():
+        raise HTTPException(status_code=501, detail="Compression is not available.")
+
+    # Accounts are sent as they are read, the export is never held in memory
+    return StreamingResponse(
+        account_exports.export_accounts(compress=compression == "zstd"),
+        media_type="application/zstd" if compression else "application/x-ndjson"
     )
 
-    # Send email via Mailjet API
-    mailjet.send.create(data={
-        "Messages": [
-            {
-                "From": {
-                    "Email": "no_reply@lifplatforms.com",
-                    "Name": "Lif Platforms"
-                },
-                "To": [
-                    {
-                        "Email": email,
-                        "Name": username
-                    }
-                ],
-                "Subject": "Welcome To Lif Platforms",
-                "TextPart": email_text,
-                "HTMLPart": email_body
-            }
-        ]
-    })
+def _request_lines(request: Request) -> Iterator[str]:
+    # Read the body as it arrives instead of holding the whole upload in memory
+    stream = request.stream().__aiter__()
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+
+    while True:
+        try:
+            chunk = from_thread.run(stream.__anext__)
+        except StopAsyncIteration:
+            break
+
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")
 
+        for line in lines:
+            yield line + "\n"
+
+    buffer += decoder.decode(b"", final=True)
+
+    if buffer:
+        yield buffer
+
+@router.post('/v2/import')
+def import_accounts(
+    request: Request,
+    format: str = "ndjson",
+    import_id: Optional[str] = None,
+    access_token: str = Header()
+):
+    """
+    ## Import Accounts
+    Allows services to create many Lif Accounts at once, such as when moving users over from another service.
+
+    ### Headers
+    - **access-token (str):** Services access token.
+
+    ### Parameters:
+    - **format (str):** 'ndjson' or 'csv'.
+    - **import_id (str):** Id of an earlier import to resume. Rows it already committed are skipped.
+
+    ### Body:
+    NDJSON or CSV rows with a `username`, `email`, `password` and optionally `pronouns`. CSV needs a header row.
+
+    ### Returns:
+    - **dict:** Totals for the import and up to 1000 rows that were not imported, with the reason.
+    """
+    if not access_control.verify_token(access_token):
+        raise HTTPException(status_code=403, detail="Invalid Token!")
+
+    if not access_control.has_perms(token=access_token, permission='account.import'):
+        raise HTTPException(status_code=403, detail="No Permission!")
+
+    if format != "ndjson" and format != "csv":
+        raise HTTPException(status_code=400, detail="Invalid format.")
+
+    try:
+        result = account_imports.run_import(
+            _request_lines(request),
+            format=cast(Literal["ndjson", "csv"], format),
+            import_id=import_id,
+            max_issues=1000
+        )
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="Body must be UTF-8.")
+
+    return {
+        "importId": result.import_id,
+        "skipped": result.skipped,
+        "imported": result.imported,
+        "conflicts": result.conflicts,
+        "invalid": result.invalid,
+        "issues": [{"row": issue.row, "username": issue.username, "reason": issue.reason} for issue in result.issues],
+        "issuesTruncated": result.issues_truncated
+    }
+    
 @router.post("/create_account")
 @router.post("/v1/create")
-async def create_lif_account(request: Request, bg_tasks: BackgroundTasks):
+async def create_lif_account(request: Request):
     """
     ## Create Lif Account
     Handles the creation of Lif Accounts
@@ -287,30 +407,11 @@ async def create_lif_account(request: Request, bg_tasks: BackgroundTasks):
     except db_exceptions.Conflict:
         raise HTTPException(status_code=409, detail="Username or email is already in use.")
 
-    # Send welcome email
-    bg_tasks.add_task(send_welcome_email, email, username)
+    # The welcome email was queued with the account, send it now
+    email_outbox.notify()
 
     return {"Status": "Ok", "Username": username, "Token": token}
 
-def is_valid_email(email):
-    # Basic format check
-    if not re.match(r"[^@]+@[^@]+\.[^@]+", email):
-        return False
-    
-    # Split email into local part and domain part
-    local_part, domain = email.split("@")
-    
-    # DNS MX record check
-    try:
-        mx_records = socket.getaddrinfo(domain, None, socket.AF_INET, socket.SOCK_STREAM)
-        if not any([record[1] == socket.SOCK_STREAM for record in mx_records]):
-            return False
-    except socket.gaierror:
-        return False
-    
-    return True
-
-
 @router.get("/check_info_usage/{type}/{info}")
 @router.get("/v1/check_info_usage/{type}/{info}")
 async def check_account_info_usage(type: str, info: str):
@@ -343,65 +444,19 @@ async def check_account_info_usage(type: str, info: str):
 
     if type == "emailValid":
         # Check if email is valid
-        email_isValid = is_valid_email(info)
+        email_isValid = await email_validation.is_valid_email(info)
         if not email_isValid:
             raise HTTPException(status_code=400, detail="Invalid Email!")
         else:
             return {"Status": "Ok"}
         
-def send_recovery_email(email):
-    # Load html email document
-    document_path = os.path.join(os.path.dirname(__file__), "../resources/html documents/recovery.html")
-
-    with open(document_path, "r") as document:
-        email_body = document.read()
-        document.close()
-
-    # Generate recovery code
-    recovery_code = ''.join([str(ord(os.urandom(1)) % 10) for _ in range(5)])
-
-    # Add recovery code to email
-    email_body = email_body.replace("{{RECOVERY CODE}}", recovery_code)
-
-    api_key = config.get_key("mailjet-api-key")
-    api_secret = config.get_key("mailjet-api-secret")
-
-    mailjet = Client(auth=(api_key, api_secret), version='v3.1')
-
-    data = {
-        "Messages": [
-            {
-                "From": {
-                    "Email": "no_reply@lifplatforms.com",
-                    "Name": "Lif Platforms"
-                },
-                "To": [
-                    {
-                        "Email": email,
-                        "Name": "Lif Platforms User"
-                    }
-                ],
-                "Subject": "Lif Account Recovery",
-                "TextPart": f"Hello, we have recived a request to reset your password. Here is your recovery code {recovery_code}",
-                "HTMLPart": email_body
-            }
-        ]
-    }
-    mailjet.send.create(data=data)
-    
-    return recovery_code
-
 @router.websocket('/account_recovery')
 @router.websocket('/v1/recovery')
 async def account_recovery(websocket: WebSocket):
     await websocket.accept()
 
-    # Stores email and code for later use
-    user_email = None
-    user_code = None
-
-    # Determines if the user has entered the correct code from the recovery email
-    authenticated = False
+    # Id of the recovery session in the shared store, so any worker can finish the recovery
+    session_id = None
 
     # Wait for client to send data
     while True:
@@ -411,46 +466,38 @@ async def account_recovery(websocket: WebSocket):
 
             # Check what kind of data the client sent
             if 'email' in data:
-                # Check email with database
-                if db_auth.check_email(data['email']):
-                    user_email = data['email']
-
+                try:
                     # Send recovery code to user
-                    user_code = send_recovery_email(user_email)
+                    session_id, found = await run_in_threadpool(recovery.start_recovery, data['email'])
+                except recovery.RateLimited:
+                    await websocket.send_json({"responseType": "error", "message": "Too many requests."})
+                    continue
+
+                if found:
+                    # Wake the outbox worker so the email goes out right away
+                    email_outbox.notify()
 
                     # Tell client email was received
                     await websocket.send_json({"responseType": "emailSent", "message": "Email sent successfully."})
                 else:
                     # Tell client email is invalid
+                    session_id = None
                     await websocket.send_json({"responseType": "error", "message": "Invalid Email!"})
                     
             elif 'code' in data:
                 # Compare generated code with user provided code
-                if data['code'] == user_code:
-                    # Sets the user to authenticated so the password can be updated
-                    authenticated = True
-
+                try:
+                    await run_in_threadpool(recovery.verify_code, session_id or "", str(data['code']))
                     await websocket.send_json({"responseType": "codeCorrect", "message": "Code validated successfully."})
-                else:
+                except (recovery.InvalidSession, recovery.InvalidCode):
                     await websocket.send_json({"responseType": "error", "message": "Bad Code"})
 
             elif 'password' in data:
-                if authenticated:
-                    # Get username from email
-                    username = db_common.get_username_from_email(user_email)
-
-                    if not username:
-                        await websocket.send_json({"responseType": "error", "message": "Internal server error."})
-                        continue
-
+                try:
                     # Update password and salt in database
-                    db_update.update_password(username, data['password'])
-
-                    # Get user token
-                    token = db_info.retrieve_user_token(username)
-
+                    username, token = await run_in_threadpool(recovery.reset_password, session_id or "", data['password'])
                     await websocket.send_json({"responseType": "passwordUpdated", "username": username, "token": token})
-                else:
+                except (recovery.InvalidSession, recovery.NotVerified):
                     await websocket.send_json({"responseType": "error", "message": "You have not authenticated yet"})
             else:
                 await websocket.send_json({"responseType": "error", "message": "Bad Request"})
@@ -460,6 +507,72 @@ async def account_recovery(websocket: WebSocket):
             print("connection closed due to error: " + str(error))
             break
 
+@router.post("/v2/recovery/start")
+def start_account_recovery(email: str = Body(embed=True)):
+    """
+    ## Start Account Recovery
+    Emails a recovery code to the account using the email.
+    A session id is returned even if no account uses the email, so it can't be used to find accounts.
+
+    ### Body:
+    - **email (str):** Email of the account.
+
+    ### Returns:
+    - **JSON:** Id of the recovery session.
+    """
+    try:
+        session_id, found = recovery.start_recovery(email)
+    except recovery.RateLimited:
+        raise HTTPException(status_code=429, detail="Too many recovery requests for this email.")
+
+    if found:
+        email_outbox.notify()
+
+    return {"sessionId": session_id}
+
+@router.post("/v2/recovery/verify")
+def verify_account_recovery(sessionId: str = Body(), code: str = Body()):
+    """
+    ## Verify Recovery Code
+    Checks the code from the recovery email.
+
+    ### Body:
+    - **sessionId (str):** Id of the recovery session.
+    - **code (str):** Code from the recovery email.
+
+    ### Returns:
+    - **JSON:** Status of the operation. Wrong codes and expired sessions get the same error,
+        so the response doesn't tell whether an account uses the email.
+    """
+    try:
+        recovery.verify_code(sessionId, code)
+    except (recovery.InvalidSession, recovery.InvalidCode):
+        raise HTTPException(status_code=400, detail="Bad code or expired session.")
+
+    return {"Status": "Ok"}
+
+@router.post("/v2/recovery/reset")
+def reset_account_recovery(sessionId: str = Body(), password: str = Body()):
+    """
+    ## Reset Password
+    Sets a new password once the recovery code was verified.
+
+    ### Body:
+    - **sessionId (str):** Id of the recovery session.
+    - **password (str):** The new password.
+
+    ### Returns:
+    - **JSON:** Username and token of the account.
+    """
+    try:
+        username, token = recovery.reset_password(sessionId, password)
+    except recovery.InvalidSession:
+        raise HTTPException(status_code=404, detail="Recovery session not found or expired.")
+    except recovery.NotVerified:
+        raise HTTPException(status_code=403, detail="Recovery code has not been verified.")
+
+    return {"username": username, "token": token}
+
 @router.post('/update_email')
 @router.post('/v1/update_email')
 def update_email(username: str = Form(), password: str = Form(), email: str = Form()):
@@ -471,15 +584,18 @@ def update_email(username: str = Form(), password: str = Form(), email: str = Fo
     except db_exceptions.AccountSuspended:
         raise HTTPException(status_code=403, detail="Account suspended.")
 
-    # Check if email is valid
-    if is_valid_email(email):        
-        # Check if email is already in use
-        if not db_auth.check_email(email):
+    # Check if email is valid, the DNS lookup runs on the event loop
+    if from_thread.run(email_validation.is_valid_email, email):        
+        # Check if email is already in use. The filter may not know about emails used on other workers yet.
+        if not db_auth.check_email(email, use_filter=False):
             # Get account ID
             account_id = db_info.get_user_id(username)
 
             # Update email
-            db_update.update_email(account_id, email)
+            try:
+                db_update.update_email(account_id, email)
+            except db_exceptions.Conflict:
+                raise HTTPException(status_code=409, detail="Email already in use!")
 
             return "Ok"
         
@@ -571,6 +687,40 @@ def get_account_id(username: str):
     """
     return db_info.get_user_id(username)
 
+@router.post("/v2/resolve/usernames")
+def resolve_usernames(usernames: List[str] = Body()) -> Dict[str, Optional[str]]:
+    """
+    ## Resolve Usernames
+    Get the user ids for many usernames at once.
+
+    ### Body:
+    - **usernames (list):** Usernames to resolve. Up to 1000 per request.
+
+    ### Returns:
+    - **JSON:** User id for each username, or null if the user was not found.
+    """
+    if len(usernames) > 1000:
+        raise HTTPException(status_code=400, detail="Too many usernames. Max is 1000.")
+
+    return db_resolver.resolve_user_ids(usernames)
+
+@router.post("/v2/resolve/ids")
+def resolve_user_ids(user_ids: List[str] = Body()) -> Dict[str, Optional[str]]:
+    """
+    ## Resolve User Ids
+    Get the usernames for many user ids at once.
+
+    ### Body:
+    - **user_ids (list):** User ids to resolve. Up to 1000 per request.
+
+    ### Returns:
+    - **JSON:** Username for each user id, or null if the user was not found.
+    """
+    if len(user_ids) > 1000:
+        raise HTTPException(status_code=400, detail="Too many user ids. Max is 1000.")
+
+    return db_resolver.resolve_usernames(user_ids)
+
 @router.get("/v1/2fa-setup")
 def setup_2fa(
     username: str = Header(),
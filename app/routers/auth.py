@@ -389,9 +389,8 @@ async def update_permissions(request: Request):
         status = access_control.has_perms(access_token, "account.permissions")
 
         if status:
-            # Check is user exists
-            if db_auth.check_user_exists(account_id, "ACCOUNT_ID"):
-                # Check HTTP method being used
+            # Check HTTP method being used
+            try:
                 if request.method == "POST":
                     # Add permission node
                     db_update.add_permission_node(account_id, node)
@@ -403,7 +402,7 @@ async def update_permissions(request: Request):
                     db_update.remove_permission_node(account_id, node)
 
                     return JSONResponse(content="Permission Removed")
-            else:
+            except db_exceptions.UserNotFound:
                 raise HTTPException(status_code=404, detail="User Not Found")
         else:
             raise HTTPException(status_code=403, detail="No Permission")
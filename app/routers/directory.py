@@ -0,0 +1,216 @@
+from fastapi import APIRouter, HTTPException, Header, Request, Response
+from fastapi.responses import StreamingResponse
+from app.database import directory as db_directory
+from app.directory import snapshot
+from app.directory.events import RESYNC, get_hub
+from typing import AsyncIterator, BinaryIO, Iterator, Optional
+import app.access_control as access_control
+import app.config as config
+import json
+import os
+
+router = APIRouter(
+    prefix="/directory",
+    tags=["Directory"]
+)
+
+# Most accounts returned per page of changes
+MAX_CHANGES = 5000
+
+# Bytes read from the snapshot file at a time
+SNAPSHOT_CHUNK_SIZE = 256 * 1024
+
+# Seconds between keepalive comments on idle event streams
+EVENTS_KEEPALIVE = 15
+
+@router.get("/v2/changes")
+def get_directory_changes(since: Optional[str] = None, limit: int = 1000, access_token: str = Header()):
+    """
+    ## Get Directory Changes
+    Allows services to keep a local copy of the user ids, usernames, roles and permissions of every account.
+    Start without a cursor to read every account, then keep passing the returned cursor to get only what changed.
+
+    ### Headers:
+    - **access-token (str):** Services access token.
+
+    ### Parameters:
+    - **since (str):** Cursor returned by the last call. Leave out to start from the beginning.
+    - **limit (int):** Most accounts to return. Up to 5000.
+
+    ### Returns:
+    - **dict:** The changed accounts in the order they changed, the cursor to pass next time and if there are more changes to read.
+    """
+    if not access_control.verify_token(access_token):
+        raise HTTPException(status_code=403, detail="Invalid Token!")
+
+    if not access_control.has_perms(token=access_token, permission='directory.read'):
+        raise HTTPException(status_code=403, detail="No Permission!")
+
+    if limit < 1 or limit > MAX_CHANGES:
+        raise HTTPException(status_code=400, detail=f"Limit must be between 1 and {MAX_CHANGES}.")
+
+    if since is None:
+        # Before the first version, so accounts that never changed are included too
+        after_version, after_id = -1, db_directory.END_OF_VERSION
+    else:
+        try:
+            after_version, after_id = db_directory.decode_cursor(since)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor.")
+
+    changes = db_directory.get_changes(after_version, after_id, limit)
+
+    if changes:
+        cursor = db_directory.encode_cursor(changes[-1].row_version, changes[-1].id)
+    else:
+        cursor = db_directory.encode_cursor(after_version, after_id)
+
+    return {
+        "changes": [
+            {
+                "userId": change.user_id,
+                "username": change.username,
+                "role": change.role,
+                "permissions": change.permissions,
+            }
+            for change in changes
+        ],
+        "cursor": cursor,
+        "hasMore": len(changes) == limit
+    }
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    # Weak comparison, clients may send the tag back with or without the W/ prefix
+    tags = [tag.strip().removeprefix("W/") for tag in (if_none_match or "").split(",")]
+    return "*" in tags or etag.removeprefix("W/") in tags
+
+def _read_chunks(file: BinaryIO) -> Iterator[bytes]:
+    try:
+        while chunk := file.read(SNAPSHOT_CHUNK_SIZE):
+            yield chunk
+    finally:
+        file.close()
+
+@router.get("/v2/snapshot")
+def get_directory_snapshot(access_token: str = Header(), if_none_match: Optional[str] = Header(default=None)):
+    """
+    ## Get Directory Snapshot
+    Allows services to download every account at once when they start, instead of looking accounts up one by one.
+    The snapshot is a binary file meant to be memory mapped, its layout is described in `app/directory/snapshot.py`.
+    After loading it, pass the `X-Directory-Cursor` header to `/directory/v2/changes` to get what changed since.
+
+    ### Headers:
+    - **access-token (str):** Services access token.
+    - **If-None-Match (str):** ETag of the snapshot the service already has.
+
+    ### Returns:
+    - **bytes:** The snapshot, or status 304 if the service already has it.
+    """
+    if not access_control.verify_token(access_token):
+        raise HTTPException(status_code=403, detail="Invalid Token!")
+
+    if not access_control.has_perms(token=access_token, permission='directory.read'):
+        raise HTTPException(status_code=403, detail="No Permission!")
+
+    path = str(config.get_key("directory-snapshot-path") or "directory-snapshot.bin")
+
+    # Keep the file open so a new snapshot replacing it can't mix with the headers of this one
+    try:
+        file = open(path, "rb")
+    except FileNotFoundError:
+        raise HTTPException(status_code=503, detail="The snapshot has not been generated yet.")
+
+    info = snapshot.read_info(file)
+
+    if info is None:
+        file.close()
+        raise HTTPException(status_code=503, detail="The snapshot has not been generated yet.")
+
+    headers = {
+        # Snapshots of the same version hold the same accounts, but the files made by
+        # different instances differ in their generation time, so the tag is weak
+        "ETag": f'W/"{snapshot.FORMAT_VERSION}-{info.version}"',
+        "X-Directory-Version": str(info.version),
+        "X-Directory-Cursor": db_directory.encode_cursor(info.version),
+    }
+
+    if _etag_matches(if_none_match, headers["ETag"]):
+        file.close()
+        return Response(status_code=304, headers=headers)
+
+    headers["Content-Length"] = str(os.fstat(file.fileno()).st_size)
+    file.seek(0)
+
+    return StreamingResponse(_read_chunks(file), media_type="application/octet-stream", headers=headers)
+
+@router.get("/v2/events")
+async def get_directory_events(
+    request: Request,
+    since: Optional[int] = None,
+    access_token: str = Header(),
+    last_event_id: Optional[str] = Header(default=None)
+):
+    """
+    ## Directory Events
+    Server-sent events for token revocations, role changes and permission changes, pushed as they happen.
+    Services can cache token checks and permissions for longer and drop entries as soon as they change.
+
+    Each event looks like `{"userId": ..., "type": "token" | "role" | "permissions", "role": ...}`.
+    The SSE id of each event can be passed back to replay the events that were missed while disconnected.
+    If the missed events were already purged, `{"type": "resync"}` is sent first. The service must then
+    drop what it cached and reload from `/directory/v2/snapshot` and `/directory/v2/changes`.
+
+    ### Headers:
+    - **access-token (str):** Services access token.
+    - **Last-Event-ID (str):** Id of the last event received. Sent by SSE clients when they reconnect.
+
+    ### Parameters:
+    - **since (int):** Replay the events after this id first. Leave out to only get new events.
+
+    ### Returns:
+    - **text/event-stream:** The events.
+    """
+    if not access_control.verify_token(access_token):
+        raise HTTPException(status_code=403, detail="Invalid Token!")
+
+    if not access_control.has_perms(token=access_token, permission='directory.read'):
+        raise HTTPException(status_code=403, detail="No Permission!")
+
+    hub = get_hub()
+
+    if not hub.running:
+        raise HTTPException(status_code=503, detail="Events are not available.")
+
+    after_id = since
+
+    if last_event_id is not None:
+        try:
+            after_id = int(last_event_id)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid Last-Event-ID.")
+
+    async def stream() -> AsyncIterator[str]:
+        async for event in hub.subscribe(after_id, keepalive=EVENTS_KEEPALIVE):
+            if event is None:
+                if await request.is_disconnected():
+                    return
+
+                yield ": keepalive\n\n"
+                continue
+
+            if event.kind == RESYNC:
+                yield f"id: {event.id}\ndata: {json.dumps({'type': RESYNC})}\n\n"
+                continue
+
+            data = {"userId": event.user_id, "type": event.kind}
+
+            if event.role is not None:
+                data["role"] = event.role
+
+            yield f"id: {event.id}\ndata: {json.dumps(data)}\n\n"
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
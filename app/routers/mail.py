@@ -13,14 +13,54 @@ from app.database import info as db_info
 from app.database import auth as db_auth
 from app.database import exceptions as db_exceptions
 from app.database import common as db_common
-from mailjet_rest import Client
-import app.config as config
+from app.database import mail as db_mail
+from app.mail import bulk
+from app.mail.templates import BulkEmail
+from app.tasks import mail_jobs
+from fastapi.concurrency import run_in_threadpool
+from typing import Optional
+import itertools
 
 router = APIRouter(
     prefix="/mail",
     tags=["Mail"]
 )
 
+def check_placeholders(email: BulkEmail) -> None:
+    unknown = email.unknown_placeholders()
+
+    # Unknown placeholders are usually typos, sending them would show the braces to every user
+    if unknown:
+        known = ", ".join(f"{{{{{name}}}}}" for name in sorted(BulkEmail.PLACEHOLDERS))
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown placeholders: {', '.join(unknown)}. Available placeholders: {known}"
+        )
+
+def send_to_all(subject: str, text: str, html: Optional[str]) -> None:
+    # Compile the email once and render it for each recipient
+    email = BulkEmail(subject, text, html)
+    check_placeholders(email)
+
+    # Stream accounts as they are sent to instead of loading them all
+    accounts = db_info.iter_mail_recipients()
+    first = next(accounts, None)
+
+    if not first:
+        raise HTTPException(status_code=404, detail="No accounts to email.")
+
+    result = bulk.send_bulk(
+        recipients=itertools.chain([first], accounts),
+        build_message=email.message_for
+    )
+
+    # Check email send status
+    if result.failed:
+        raise HTTPException(
+            status_code=502,
+            detail=f"Email failed to send to {result.failed} of {result.sent + result.failed} accounts! Send id: {result.send_id}"
+        )
+
 @router.post("/send_all")
 @router.post("/v1/send_all")
 async def send_all_mail(request: Request):
@@ -59,53 +99,33 @@ async def send_all_mail(request: Request):
     # Get email body
     body = (await request.body()).decode('utf-8')
 
-    # Get all accounts
-    accounts = db_info.get_all_accounts()
-
-    mailjetKey = config.get_key("mailjet-api-key")
-    mailjetSecret = config.get_key("mailjet-api-secret")
+    # Send the email in a thread so the event loop isn't blocked for the whole send
+    await run_in_threadpool(send_to_all, subject or "", body, None)
 
-    # Create mailjet client
-    mailjet = Client(
-        auth=(mailjetKey, mailjetSecret),
-        version="v3.1"
-    )
-
-    # Create messages for email recipients
-    messages = []
+    return "Ok"
 
-    if not accounts:
-        raise HTTPException(status_code=404, detail="No accounts to email.")
+def verify_mail_admin(username: str, token: str) -> str:
+    try:
+        db_auth.check_token(username, token)
+    except db_exceptions.InvalidToken:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    except db_exceptions.AccountSuspended:
+        raise HTTPException(status_code=403, detail="Account is suspended")
+    
+    # Get the users account id
+    account_id = db_common.get_user_id(username)
 
-    for account in accounts:
-         messages.append({
-            "From": {
-                "Email": "no_reply@lifplatforms.com",
-                "Name": "Lif Platforms"
-            },
-            "To": [
-                {
-                    "Email": account[3],
-                    "Name": account[1]
-                },
-            ],
-            "Subject": subject,
-            "TextPart": body,
-        })
-
-    # Define request data
-    data = {
-        "Messages": messages
-    }
+    if not account_id:
+        raise HTTPException(status_code=500, detail="Internal server error")
 
-    # Send email
-    email_result = mailjet.send.create(data=data)
+    # Check if the user has permission to send all mail
+    if not db_auth.check_account_permission(
+        account_id,
+        "email.send_all"
+    ):
+        raise HTTPException(status_code=403, detail="Insufficient permissions")
 
-    # Check email send status
-    if email_result.status_code != 200:
-        raise HTTPException(status_code=email_result.status_code, detail="Email failed to send!")
-
-    return "Ok"
+    return account_id
 
 @router.post("/v2/send_all")
 def send_all_v2(
@@ -117,7 +137,7 @@ def send_all_v2(
 ):
     """
     ## Send All Mail
-    Sends an email to all users.
+    Queues an email to all users. The email is sent in the background, use the job id to follow its progress.
 
     ### Headers:
     - **username (str):** Your admin username.
@@ -126,78 +146,62 @@ def send_all_v2(
     ### Body:
     - **subject (str):** The subject of the email.
     - **textBody (str):** The content of the email.
+    - **file (file):** Optional HTML content of the email.
 
     ### Returns:
-    - **STRING:** Status of operation.
+    - **dict:** Id of the mail job.
     """
-    try:
-        db_auth.check_token(username, token)
-    except db_exceptions.InvalidToken:
-        raise HTTPException(status_code=401, detail="Invalid token")
-    except db_exceptions.AccountSuspended:
-        raise HTTPException(status_code=403, detail="Account is suspended")
-    
-    # Get the users account id
-    account_id = db_common.get_user_id(username)
-
-    if not account_id:
-        raise HTTPException(status_code=500, detail="Internal server error")
-
-    # Check if the user has permission to send all mail
-    if not db_auth.check_account_permission(
-        account_id,
-        "email.send_all"
-    ):
-        raise HTTPException(status_code=403, detail="Insufficient permissions")
-    
-    # Get all accounts
-    accounts = db_info.get_all_accounts()
+    account_id = verify_mail_admin(username, token)
 
-    mailjetKey = config.get_key("mailjet-api-key")
-    mailjetSecret = config.get_key("mailjet-api-secret")
+    # Read the HTML once and use it for every recipient
+    html = file.file.read().decode('utf-8') if file else None
+    check_placeholders(BulkEmail(subject, textBody, html))
 
-    # Create mailjet client
-    mailjet = Client(
-        auth=(mailjetKey, mailjetSecret),
-        version="v3.1"
-    )
+    job_id = db_mail.create_job(subject, textBody, html, account_id)
+    mail_jobs.notify()
 
-    # Create messages for email recipients
-    messages = []
+    return {"jobId": job_id}
 
-    if not accounts:
-        raise HTTPException(status_code=404, detail="No accounts to email.")
+@router.get("/v2/jobs/{job_id}")
+def get_mail_job(job_id: str, username: str = Header(), token: str = Header()):
+    """
+    ## Get Mail Job
+    Get the progress of an email sent to all users.
 
-    for account in accounts:
-        message = {
-            "From": {
-                "Email": "no_reply@lifplatforms.com",
-                "Name": "Lif Platforms"
-            },
-            "To": [
-                {
-                    "Email": account[3],
-                    "Name": account[1]
-                },
-            ],
-            "Subject": subject,
-            "TextPart": textBody,
-        }
-
-        if file:
-            file_content = file.file.read()
-            html_string = file_content.decode('utf-8')
-            message["HTMLPart"] = html_string
-
-        messages.append(message)
-
-    # Send email
-    email_result = mailjet.send.create(data={
-        "Messages": messages
-    })
+    ### Headers:
+    - **username (str):** Your admin username.
+    - **token (str):** Your admin token.
 
-    # Check email send status
-    if email_result.status_code != 200:
-        raise HTTPException(status_code=email_result.status_code, detail="Email failed to send!")
+    ### Parameters:
+    - **job_id (str):** Id of the mail job.
 
-    return "Ok"
\ No newline at end of file
+    ### Returns:
+    - **dict:** Status, counts and throughput of the job.
+    """
+    verify_mail_admin(username, token)
+
+    job = db_mail.get_job(job_id)
+
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    # Emails per second since the job started
+    throughput = 0.0
+
+    if job.elapsed and job.elapsed > 0:
+        throughput = job.sent / job.elapsed
+
+    return {
+        "id": job.id,
+        "status": job.status,
+        "total": job.total,
+        "sent": job.sent,
+        "failed": job.failed,
+        "unknown": job.unknown,
+        "pending": max(job.total - job.sent - job.failed - job.unknown, 0) if job.status != "completed" else 0,
+        "throughput": throughput,
+        "error": job.error,
+        "createdAt": job.created_at,
+        "startedAt": job.started_at,
+        "finishedAt": job.finished_at,
+    }
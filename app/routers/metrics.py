@@ -0,0 +1,76 @@
+from fastapi import APIRouter, HTTPException, Header
+from app.cache import get_caches
+from app.database import availability
+from app.invalidation import get_follower
+import app.access_control as access_control
+
+router = APIRouter(
+    prefix="/metrics",
+    tags=["Metrics"]
+)
+
+@router.get("/v1/caches")
+def get_cache_metrics(access_token: str = Header()):
+    """
+    ## Get Cache Metrics
+    Get the size and hit rate of the in-memory caches on this worker.
+
+    ### Headers:
+    - **access-token (str):** Your auth server access token.
+
+    ### Returns:
+    - **list:** Metrics for each cache.
+    """
+    if not access_control.verify_token(access_token):
+        raise HTTPException(status_code=401, detail="Invalid access token.")
+
+    if not access_control.has_perms(access_token, "metrics.read"):
+        raise HTTPException(status_code=403, detail="No permission.")
+
+    return [cache.stats() for cache in get_caches()]
+
+@router.get("/v1/availability")
+def get_availability_metrics(access_token: str = Header()):
+    """
+    ## Get Availability Filter Metrics
+    Get the size of the username and email filters on this worker and how many database checks they avoided.
+
+    ### Headers:
+    - **access-token (str):** Your auth server access token.
+
+    ### Returns:
+    - **dict:** Metrics for the filters.
+    """
+    if not access_control.verify_token(access_token):
+        raise HTTPException(status_code=401, detail="Invalid access token.")
+
+    if not access_control.has_perms(access_token, "metrics.read"):
+        raise HTTPException(status_code=403, detail="No permission.")
+
+    return availability.stats()
+
+@router.get("/v1/invalidations")
+def get_invalidation_metrics(access_token: str = Header()):
+    """
+    ## Get Cache Invalidation Metrics
+    Get how far this worker is in the cache invalidation log and how long after a write on another worker
+    the stale cache entries were evicted here.
+
+    ### Headers:
+    - **access-token (str):** Your auth server access token.
+
+    ### Returns:
+    - **dict:** Metrics for this worker.
+    """
+    if not access_control.verify_token(access_token):
+        raise HTTPException(status_code=401, detail="Invalid access token.")
+
+    if not access_control.has_perms(access_token, "metrics.read"):
+        raise HTTPException(status_code=403, detail="No permission.")
+
+    follower = get_follower()
+
+    if follower is None:
+        raise HTTPException(status_code=503, detail="Cache invalidations are not followed on this worker.")
+
+    return follower.stats()
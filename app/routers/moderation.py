@@ -5,7 +5,7 @@ from app.database import info as db_info
 from app.database import exceptions as db_exceptions
 from app.database import update as db_update
 from app.models import moderation as mod_models
-from typing import List
+from typing import List, Literal, Optional
 from app.models import database as db_models
 
 router = APIRouter(
@@ -112,12 +112,7 @@ def manage_privileges(
 
     return {"status": "ok"}
 
-@router.get("/v1/user-search")
-def search_users(
-    query: str = Query(),
-    username: str = Header(),
-    token: str = Header()
-) -> List[db_models.UserSearch]:
+def _check_search_permission(username: str, token: str) -> None:
     # Verify user credentials
     try:
         db_auth.check_token(username, token)
@@ -136,9 +131,55 @@ def search_users(
         node="moderation.search_users"
     ): raise HTTPException(status_code=403, detail="No permission.")
 
-    searchResults: List[db_models.UserSearch] = db_info.search_users(query)
+@router.get("/v1/user-search")
+def search_users(
+    query: str = Query(),
+    username: str = Header(),
+    token: str = Header()
+) -> List[db_models.UserSearch]:
+    _check_search_permission(username, token)
+
+    # Clients of this version add their own wildcards to the query
+    searchResults: List[db_models.UserSearch] = db_info.search_users(query, literal=False).results
     return searchResults
 
+@router.get("/v2/user-search")
+def search_users_v2(
+    query: str = Query(),
+    by: Literal["username", "userID", "email"] = Query(default="username"),
+    cursor: Optional[str] = Query(default=None),
+    limit: int = Query(default=20),
+    username: str = Header(),
+    token: str = Header()
+) -> db_models.UserSearchPage:
+    """
+    ## Search Users
+    Finds users whose username, user id or email starts with the query.
+    Keep passing the returned cursor with the same query to get the next page.
+
+    ### Headers:
+    - **username (str):** Username of the moderator.
+    - **token (str):** Token of the moderator.
+
+    ### Query Parameters:
+    - **query (str):** Start of the value to search for.
+    - **by (str):** 'username', 'userID' or 'email'.
+    - **cursor (str):** Cursor returned by the last call. Leave out for the first page.
+    - **limit (int):** Most results to return. Up to 100.
+
+    ### Returns:
+    - **JSON:** The users with their roles and permissions, the cursor for the next page and if there are more results.
+    """
+    _check_search_permission(username, token)
+
+    if limit < 1 or limit > 100:
+        raise HTTPException(status_code=400, detail="Limit must be between 1 and 100.")
+
+    try:
+        return db_info.search_users(query, by, cursor, limit)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+
 @router.get("/v1/get_user/{user_id}")
 def get_user(
     user_id: str,
@@ -1,11 +1,16 @@
-from fastapi import APIRouter, HTTPException, Response
-from fastapi.responses import FileResponse, HTMLResponse
-import os
+from fastapi import APIRouter, HTTPException, Response, Request, Body
+from fastapi.responses import FileResponse, HTMLResponse, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 import io
 from PIL import Image, ImageDraw
 import re
+from typing import Optional, Tuple, List
 from app.database import info as db_info
 from app.database import auth as db_auth
+from app.database import profiles as db_profiles
+from app.models import profile as profile_models
+from app.storage import provider as storage
+from app.storage.base import ObjectNotFound
 
 router = APIRouter(
     prefix="/profile",
@@ -38,7 +43,37 @@ async def get_user_bio(username: str):
 async def get_user_pronouns(username: str):
     return db_info.get_pronouns(username=username)
 
-    
+
+@router.post("/v2/get_profiles")
+def get_profiles(usernames: List[str] = Body()) -> List[Optional[profile_models.PublicProfile]]:
+    """
+    ## Get Public Profiles
+    Allows services to get the public profile info for many accounts at once.
+
+    ### Body:
+    - **usernames (list):** Usernames of the accounts. Up to 100 per request.
+
+    ### Returns:
+    - **list:** The profile for each username in the order given, or null if the user was not found.
+    """
+    if len(usernames) > 100:
+        raise HTTPException(status_code=400, detail="Too many usernames. Max is 100.")
+
+    profiles = db_profiles.get_profiles(usernames)
+    results: List[Optional[profile_models.PublicProfile]] = []
+
+    for username in usernames:
+        profile = profiles.get(username)
+
+        results.append(profile_models.PublicProfile(
+            userId=profile.user_id,
+            username=profile.username,
+            bio=profile.bio,
+            pronouns=profile.pronouns
+        ) if profile else None)
+
+    return results
+
 def crop_to_circle(image: Image.Image) -> Image.Image:
     """
     Crop an image to a circle shape.
@@ -62,6 +97,16 @@ def crop_to_circle(image: Image.Image) -> Image.Image:
     result.paste(image, (0, 0), mask)
     return result
 
+def _image_name(username: str) -> Optional[str]:
+    # Sanitize the username
+    filtered_username = re.sub(r'[^a-zA-Z1-9\._]+', '', username)
+
+    # Nothing left, or only dots that would point at the image folder itself
+    if not filtered_username.strip("."):
+        return None
+
+    return filtered_username
+
 @router.get("/get_avatar/{username}")
 @router.get("/v1/get_avatar/{username}")
 async def get_pfp(username: str, crop: bool = False):
@@ -78,17 +123,20 @@ async def get_pfp(username: str, crop: bool = False):
     ### Returns:
     - **file:** The avatar the service requested.
     """
-    # Sanitize the username
-    filtered_username = re.sub(r'[^a-zA-Z1-9\._]+', '', username)
-        
-    # Construct the file path using the sanitized username
-    avatar_path = f"user_images/pfp/{filtered_username}"
+    filtered_username = _image_name(username)
 
-    # Check if the file exists and is a regular file
-    if os.path.isfile(avatar_path):
-        image = Image.open(avatar_path)
-    else:
-        # Load default image if the user's banner doesn't exist
+    # Load the avatar from storage
+    try:
+        if filtered_username is None:
+            raise ObjectNotFound()
+
+        contents = await run_in_threadpool(
+            storage.get_storage().read_bytes,
+            f"pfp/{filtered_username}"
+        )
+        image = Image.open(io.BytesIO(contents))
+    except ObjectNotFound:
+        # Load default image if the user's avatar doesn't exist
         image = Image.open('app/assets/default_pfp.png')
 
     # Crop the image to a circle if the crop parameter is True
@@ -103,12 +151,50 @@ async def get_pfp(username: str, crop: bool = False):
     # Serve the image
     return Response(content=img_byte_arr.getvalue(), media_type='image/png')
 
+def parse_range(range_header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single HTTP byte range.
+
+    Parameters:
+        range_header (Optional[str]): Value of the Range header.
+        size (int): Size of the resource in bytes.
+
+    Raises:
+        HTTPException: The range can't be satisfied.
+
+    Returns:
+        out (Optional[Tuple[int, int]]): First and last byte (inclusive) or None to send the whole resource.
+    """
+    # Malformed and multi-part ranges are ignored and the whole resource is sent
+    match = re.fullmatch(r"bytes=(\d*)-(\d*)", (range_header or "").strip())
+
+    if not match or match.group(1) == match.group(2) == "":
+        return None
+
+    if match.group(1) == "":
+        # Suffix range, the last N bytes
+        start = max(size - int(match.group(2)), 0)
+        end = size - 1
+    else:
+        start = int(match.group(1))
+        end = min(int(match.group(2)), size - 1) if match.group(2) else size - 1
+
+    if start > end or start >= size:
+        raise HTTPException(
+            status_code=416,
+            detail="Range not satisfiable",
+            headers={"Content-Range": f"bytes */{size}"}
+        )
+
+    return start, end
+
 @router.get("/get_banner/{username}")
 @router.get("/v1/get_banner/{username}")
-async def get_banner(username: str):
+async def get_banner(username: str, request: Request):
     """
     ## Get User Banner
     Allows services to get the account banner of a specified account.
+    Supports range requests.
     
     ### Parameters:
     - **username (str):** The username for the account.
@@ -116,20 +202,55 @@ async def get_banner(username: str):
     ### Returns:
     - **file:** The banner the service requested.
     """
-    # Sanitize the username
-    filtered_username = re.sub(r'[^a-zA-Z1-9\._]+', '', username)
+    filtered_username = _image_name(username)
+    banner_key = f"banner/{filtered_username}"
+    image_storage = storage.get_storage()
 
-    # Construct the file path using the sanitized username
-    banner_path = f"user_images/banner/{filtered_username}"
+    info = await run_in_threadpool(image_storage.stat, banner_key) if filtered_username else None
 
-    # Check if the file exists and is a regular file
-    if os.path.isfile(banner_path):
-        response = FileResponse(banner_path, media_type='image/gif')
-    else:
-        # Return default image if the user's banner doesn't exist
-        response = FileResponse(f'app/assets/default_banner.png', media_type='image/gif')
+    headers = {
+        "Cache-Control": "public, max-age=3600",
+        "Accept-Ranges": "bytes"
+    }
+
+    if info:
+        etag = f'"{info.etag}"'
+        headers["ETag"] = etag
+
+        # Let clients reuse the banner they already have
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers=headers)
+
+        byte_range = parse_range(request.headers.get("range"), info.size)
+        start, end = byte_range if byte_range else (0, info.size - 1)
+
+        try:
+            chunks = await run_in_threadpool(
+                image_storage.read,
+                banner_key,
+                start,
+                end if byte_range else None
+            )
+        except ObjectNotFound:
+            chunks = None
+
+        if chunks is not None:
+            headers["Content-Length"] = str(end - start + 1)
+
+            if byte_range:
+                headers["Content-Range"] = f"bytes {start}-{end}/{info.size}"
+
+            return StreamingResponse(
+                chunks,
+                status_code=206 if byte_range else 200,
+                media_type='image/gif',
+                headers=headers
+            )
+
+    # Return default image if the user's banner doesn't exist
+    response = FileResponse(f'app/assets/default_banner.png', media_type='image/gif')
 
     # Add caching time limit to image
     response.headers["Cache-Control"] = "public, max-age=3600"
 
-    return response
\ No newline at end of file
+    return response
@@ -1,15 +1,32 @@
+from datetime import datetime
 from fastapi import APIRouter, HTTPException, Request, Form
-from typing import Optional
+from typing import Any, Dict, Optional
 from app.database import exceptions as db_exceptions
 from app.database import reports as db_reports
 from app.database import auth as db_auth
 from app.database import info as db_info
+from app.database.rows import Report
 
 router = APIRouter(
     prefix="/moderation/reports",
     tags=["Reports"]
 )
 
+# Most reports returned per page
+MAX_PAGE_SIZE = 500
+
+def _format_report(report: Report, v1: bool = False) -> Dict[str, Any]:
+    return {
+        "id": report.id,
+        "user": report.user,
+        "service": report.service,
+        "reason": report.reason,
+        "content": report.content,
+        # v1 clients get resolved as the 0/1 the column used to return
+        "resolved": int(report.resolved) if v1 else report.resolved,
+        "createdAt": report.created_at.isoformat() if report.created_at else None
+    }
+
 @router.get("/get_reports")
 @router.get("/v1/get")
 def get_reports(request: Request, search_filter: Optional[str] = None):
@@ -52,20 +69,110 @@ def get_reports(request: Request, search_filter: Optional[str] = None):
     # Get reports from database
     reports = db_reports.get_reports(search_filter)
 
-    # Format reports for client
-    format_reports = []
+    return [_format_report(report, v1=True) for report in reports]
+
+@router.get("/v2/list")
+def list_reports(
+    request: Request,
+    status: Optional[str] = None,
+    service: Optional[str] = None,
+    user: Optional[str] = None,
+    reason: Optional[str] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    order: str = "id",
+    direction: str = "asc",
+    limit: int = 100,
+    cursor: Optional[str] = None
+):
+    """
+    ## List Reports
+    Pages through users reports. Keep passing the returned cursor with the same filters and order to get the next page.
+
+    ### Headers:
+    - **username (str):** Username of a moderator.
+    - **token (str):** Token of the moderator.
+
+    ### Query Parameters:
+    - **status (str):** 'unresolved' or 'resolved'. Leave out for both.
+    - **service (str):** Only reports submitted from this service.
+    - **user (str):** Only reports against this user.
+    - **reason (str):** Only reports with this reason.
+    - **created_after (datetime):** Only reports submitted at or after this time.
+    - **created_before (datetime):** Only reports submitted before this time.
+    - **order (str):** 'id' or 'created'.
+    - **direction (str):** 'asc' for oldest first or 'desc' for newest first.
+    - **limit (int):** Most reports to return. Up to 500.
+    - **cursor (str):** Cursor returned by the last call. Leave out to start from the first page.
+
+    ### Returns:
+    - **JSON:** The reports, the cursor for the next page and if there are more reports to read.
+    """
+    # Get auth information
+    username = request.headers.get("username")
+    token = request.headers.get("token")
+
+    if not username or not token:
+        raise HTTPException(status_code=400, detail="Username and token required.")
 
-    for report in reports:
-        format_reports.append({
-            "id": report[0], 
-            "user": report[1], 
-            "service": report[2], 
-            "reason": report[3], 
-            "content": report[4], 
-            "resolved": bool(report[5])
-        })
+    # Verify user credentials
+    try:
+        db_auth.check_token(username, token)
+    except db_exceptions.InvalidToken:
+        raise HTTPException(status_code=401, detail="Invalid token.")
+    except db_exceptions.AccountSuspended:
+        raise HTTPException(status_code=403, detail="Account suspended.")
+
+    # Check if user has moderator role
+    if not db_info.get_role(username) == "MODERATOR":
+        raise HTTPException(status_code=403, detail="No permission.")
+
+    if status not in ("resolved", "unresolved", None):
+        raise HTTPException(status_code=400, detail="Invalid status.")
+
+    if order not in (db_reports.ORDER_ID, db_reports.ORDER_CREATED):
+        raise HTTPException(status_code=400, detail="Order must be 'id' or 'created'.")
+
+    if direction not in ("asc", "desc"):
+        raise HTTPException(status_code=400, detail="Direction must be 'asc' or 'desc'.")
+
+    if limit < 1 or limit > MAX_PAGE_SIZE:
+        raise HTTPException(status_code=400, detail=f"Limit must be between 1 and {MAX_PAGE_SIZE}.")
+
+    descending = direction == "desc"
+    after = None
+
+    if cursor is not None:
+        try:
+            after = db_reports.decode_cursor(cursor, order, descending)
+        except ValueError as error:
+            raise HTTPException(status_code=400, detail=str(error))
+
+    filter = db_reports.ReportFilter(
+        resolved=None if status is None else status == "resolved",
+        service=service,
+        user=user,
+        reason=reason,
+        created_after=created_after,
+        created_before=created_before
+    )
+
+    # Read one extra report to know if there is another page
+    reports = db_reports.list_reports(filter, order, descending, after, limit + 1)
+    has_more = len(reports) > limit
+    reports = reports[:limit]
+
+    # Past the last report read, or where the caller was if there was nothing new
+    if reports:
+        next_cursor = db_reports.encode_cursor(reports[-1], order, descending)
+    else:
+        next_cursor = cursor
 
-    return format_reports
+    return {
+        "reports": [_format_report(report) for report in reports],
+        "cursor": next_cursor,
+        "hasMore": has_more
+    }
 
 @router.get("/get_report/{report_id}")
 @router.get("/v1/get/{report_id}")
@@ -104,14 +211,7 @@ def get_report(request: Request, report_id: int):
 
     # Check if report was found
     if report:
-        return {
-            "id": report[0],
-            "user": report[1],
-            "service": report[2],
-            "reason": report[3],
-            "content": report[4],
-            "resolved": report[5]
-        }
+        return _format_report(report, v1=True)
     else:
         raise HTTPException(status_code=404, detail="Report Not Found")
     
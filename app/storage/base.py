@@ -0,0 +1,135 @@
+from abc import ABC, abstractmethod
+import tempfile
+from dataclasses import dataclass
+from typing import BinaryIO, Iterator, Optional
+
+CHUNK_SIZE = 64 * 1024
+
+class ObjectNotFound(Exception):
+    pass
+
+@dataclass
+class ObjectInfo:
+    key: str
+    size: int
+    modified: float
+    etag: str
+
+class Storage(ABC):
+    """
+    Interface for where user images are stored.
+    Keys are '/' separated paths such as 'pfp/username.png'.
+    """
+    @abstractmethod
+    def stat(self, key: str) -> Optional[ObjectInfo]:
+        """
+        Get info about an object.
+
+        Parameters:
+            key (str): Key of the object.
+
+        Returns:
+            out (Optional[ObjectInfo]): Info about the object or None if it doesn't exist.
+        """
+
+    @abstractmethod
+    def read(self, key: str, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        """
+        Stream the contents of an object.
+
+        Parameters:
+            key (str): Key of the object.
+            start (int): First byte to read.
+            end (Optional[int]): Last byte to read (inclusive). Reads to the end if not given.
+
+        Raises:
+            app.storage.base.ObjectNotFound: The object does not exist.
+
+        Returns:
+            out (Iterator[bytes]): Chunks of the object.
+        """
+
+    @abstractmethod
+    def write(self, key: str, stream: BinaryIO, content_type: str = "application/octet-stream") -> int:
+        """
+        Store an object, replacing it if it already exists.
+
+        Parameters:
+            key (str): Key of the object.
+            stream (BinaryIO): Seekable stream with the contents of the object.
+            content_type (str): Media type of the object.
+
+        Returns:
+            out (int): Number of bytes written.
+        """
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """
+        Delete an object. Deleting an object that doesn't exist is not an error.
+
+        Parameters:
+            key (str): Key of the object.
+        """
+
+    @abstractmethod
+    def list(self, prefix: str) -> Iterator[ObjectInfo]:
+        """
+        List the objects under a prefix.
+
+        Parameters:
+            prefix (str): Prefix of the keys to list, such as 'pfp/'.
+
+        Returns:
+            out (Iterator[ObjectInfo]): The objects found.
+        """
+
+    def move(self, key: str, new_key: str) -> None:
+        """
+        Move an object to a new key.
+
+        Parameters:
+            key (str): Current key of the object.
+            new_key (str): Key to move the object to.
+
+        Raises:
+            app.storage.base.ObjectNotFound: The object does not exist.
+        """
+        # Backends that can move objects natively override this
+        with _IteratorStream(self.read(key)) as stream:
+            self.write(new_key, stream)
+
+        self.delete(key)
+
+    def read_bytes(self, key: str) -> bytes:
+        """
+        Read a whole object into memory.
+
+        Parameters:
+            key (str): Key of the object.
+
+        Raises:
+            app.storage.base.ObjectNotFound: The object does not exist.
+
+        Returns:
+            out (bytes): Contents of the object.
+        """
+        return b"".join(self.read(key))
+
+class _IteratorStream:
+    """
+    Spools an iterator of chunks into a temporary file so it can be written to another backend.
+    """
+    def __init__(self, chunks: Iterator[bytes]):
+        self.file = tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024)
+
+        for chunk in chunks:
+            self.file.write(chunk)
+
+        self.file.seek(0)
+
+    def __enter__(self):
+        return self.file
+
+    def __exit__(self, *args):
+        self.file.close()
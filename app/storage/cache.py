@@ -0,0 +1,171 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import BinaryIO, Iterator, Optional
+from app.storage.base import CHUNK_SIZE, ObjectInfo, Storage
+
+@dataclass
+class _CacheEntry:
+    info: ObjectInfo
+    path: str
+    cached_at: float
+
+class CachedStorage(Storage):
+    """
+    Keeps recently read objects from a remote backend on the local disk.
+    Entries expire after a TTL so changes made through other nodes are picked up,
+    and the least recently used entries are evicted once the cache is full.
+    """
+    def __init__(self, backend: Storage, directory: str, max_bytes: int, ttl: float):
+        self.backend = backend
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.entries: OrderedDict[str, _CacheEntry] = OrderedDict()
+        self.total_bytes = 0
+        self.lock = threading.Lock()
+
+        # Every process gets its own cache directory since the index lives in memory
+        self.directory = os.path.join(directory, str(os.getpid()))
+        shutil.rmtree(self.directory, ignore_errors=True)
+        os.makedirs(self.directory)
+
+    def _get(self, key: str) -> Optional[_CacheEntry]:
+        with self.lock:
+            entry = self.entries.get(key)
+
+            if not entry:
+                return None
+
+            if time.monotonic() - entry.cached_at > self.ttl:
+                self._drop(key)
+                return None
+
+            self.entries.move_to_end(key)
+            return entry
+
+    def _drop(self, key: str) -> None:
+        # Must be called while holding the lock
+        entry = self.entries.pop(key, None)
+
+        if entry:
+            self.total_bytes -= entry.info.size
+
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                pass
+
+    def _add(self, info: ObjectInfo, temp_path: str) -> None:
+        if info.size > self.max_bytes:
+            os.remove(temp_path)
+            return
+
+        path = os.path.join(self.directory, hashlib.sha256(info.key.encode()).hexdigest())
+
+        with self.lock:
+            self._drop(info.key)
+            os.replace(temp_path, path)
+            self.entries[info.key] = _CacheEntry(info=info, path=path, cached_at=time.monotonic())
+            self.total_bytes += info.size
+
+            # Evict the least recently used objects until the cache fits
+            while self.total_bytes > self.max_bytes and self.entries:
+                self._drop(next(iter(self.entries)))
+
+    def invalidate(self, key: str) -> None:
+        """
+        Remove an object from the cache.
+
+        Parameters:
+            key (str): Key of the object.
+        """
+        with self.lock:
+            self._drop(key)
+
+    def stat(self, key: str) -> Optional[ObjectInfo]:
+        entry = self._get(key)
+
+        if entry:
+            return entry.info
+
+        return self.backend.stat(key)
+
+    def read(self, key: str, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        entry = self._get(key)
+
+        if entry:
+            try:
+                return self._read_cached(open(entry.path, "rb"), start, end)
+            except FileNotFoundError:
+                # Evicted between the lookup and the open
+                pass
+
+        # Partial reads go straight to the backend
+        if start or end is not None:
+            return self.backend.read(key, start, end)
+
+        info = self.backend.stat(key)
+        chunks = self.backend.read(key)
+
+        if not info:
+            return chunks
+
+        return self._read_through(info, chunks)
+
+    def _read_cached(self, file: BinaryIO, start: int, end: Optional[int]) -> Iterator[bytes]:
+        with file:
+            file.seek(start)
+            remaining = None if end is None else end - start + 1
+
+            while remaining is None or remaining > 0:
+                chunk = file.read(CHUNK_SIZE if remaining is None else min(CHUNK_SIZE, remaining))
+
+                if not chunk:
+                    break
+
+                if remaining is not None:
+                    remaining -= len(chunk)
+
+                yield chunk
+
+    def _read_through(self, info: ObjectInfo, chunks: Iterator[bytes]) -> Iterator[bytes]:
+        # Copy the object into the cache while it is streamed to the caller
+        descriptor, temp_path = tempfile.mkstemp(dir=self.directory, prefix=".partial-")
+        written = 0
+
+        try:
+            with os.fdopen(descriptor, "wb") as file:
+                for chunk in chunks:
+                    file.write(chunk)
+                    written += len(chunk)
+                    yield chunk
+        except BaseException:
+            os.remove(temp_path)
+            raise
+
+        # Only cache objects that were read completely and didn't change mid-read
+        if written == info.size:
+            self._add(info, temp_path)
+        else:
+            os.remove(temp_path)
+
+    def write(self, key: str, stream: BinaryIO, content_type: str = "application/octet-stream") -> int:
+        self.invalidate(key)
+        return self.backend.write(key, stream, content_type)
+
+    def delete(self, key: str) -> None:
+        self.invalidate(key)
+        self.backend.delete(key)
+
+    def list(self, prefix: str) -> Iterator[ObjectInfo]:
+        return self.backend.list(prefix)
+
+    def move(self, key: str, new_key: str) -> None:
+        self.invalidate(key)
+        self.invalidate(new_key)
+        self.backend.move(key, new_key)
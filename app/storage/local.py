@@ -0,0 +1,121 @@
+import hashlib
+import os
+import stat as stat_module
+import tempfile
+from typing import BinaryIO, Iterator, Optional
+from app.storage.base import CHUNK_SIZE, ObjectInfo, ObjectNotFound, Storage
+
+class LocalStorage(Storage):
+    """
+    Stores objects as files on the local filesystem.
+    """
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        path = os.path.abspath(os.path.join(self.root, key))
+
+        # Never allow a key to escape the storage root
+        if os.path.commonpath([self.root, path]) != self.root or path == self.root:
+            raise ValueError(f"Invalid storage key: {key}")
+
+        return path
+
+    def _info(self, key: str, stat: os.stat_result) -> ObjectInfo:
+        etag = hashlib.md5(f"{stat.st_mtime_ns}-{stat.st_size}".encode()).hexdigest()
+        return ObjectInfo(key=key, size=stat.st_size, modified=stat.st_mtime, etag=etag)
+
+    def stat(self, key: str) -> Optional[ObjectInfo]:
+        try:
+            stat = os.stat(self._path(key))
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+
+        # Folders and other special files are never objects
+        if not stat_module.S_ISREG(stat.st_mode):
+            return None
+
+        return self._info(key, stat)
+
+    def read(self, key: str, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        try:
+            file = open(self._path(key), "rb")
+        except (FileNotFoundError, NotADirectoryError, IsADirectoryError):
+            raise ObjectNotFound()
+
+        if not stat_module.S_ISREG(os.fstat(file.fileno()).st_mode):
+            file.close()
+            raise ObjectNotFound()
+
+        return self._read_file(file, start, end)
+
+    def _read_file(self, file: BinaryIO, start: int, end: Optional[int]) -> Iterator[bytes]:
+        with file:
+            file.seek(start)
+            remaining = None if end is None else end - start + 1
+
+            while remaining is None or remaining > 0:
+                chunk = file.read(CHUNK_SIZE if remaining is None else min(CHUNK_SIZE, remaining))
+
+                if not chunk:
+                    break
+
+                if remaining is not None:
+                    remaining -= len(chunk)
+
+                yield chunk
+
+    def write(self, key: str, stream: BinaryIO, content_type: str = "application/octet-stream") -> int:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Write to a temporary file first so readers never see a partial image
+        written = 0
+        descriptor, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".upload-")
+
+        try:
+            with os.fdopen(descriptor, "wb") as file:
+                while chunk := stream.read(CHUNK_SIZE):
+                    file.write(chunk)
+                    written += len(chunk)
+
+            os.replace(temp_path, path)
+        except:
+            os.remove(temp_path)
+            raise
+
+        return written
+
+    def delete(self, key: str) -> None:
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def list(self, prefix: str) -> Iterator[ObjectInfo]:
+        directory = self._path(prefix.rstrip("/")) if prefix.rstrip("/") else self.root
+
+        if not os.path.isdir(directory):
+            return
+
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if not entry.is_file() or entry.name.startswith(".upload-"):
+                    continue
+
+                key = os.path.relpath(entry.path, self.root).replace(os.sep, "/")
+
+                try:
+                    yield self._info(key, entry.stat())
+                except FileNotFoundError:
+                    continue
+
+    def move(self, key: str, new_key: str) -> None:
+        new_path = self._path(new_key)
+        os.makedirs(os.path.dirname(new_path), exist_ok=True)
+
+        try:
+            os.replace(self._path(key), new_path)
+        except FileNotFoundError:
+            raise ObjectNotFound()
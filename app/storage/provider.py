@@ -0,0 +1,60 @@
+import threading
+from typing import Optional
+from app.storage.base import Storage
+from app.storage.cache import CachedStorage
+from app.storage.local import LocalStorage
+from app.storage.s3 import S3Storage
+import app.config as config
+
+_storage: Optional[Storage] = None
+_lock = threading.Lock()
+
+def create_storage() -> Storage:
+    """
+    Create the storage backend described by the config.
+
+    Returns:
+        out (Storage): The configured storage backend.
+    """
+    backend = config.get_key("storage-backend")
+
+    if backend == "local":
+        storage: Storage = LocalStorage(config.get_key("storage-local-path") or "user_images")
+    elif backend == "s3":
+        storage = S3Storage(
+            endpoint=config.get_key("storage-s3-endpoint"),
+            bucket=config.get_key("storage-s3-bucket"),
+            access_key=config.get_key("storage-s3-access-key"),
+            secret_key=config.get_key("storage-s3-secret-key"),
+            region=config.get_key("storage-s3-region") or "us-east-1",
+            pool_size=int(config.get_key("storage-s3-pool-size") or 10)
+        )
+    else:
+        raise ValueError(f"Unknown storage backend: {backend}")
+
+    # Keep hot objects on the local disk
+    if config.get_key("storage-cache-enabled"):
+        storage = CachedStorage(
+            backend=storage,
+            directory=config.get_key("storage-cache-path") or "storage_cache",
+            max_bytes=int(config.get_key("storage-cache-max-bytes") or 0),
+            ttl=float(config.get_key("storage-cache-ttl") or 0)
+        )
+
+    return storage
+
+def get_storage() -> Storage:
+    """
+    Get the storage backend shared by the whole process.
+
+    Returns:
+        out (Storage): The storage backend.
+    """
+    global _storage
+
+    if _storage is None:
+        with _lock:
+            if _storage is None:
+                _storage = create_storage()
+
+    return _storage
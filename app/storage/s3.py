@@ -0,0 +1,232 @@
+import hashlib
+import hmac
+import os
+import requests
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from requests.adapters import HTTPAdapter
+from typing import BinaryIO, Dict, Iterator, Optional
+from urllib.parse import quote, urlsplit
+from xml.etree import ElementTree
+from app.storage.base import CHUNK_SIZE, ObjectInfo, ObjectNotFound, Storage
+
+S3_NAMESPACE = "{http://s3.amazonaws.com/doc/2006-03-01/}"
+UNSIGNED_PAYLOAD = "UNSIGNED-PAYLOAD"
+EMPTY_PAYLOAD = hashlib.sha256(b"").hexdigest()
+
+class S3Error(Exception):
+    pass
+
+class S3Storage(Storage):
+    """
+    Stores objects in an S3 compatible bucket (AWS S3, MinIO, etc).
+    Requests use path-style addressing and are signed with AWS Signature Version 4.
+    """
+    def __init__(
+        self,
+        endpoint: str,
+        bucket: str,
+        access_key: str,
+        secret_key: str,
+        region: str = "us-east-1",
+        pool_size: int = 10,
+        timeout: float = 10
+    ):
+        self.endpoint = endpoint.rstrip("/")
+        self.host = urlsplit(self.endpoint).netloc
+        self.bucket = bucket
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.region = region
+        self.timeout = timeout
+
+        # Share one pool of keep-alive connections between all requests
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _signing_key(self, date: str) -> bytes:
+        key = hmac.new(f"AWS4{self.secret_key}".encode(), date.encode(), hashlib.sha256).digest()
+
+        for part in (self.region, "s3", "aws4_request"):
+            key = hmac.new(key, part.encode(), hashlib.sha256).digest()
+
+        return key
+
+    def _request(
+        self,
+        method: str,
+        key: str = "",
+        query: Optional[Dict[str, str]] = None,
+        headers: Optional[Dict[str, str]] = None,
+        data=None,
+        payload_hash: str = EMPTY_PAYLOAD,
+        stream: bool = False
+    ) -> requests.Response:
+        query = query or {}
+        headers = {name.lower(): value for name, value in (headers or {}).items()}
+
+        path = quote(f"/{self.bucket}/{key}" if key else f"/{self.bucket}", safe="/~")
+        canonical_query = "&".join(
+            f"{quote(name, safe='-_.~')}={quote(value, safe='-_.~')}"
+            for name, value in sorted(query.items())
+        )
+
+        now = datetime.now(timezone.utc)
+        amz_date = now.strftime("%Y%m%dT%H%M%SZ")
+        date = now.strftime("%Y%m%d")
+
+        headers["host"] = self.host
+        headers["x-amz-date"] = amz_date
+        headers["x-amz-content-sha256"] = payload_hash
+
+        # Build the canonical request described by Signature Version 4
+        signed_headers = ";".join(sorted(headers))
+        canonical_headers = "".join(f"{name}:{str(headers[name]).strip()}\n" for name in sorted(headers))
+        canonical_request = "\n".join([
+            method,
+            path,
+            canonical_query,
+            canonical_headers,
+            signed_headers,
+            payload_hash
+        ])
+
+        scope = f"{date}/{self.region}/s3/aws4_request"
+        string_to_sign = "\n".join([
+            "AWS4-HMAC-SHA256",
+            amz_date,
+            scope,
+            hashlib.sha256(canonical_request.encode()).hexdigest()
+        ])
+        signature = hmac.new(self._signing_key(date), string_to_sign.encode(), hashlib.sha256).hexdigest()
+
+        headers["authorization"] = (
+            f"AWS4-HMAC-SHA256 Credential={self.access_key}/{scope}, "
+            f"SignedHeaders={signed_headers}, Signature={signature}"
+        )
+
+        url = f"{self.endpoint}{path}"
+
+        if canonical_query:
+            url += f"?{canonical_query}"
+
+        return self.session.request(
+            method,
+            url,
+            headers=headers,
+            data=data,
+            stream=stream,
+            timeout=self.timeout
+        )
+
+    def _raise_for_status(self, response: requests.Response) -> None:
+        if response.status_code == 404:
+            raise ObjectNotFound()
+
+        if response.status_code >= 300:
+            raise S3Error(f"S3 request failed with status {response.status_code}: {response.text[:200]}")
+
+    def _info(self, key: str, response: requests.Response) -> ObjectInfo:
+        modified = response.headers.get("last-modified")
+
+        return ObjectInfo(
+            key=key,
+            size=int(response.headers.get("content-length", 0)),
+            modified=parsedate_to_datetime(modified).timestamp() if modified else 0,
+            etag=response.headers.get("etag", "").strip('"')
+        )
+
+    def stat(self, key: str) -> Optional[ObjectInfo]:
+        response = self._request("HEAD", key)
+
+        if response.status_code == 404:
+            return None
+
+        self._raise_for_status(response)
+        return self._info(key, response)
+
+    def read(self, key: str, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        headers = {}
+
+        if start or end is not None:
+            headers["range"] = f"bytes={start}-{'' if end is None else end}"
+
+        response = self._request("GET", key, headers=headers, stream=True)
+
+        try:
+            self._raise_for_status(response)
+        except:
+            response.close()
+            raise
+
+        return self._stream(response)
+
+    def _stream(self, response: requests.Response) -> Iterator[bytes]:
+        # Closing the response hands the connection back to the pool
+        with response:
+            yield from response.iter_content(CHUNK_SIZE)
+
+    def write(self, key: str, stream: BinaryIO, content_type: str = "application/octet-stream") -> int:
+        # Find the size of the upload without reading it into memory
+        start = stream.tell()
+        size = stream.seek(0, os.SEEK_END) - start
+        stream.seek(start)
+
+        response = self._request(
+            "PUT",
+            key,
+            headers={"content-length": str(size), "content-type": content_type},
+            data=stream,
+            payload_hash=UNSIGNED_PAYLOAD
+        )
+        self._raise_for_status(response)
+
+        return size
+
+    def delete(self, key: str) -> None:
+        response = self._request("DELETE", key)
+
+        if response.status_code != 404:
+            self._raise_for_status(response)
+
+    def list(self, prefix: str) -> Iterator[ObjectInfo]:
+        continuation_token = None
+
+        while True:
+            query = {"list-type": "2", "prefix": prefix}
+
+            if continuation_token:
+                query["continuation-token"] = continuation_token
+
+            response = self._request("GET", query=query)
+            self._raise_for_status(response)
+            result = ElementTree.fromstring(response.content)
+
+            for item in result.iter(f"{S3_NAMESPACE}Contents"):
+                modified = item.findtext(f"{S3_NAMESPACE}LastModified") or ""
+
+                yield ObjectInfo(
+                    key=item.findtext(f"{S3_NAMESPACE}Key") or "",
+                    size=int(item.findtext(f"{S3_NAMESPACE}Size") or 0),
+                    modified=datetime.fromisoformat(modified.replace("Z", "+00:00")).timestamp() if modified else 0,
+                    etag=(item.findtext(f"{S3_NAMESPACE}ETag") or "").strip('"')
+                )
+
+            # Keep listing until S3 says there are no more pages
+            if result.findtext(f"{S3_NAMESPACE}IsTruncated") != "true":
+                break
+
+            continuation_token = result.findtext(f"{S3_NAMESPACE}NextContinuationToken")
+
+    def move(self, key: str, new_key: str) -> None:
+        # S3 has no rename, so copy the object server side and delete the original
+        response = self._request(
+            "PUT",
+            new_key,
+            headers={"x-amz-copy-source": quote(f"/{self.bucket}/{key}", safe="/~")}
+        )
+        self._raise_for_status(response)
+
+        self.delete(key)
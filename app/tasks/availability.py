@@ -0,0 +1,32 @@
+import asyncio
+import logging
+import time
+from app.database import availability
+import app.config as config
+
+logger = logging.getLogger(__name__)
+
+async def run() -> None:
+    """
+    Background job that builds the username and email filters and keeps them up to date.
+    """
+    if not config.get_key("availability-filter-enabled"):
+        return
+
+    refresh_interval = int(config.get_key("availability-filter-refresh-interval") or 30)
+    rebuild_interval = int(config.get_key("availability-filter-rebuild-interval") or 3600)
+    last_rebuild = None
+
+    while True:
+        try:
+            # Read the database in a thread so requests aren't blocked
+            if last_rebuild is None or time.monotonic() - last_rebuild >= rebuild_interval:
+                count = await asyncio.to_thread(availability.rebuild)
+                last_rebuild = time.monotonic()
+                logger.info(f"Built availability filters with {count} accounts")
+            else:
+                await asyncio.to_thread(availability.refresh)
+        except Exception as error:
+            logger.error(f"Updating availability filters failed: {error}")
+
+        await asyncio.sleep(refresh_interval)
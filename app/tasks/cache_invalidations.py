@@ -0,0 +1,42 @@
+import asyncio
+import logging
+import time
+from app.database import invalidations as db_invalidations
+from app.invalidation import InvalidationFollower, set_follower
+import app.config as config
+
+logger = logging.getLogger(__name__)
+
+# Seconds between removals of old invalidations
+PURGE_INTERVAL = 600
+
+async def run() -> None:
+    """
+    Background job that evicts cache entries made stale by writes on other workers.
+    """
+    if not config.get_key("cache-invalidation-enabled"):
+        return
+
+    poll_interval = float(config.get_key("cache-invalidation-poll-interval") or 1)
+    retention = int(config.get_key("cache-invalidation-retention") or 3600)
+    follower = InvalidationFollower(gap_timeout=float(config.get_key("cache-invalidation-gap-timeout") or 10))
+    started = False
+    last_purge = time.monotonic()
+
+    while True:
+        try:
+            # Read the database in a thread so requests aren't blocked
+            if not started:
+                follower.start(await asyncio.to_thread(db_invalidations.get_last_id))
+                set_follower(follower)
+                started = True
+
+            await asyncio.to_thread(follower.poll)
+
+            if time.monotonic() - last_purge >= PURGE_INTERVAL:
+                last_purge = time.monotonic()
+                await asyncio.to_thread(db_invalidations.purge_invalidations, retention)
+        except Exception as error:
+            logger.error(f"Following cache invalidations failed: {error}")
+
+        await asyncio.sleep(poll_interval)
@@ -0,0 +1,95 @@
+import asyncio
+import hashlib
+import logging
+import os
+import socket
+from app.database import checkpoints
+from app.database import common as db_common
+from app.database import connections
+from app.database import directory as db_directory
+from app.directory import snapshot
+from app.directory.snapshot import SnapshotInfo
+import app.config as config
+
+logger = logging.getLogger(__name__)
+
+def _file_key(path: str) -> str:
+    # Workers on the same host share the file, other hosts keep their own copy
+    return hashlib.sha1(f"{socket.gethostname()}:{os.path.abspath(path)}".encode()).hexdigest()[:16]
+
+def generate(path: str) -> SnapshotInfo:
+    """
+    Write a new snapshot of the account directory.
+
+    Parameters:
+        path (str): Where to write the snapshot.
+
+    Returns:
+        out (SnapshotInfo): Details of the new snapshot.
+    """
+    return snapshot.write_snapshot(path, db_directory.iter_snapshot())
+
+def refresh(path: str, version: int) -> bool:
+    """
+    Regenerate the snapshot file unless it already covers a directory version,
+    but only if no other worker sharing the file is writing it.
+
+    Parameters:
+        path (str): Where the snapshot is kept.
+        version (int): Directory version read before calling.
+
+    Returns:
+        out (bool): If the file covers the version. False if another worker was writing it.
+    """
+    key = _file_key(path)
+    job_name = f"directory-snapshot:{key}"
+    lock_name = f"lif_auth_snapshot_{key}"
+
+    conn = connections.get_connection()
+
+    try:
+        # Only one worker writes the file at a time
+        if not db_common.acquire_named_lock(conn, lock_name):
+            return False
+
+        try:
+            # Another worker may have written it for this version already
+            if os.path.isfile(path) and checkpoints.get_checkpoint(job_name) >= version:
+                return True
+
+            info = generate(path)
+            logger.info(f"Generated directory snapshot at version {info.version} with {info.accounts} accounts")
+
+            cursor = conn.cursor()
+            checkpoints.save_checkpoint(cursor, job_name, version)
+            conn.commit()
+
+            return True
+        finally:
+            db_common.release_named_lock(conn, lock_name)
+    finally:
+        conn.close()
+
+async def run() -> None:
+    """
+    Background job that regenerates the directory snapshot whenever the directory changes.
+    """
+    if not config.get_key("directory-snapshot-enabled"):
+        return
+
+    path = str(config.get_key("directory-snapshot-path") or "directory-snapshot.bin")
+    interval = int(config.get_key("directory-snapshot-interval") or 300)
+    generated_version = None
+
+    while True:
+        try:
+            # Read the database in a thread so requests aren't blocked
+            current_version = await asyncio.to_thread(db_directory.get_current_version)
+
+            # Changes made while the snapshot is written move the version again, so they are picked up next time
+            if current_version != generated_version and await asyncio.to_thread(refresh, path, current_version):
+                generated_version = current_version
+        except Exception as error:
+            logger.error(f"Generating the directory snapshot failed: {error}")
+
+        await asyncio.sleep(interval)
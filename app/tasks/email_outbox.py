@@ -0,0 +1,114 @@
+import asyncio
+import logging
+import random
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+from app.database import outbox as db_outbox
+from app.database.outbox import OutboxEmail
+from app.mail import messages
+from app.mail.transports import TransportError, get_transport
+import app.config as config
+
+logger = logging.getLogger(__name__)
+
+# Set to wake the worker early when this process adds an email to the outbox
+_wakeup: Optional[asyncio.Event] = None
+_loop: Optional[asyncio.AbstractEventLoop] = None
+
+def notify() -> None:
+    """
+    Wake the outbox worker so a new email is sent right away instead of on the next poll.
+    Safe to call from any thread.
+    """
+    if _loop is not None and _wakeup is not None:
+        _loop.call_soon_threadsafe(_wakeup.set)
+
+def retry_delay(attempts: int) -> float:
+    """
+    Get how long to wait before retrying an email, doubling with every attempt.
+
+    Parameters:
+        attempts (int): Number of attempts made so far.
+
+    Returns:
+        out (float): Seconds until the next attempt.
+    """
+    base = float(config.get_key("mail-outbox-retry-base") or 30)
+    delay = min(base * 2 ** (attempts - 1), 3600)
+
+    # Spread out retries so failed emails don't all come back at once
+    return delay * random.uniform(0.5, 1)
+
+def deliver(email: OutboxEmail) -> None:
+    """
+    Send an email from the outbox and record the result.
+
+    Parameters:
+        email (OutboxEmail): The claimed email.
+    """
+    max_attempts = int(config.get_key("mail-outbox-max-attempts") or 8)
+
+    try:
+        message = messages.render(email.kind, email.recipient_email, email.recipient_name, email.payload)
+        error = get_transport().send([message])[0]
+
+        if error is not None:
+            raise error
+    except TransportError as error:
+        if error.permanent or email.attempts >= max_attempts:
+            logger.error(f"Giving up on email {email.id} after {email.attempts} attempts: {error}")
+            db_outbox.mark_failed(email.id, str(error), retry_in=None)
+        else:
+            db_outbox.mark_failed(email.id, str(error), retry_in=retry_delay(email.attempts))
+
+        return
+    except (KeyError, ValueError) as error:
+        # The entry can't be rendered, retrying won't fix it
+        logger.error(f"Email {email.id} is invalid: {error!r}")
+        db_outbox.mark_failed(email.id, repr(error), retry_in=None)
+        return
+
+    db_outbox.mark_sent(email.id)
+
+async def run() -> None:
+    """
+    Background job that sends the emails in the outbox.
+    """
+    global _wakeup, _loop
+
+    if not config.get_key("mail-outbox-enabled"):
+        return
+
+    concurrency = int(config.get_key("mail-outbox-concurrency") or 4)
+    batch_size = int(config.get_key("mail-outbox-batch-size") or 20)
+    poll_interval = float(config.get_key("mail-outbox-poll-interval") or 5)
+    lease = int(config.get_key("mail-outbox-lease") or 300)
+
+    _wakeup = asyncio.Event()
+    _loop = asyncio.get_running_loop()
+
+    # Bounded pool so a slow mail provider can't use up the threads that serve requests
+    executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="email-outbox")
+
+    try:
+        while True:
+            _wakeup.clear()
+
+            try:
+                emails = await _loop.run_in_executor(executor, db_outbox.claim_due, batch_size, lease)
+
+                await asyncio.gather(*[
+                    _loop.run_in_executor(executor, deliver, email) for email in emails
+                ])
+            except Exception as error:
+                logger.error(f"Sending outbox emails failed: {error}")
+                emails = []
+
+            # Keep going while there is a backlog, otherwise wait for the next poll or a new email
+            if len(emails) < batch_size:
+                try:
+                    await asyncio.wait_for(_wakeup.wait(), timeout=poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+    finally:
+        executor.shutdown(wait=False)
@@ -0,0 +1,193 @@
+import asyncio
+import logging
+import posixpath
+import time
+from dataclasses import dataclass
+from typing import List, Literal
+from app.database import common as db_common
+from app.database import connections
+from app.database import info as db_info
+from app.storage import provider as storage
+from app.storage.base import ObjectInfo, ObjectNotFound, Storage
+import app.config as config
+
+logger = logging.getLogger(__name__)
+
+IMAGE_PREFIXES = ["pfp/", "banner/"]
+QUARANTINE_PREFIX = "quarantine/"
+LOCK_NAME = "lif_auth_image_gc"
+
+@dataclass
+class SweepResult:
+    scanned: int = 0
+    orphaned: int = 0
+    bytes_reclaimed: int = 0
+
+class Throttle:
+    """
+    Limits how many filesystem operations the sweep performs per second.
+    """
+    def __init__(self, max_per_second: float):
+        self.interval = 1 / max_per_second if max_per_second > 0 else 0
+        self.next_slot = time.monotonic()
+
+    def wait(self) -> None:
+        if not self.interval:
+            return
+
+        now = time.monotonic()
+
+        if self.next_slot > now:
+            time.sleep(self.next_slot - now)
+
+        self.next_slot = max(now, self.next_slot) + self.interval
+
+def _username_from_filename(filename: str) -> str | None:
+    # Images are always saved as "<username>.png", anything else is left alone
+    if not filename.endswith(".png"):
+        return None
+
+    return filename[:-len(".png")] or None
+
+def _remove_orphans(
+    image_storage: Storage,
+    batch: List[ObjectInfo],
+    mode: Literal["delete", "quarantine"],
+    throttle: Throttle,
+    result: SweepResult
+) -> None:
+    usernames = {}
+
+    for image in batch:
+        username = _username_from_filename(posixpath.basename(image.key))
+
+        if username:
+            usernames[image.key] = username
+
+    # Check the whole batch against the database at once
+    existing = db_info.get_existing_usernames(list(set(usernames.values())))
+
+    # Usernames are compared case-insensitively like the accounts table does
+    existing = {username.casefold() for username in existing}
+
+    for image in batch:
+        username = usernames.get(image.key)
+
+        if not username or username.casefold() in existing:
+            continue
+
+        throttle.wait()
+
+        try:
+            if mode == "delete":
+                image_storage.delete(image.key)
+            else:
+                image_storage.move(image.key, QUARANTINE_PREFIX + image.key)
+
+        # The image was removed by someone else since it was listed
+        except ObjectNotFound:
+            continue
+
+        result.orphaned += 1
+        result.bytes_reclaimed += image.size
+
+def sweep(
+    mode: Literal["delete", "quarantine"] = "quarantine",
+    batch_size: int = 500,
+    min_age: int = 3600,
+    max_files_per_second: float = 200
+) -> SweepResult:
+    """
+    Removes images that don't belong to an existing account.
+
+    Parameters:
+        mode (str): 'delete' removes orphans, 'quarantine' moves them aside.
+        batch_size (int): How many images are checked per database query.
+        min_age (int): Images modified more recently than this (in seconds) are skipped.
+        max_files_per_second (float): Limit for storage operations.
+
+    Returns:
+        out (SweepResult): What the sweep found and reclaimed.
+    """
+    result = SweepResult()
+    throttle = Throttle(max_files_per_second)
+    cutoff = time.time() - min_age
+    image_storage = storage.get_storage()
+
+    for prefix in IMAGE_PREFIXES:
+        batch: List[ObjectInfo] = []
+
+        for image in image_storage.list(prefix):
+            throttle.wait()
+
+            if image.modified > cutoff:
+                continue
+
+            result.scanned += 1
+            batch.append(image)
+
+            if len(batch) >= batch_size:
+                _remove_orphans(image_storage, batch, mode, throttle, result)
+                batch = []
+
+        if batch:
+            _remove_orphans(image_storage, batch, mode, throttle, result)
+
+    return result
+
+def run_sweep() -> SweepResult | None:
+    """
+    Runs a sweep using the config options, but only if no other worker is running one.
+
+    Returns:
+        out (Optional[SweepResult]): Result of the sweep or None if it was skipped.
+    """
+    mode = config.get_key("image-gc-mode")
+
+    if mode != "delete" and mode != "quarantine":
+        logger.error(f"Invalid image-gc-mode '{mode}', skipping image sweep.")
+        return None
+
+    conn = connections.get_connection()
+
+    try:
+        # Only one worker sweeps at a time
+        if not db_common.acquire_named_lock(conn, LOCK_NAME):
+            return None
+
+        started = time.monotonic()
+        result = sweep(
+            mode=mode,
+            batch_size=int(config.get_key("image-gc-batch-size") or 500),
+            min_age=int(config.get_key("image-gc-min-age") or 0),
+            max_files_per_second=float(config.get_key("image-gc-max-files-per-second") or 0)
+        )
+
+        action = "deleted" if mode == "delete" else "quarantined"
+        logger.info(
+            f"Image sweep finished in {time.monotonic() - started:.1f}s: scanned {result.scanned} files, "
+            f"{action} {result.orphaned} orphans, reclaimed {result.bytes_reclaimed} bytes."
+        )
+
+        db_common.release_named_lock(conn, LOCK_NAME)
+        return result
+    finally:
+        conn.close()
+
+async def run() -> None:
+    """
+    Background job that periodically sweeps orphaned images.
+    """
+    if not config.get_key("image-gc-enabled"):
+        return
+
+    interval = int(config.get_key("image-gc-interval") or 86400)
+
+    while True:
+        try:
+            # Sweep in a thread so file and database I/O don't block requests
+            await asyncio.to_thread(run_sweep)
+        except Exception as error:
+            logger.error(f"Image sweep failed: {error}")
+
+        await asyncio.sleep(interval)
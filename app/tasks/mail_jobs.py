@@ -0,0 +1,54 @@
+import asyncio
+import logging
+from typing import Optional
+from app.database import mail as db_mail
+from app.mail import jobs
+import app.config as config
+
+logger = logging.getLogger(__name__)
+
+# Set to wake the worker early when this process queues a job
+_wakeup: Optional[asyncio.Event] = None
+_loop: Optional[asyncio.AbstractEventLoop] = None
+
+def notify() -> None:
+    """
+    Wake the mail job worker so a new job starts right away instead of on the next poll.
+    Safe to call from any thread.
+    """
+    if _loop is not None and _wakeup is not None:
+        _loop.call_soon_threadsafe(_wakeup.set)
+
+async def run() -> None:
+    """
+    Background job that runs queued mail jobs one at a time, and resumes jobs from workers that stopped.
+    """
+    global _wakeup, _loop
+
+    if not config.get_key("mail-jobs-enabled"):
+        return
+
+    poll_interval = float(config.get_key("mail-jobs-poll-interval") or 10)
+    lease = int(config.get_key("mail-jobs-lease") or 120)
+
+    _wakeup = asyncio.Event()
+    _loop = asyncio.get_running_loop()
+
+    while True:
+        _wakeup.clear()
+        job = None
+
+        try:
+            job = await asyncio.to_thread(db_mail.claim_job, lease)
+
+            if job:
+                await asyncio.to_thread(jobs.run_job, job, lease)
+        except Exception as error:
+            logger.error(f"Running mail jobs failed: {error}")
+
+        # Look for the next job straight away after finishing one
+        if job is None:
+            try:
+                await asyncio.wait_for(_wakeup.wait(), timeout=poll_interval)
+            except asyncio.TimeoutError:
+                pass
@@ -0,0 +1,50 @@
+import asyncio
+import logging
+from app.database import events as db_events
+from app.directory.events import get_hub
+import app.config as config
+
+logger = logging.getLogger(__name__)
+
+# Seconds between removals of old events
+PURGE_INTERVAL = 3600
+
+async def _purge(retention: int) -> None:
+    while True:
+        try:
+            deleted = await asyncio.to_thread(db_events.purge_events, retention)
+
+            if deleted:
+                logger.info(f"Removed {deleted} old principal events")
+        except Exception as error:
+            logger.error(f"Removing old principal events failed: {error}")
+
+        await asyncio.sleep(PURGE_INTERVAL)
+
+async def _follow(poll_interval: float, buffer_size: int) -> None:
+    hub = get_hub()
+
+    while True:
+        try:
+            await hub.run(poll_interval, buffer_size)
+        except asyncio.CancelledError:
+            raise
+        except Exception as error:
+            logger.error(f"Reading principal events failed: {error}")
+            await asyncio.sleep(poll_interval)
+
+async def run() -> None:
+    """
+    Background job that reads principal events for the event stream and removes old ones.
+    """
+    if not config.get_key("principal-events-enabled"):
+        return
+
+    # Events committed by this worker are pushed without waiting for the next poll
+    db_events.add_listener(get_hub().notify)
+
+    poll_interval = float(config.get_key("principal-events-poll-interval") or 0.5)
+    buffer_size = int(config.get_key("principal-events-buffer-size") or 1000)
+    retention = int(config.get_key("principal-events-retention") or 604800)
+
+    await asyncio.gather(_follow(poll_interval, buffer_size), _purge(retention))
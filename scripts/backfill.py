@@ -0,0 +1,56 @@
+# -------------------------------------
+# Description: This script runs database backfills, such as giving
+#              every Lif Account a user id. Run it from the Auth Server
+#              folder with: python -m scripts.backfill <job>
+# --------------------------------------
+
+import argparse
+import time
+from app.database import backfill
+from app.database.backfill import BackfillProgress
+
+def _format_seconds(seconds: float) -> str:
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}"
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Run an Auth Server database backfill.")
+    parser.add_argument("job", choices=sorted(backfill.JOBS), help="Backfill to run.")
+    parser.add_argument("--batch-size", type=int, default=500, help="Rows updated per transaction.")
+    parser.add_argument("--throttle", type=float, default=0, help="Seconds to wait between batches.")
+    parser.add_argument("--dry-run", action="store_true", help="Count the rows that would change without changing them.")
+    parser.add_argument("--restart", action="store_true", help="Start from the first row even if the backfill ran before.")
+    parser.add_argument("--progress-interval", type=float, default=5, help="Seconds between progress lines.")
+    args = parser.parse_args(argv)
+
+    last_report = 0.0
+
+    def report(progress: BackfillProgress) -> None:
+        nonlocal last_report
+
+        if time.monotonic() - last_report < args.progress_interval:
+            return
+
+        last_report = time.monotonic()
+        eta = _format_seconds(progress.eta) if progress.eta is not None else "unknown"
+
+        print(
+            f"{progress.fraction:6.1%} id {progress.position}/{progress.last_id}, "
+            f"{progress.scanned} scanned, {progress.updated} {'to update' if args.dry_run else 'updated'}, ETA {eta}"
+        )
+
+    progress = backfill.run_backfill(
+        backfill.JOBS[args.job],
+        batch_size=args.batch_size,
+        throttle=args.throttle,
+        dry_run=args.dry_run,
+        restart=args.restart,
+        on_progress=report
+    )
+
+    action = "would update" if args.dry_run else "updated"
+    print(f"Done in {_format_seconds(progress.elapsed)}: {progress.scanned} rows scanned, {action} {progress.updated}.")
+
+if __name__ == "__main__":
+    main()
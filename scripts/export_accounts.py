@@ -0,0 +1,30 @@
+# -------------------------------------
+# Description: This script exports every Lif Account as NDJSON.
+#              Run it from the Auth Server folder with:
+#              python -m scripts.export_accounts <file>
+# --------------------------------------
+
+import argparse
+import sys
+from app.exports import accounts as account_exports
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Export Lif Accounts as NDJSON.")
+    parser.add_argument("file", nargs="?", help="File to write. Writes to the standard output if not given.")
+    parser.add_argument("--zstd", action="store_true", help="Compress the export. Used by default for files ending in '.zst'.")
+    parser.add_argument("--after-id", type=int, default=0, help="Only export accounts with a larger id.")
+    args = parser.parse_args()
+
+    compress = args.zstd or bool(args.file and args.file.endswith(".zst"))
+    output = open(args.file, "wb") if args.file else sys.stdout.buffer
+
+    try:
+        for chunk in account_exports.export_accounts(compress=compress, after_id=args.after_id):
+            output.write(chunk)
+            output.flush()
+    finally:
+        if args.file:
+            output.close()
+
+if __name__ == "__main__":
+    main()
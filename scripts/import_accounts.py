@@ -0,0 +1,47 @@
+# -------------------------------------
+# Description: This script creates Lif Accounts in bulk from an
+#              NDJSON or CSV file. Run it from the Auth Server folder
+#              with: python -m scripts.import_accounts <file>
+# --------------------------------------
+
+import argparse
+import os
+import sys
+from app.imports import accounts as account_imports
+from app.imports.accounts import ImportIssue
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Import Lif Accounts from an NDJSON or CSV file.")
+    parser.add_argument("file", help="File to import.")
+    parser.add_argument("--format", choices=["ndjson", "csv"], help="Format of the file. Guessed from the file extension if not given.")
+    parser.add_argument("--import-id", help="Id used to resume the import. Defaults to the file name.")
+    parser.add_argument("--batch-size", type=int, help="Accounts inserted per transaction.")
+    parser.add_argument("--restart", action="store_true", help="Start from the first row even if the import ran before.")
+    args = parser.parse_args()
+
+    format = args.format or ("csv" if args.file.lower().endswith(".csv") else "ndjson")
+    import_id = args.import_id or os.path.basename(args.file)
+
+    if args.restart:
+        account_imports.restart_import(import_id)
+
+    def print_issue(issue: ImportIssue) -> None:
+        print(f"Row {issue.row} ({issue.username or 'unknown'}): {issue.reason}", file=sys.stderr)
+
+    with open(args.file, "r", newline="", encoding="utf-8") as file:
+        result = account_imports.run_import(
+            file,
+            format=format,
+            import_id=import_id,
+            batch_size=args.batch_size,
+            max_issues=0,
+            on_issue=print_issue
+        )
+
+    if result.skipped:
+        print(f"Skipped {result.skipped} rows imported by an earlier run.")
+
+    print(f"Imported {result.imported} accounts, {result.conflicts} conflicts, {result.invalid} invalid rows.")
+
+if __name__ == "__main__":
+    main()